@@ -0,0 +1,223 @@
+# bench_engine.py — micro-benchmark for the headless session engine (tt_engine.SessionEngine).
+# Simulates learners answering millions of questions on a virtual clock and reports
+# questions/sec plus memory allocations per question, so hot-path regressions show up
+# before an upgrade reaches a classroom.
+#
+#   python benchmarks/bench_engine.py                      # 1,000,000 questions, tables 2..12
+#   python benchmarks/bench_engine.py -n 3000000 --max 100
+#   python benchmarks/bench_engine.py --min-qps 200000     # exit 1 if slower (CI guard)
+#   python benchmarks/bench_engine.py --mode none --live-sessions 5000   # memory per live session only
+#   python benchmarks/bench_engine.py --mode none --event-minutes 180     # event log + Results statistics only
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from tt_engine import SessionEngine  # noqa: E402
+from tt_resume import encode_snapshot, decode_snapshot  # noqa: E402
+
+class SimClock:
+    """Virtual monotonic clock; the learner model advances it instead of sleeping."""
+    def __init__(self): self.t = 0.0
+    def __call__(self) -> float: return self.t
+
+def _simulate(eng: SessionEngine, clock: SimClock, rng: random.Random, n: int,
+              accuracy: float, keypad: bool) -> int:
+    """Answer `n` questions; restart the session whenever it ends. Returns sessions started."""
+    sessions = 0
+    done = 0
+    while done < n:
+        if not eng.running:
+            eng.start(); sessions += 1
+        before = eng.total_questions
+        clock.t += rng.uniform(0.3, 1.2) * eng.per_q
+        if clock.t >= eng.q_deadline:
+            eng.tick(clock.t)                                  # timed out
+        else:
+            correct = rng.random() < accuracy
+            if keypad:
+                for ch in str(eng.a * eng.b + (0 if correct else 1)):
+                    eng.press(ch)
+                    eng.check_entry(clock.t)
+                if eng.pending_correct:
+                    clock.t = eng.ok_until; eng.settle(clock.t)
+                else:                                          # shaken; gives up and times out
+                    clock.t = eng.q_deadline; eng.tick(clock.t)
+            else:
+                eng.record_question(correct, False)
+        done += eng.total_questions - before
+    return sessions
+
+def run(n: int, min_table: int, max_table: int, minutes: int, accuracy: float,
+        seed: int, keypad: bool, alloc_sample: int) -> dict:
+    clock = SimClock(); rng = random.Random(seed)
+    eng = SessionEngine(min_table=min_table, max_table=max_table, per_q=10,
+                        total_seconds=minutes * 60, clock=clock, rng=random.Random(seed + 1))
+
+    t0 = time.perf_counter()
+    sessions = _simulate(eng, clock, rng, n, accuracy, keypad)
+    elapsed = time.perf_counter() - t0
+
+    # Allocation profile on a smaller sample (tracemalloc slows the interpreter a lot).
+    tracemalloc.start()
+    snap0 = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    _simulate(eng, clock, rng, alloc_sample, accuracy, keypad)
+    _, peak = tracemalloc.get_traced_memory()
+    snap1 = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = snap1.compare_to(snap0, "filename")
+    net_blocks = sum(s.count_diff for s in stats if "tracemalloc" not in (s.traceback[0].filename or ""))
+
+    return {
+        "mode": "keypad" if keypad else "record",
+        "questions": n,
+        "sessions": sessions,
+        "range": [min_table, max_table],
+        "seconds": round(elapsed, 3),
+        "questions_per_sec": round(n / elapsed) if elapsed else None,
+        "us_per_question": round(1e6 * elapsed / n, 3) if n else None,
+        "alloc_sample": alloc_sample,
+        "net_blocks_per_question": round(net_blocks / alloc_sample, 4) if alloc_sample else None,
+        "peak_traced_bytes": peak,
+    }
+
+def live_sessions(count: int, answered: int, min_table: int, max_table: int, minutes: int,
+                  accuracy: float, seed: int) -> dict:
+    """Bytes per live session: `count` engines kept alive mid-session after `answered` questions."""
+    rng = random.Random(seed)
+    engines = []
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for i in range(count):
+        clock = SimClock()
+        eng = SessionEngine(min_table=min_table, max_table=max_table, per_q=10,
+                            total_seconds=minutes * 60, clock=clock, rng=random.Random(seed + i))
+        eng.start(seed=i if i % 2 else None)            # half on a shared class seed (own deck RNG)
+        for _ in range(answered):
+            clock.t += 1.0
+            eng.record_question(rng.random() < accuracy, rng.random() < 0.5)
+        engines.append(eng)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per = (after - before) / count if count else 0.0
+    return {
+        "live_sessions": count, "answered": answered, "range": [min_table, max_table],
+        "bytes_per_session": round(per), "footprint": engines[-1].footprint() if engines else {},
+        "mb_per_1000": round(per * 1000 / 2**20, 2),
+    }
+
+def snapshot_cost(count: int, answered: int, min_table: int, max_table: int, accuracy: float, seed: int) -> dict:
+    """µs to snapshot + sign a live session (what the app does every few scored steps) and to decode it."""
+    clock = SimClock(); rng = random.Random(seed)
+    eng = SessionEngine(min_table=min_table, max_table=max_table, per_q=10, total_seconds=max(3600, 2 * answered),
+                        clock=clock, rng=random.Random(seed + 1))        # still running after `answered`
+    eng.start()
+    for _ in range(answered):
+        clock.t += 1.0; eng.record_question(rng.random() < accuracy, False)
+    key = b"bench" * 6
+    t0 = time.perf_counter()
+    for _ in range(count): token = encode_snapshot(eng.snapshot(), key, "learner", "0" * 32)
+    t1 = time.perf_counter()
+    for _ in range(count): decode_snapshot(token, key)
+    t2 = time.perf_counter()
+    return {"snapshots": count, "answered": answered, "token_bytes": len(token),
+            "snapshot_us": round(1e6 * (t1 - t0) / count, 1), "restore_decode_us": round(1e6 * (t2 - t1) / count, 1)}
+
+def event_log(minutes: int, answer_s: float, min_table: int, max_table: int, accuracy: float, seed: int) -> dict:
+    """A `minutes`-long session answered every `answer_s` seconds: EventLog size, append and statistics cost."""
+    from tt_events import fact_stats, table_stats, heatmap, heatmap_svg
+    clock = SimClock(); rng = random.Random(seed)
+    eng = SessionEngine(min_table=min_table, max_table=max_table, per_q=10, total_seconds=minutes * 60,
+                        clock=clock, rng=random.Random(seed + 1))
+    eng.start(runner=True)
+    t0 = time.perf_counter()
+    while clock.t < eng.deadline:
+        (qid, a, b), = eng.prefetch(1)
+        clock.t += answer_s
+        eng.apply_result(qid, a * b if rng.random() < accuracy else None, answer_s * rng.uniform(0.5, 1.5))
+    t1 = time.perf_counter()
+    fact_stats(eng.events); table_stats(eng.events); heatmap_svg(heatmap(eng.events, min_table, max_table))
+    t2 = time.perf_counter()
+    return {"minutes": minutes, "events": eng.events.n, "kept": len(eng.events),
+            "log_bytes": eng.footprint()["events"], "us_per_scored_question": round(1e6 * (t1 - t0) / eng.events.n, 2),
+            "results_stats_ms": round(1000 * (t2 - t1), 2)}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark the headless times-tables session engine.")
+    ap.add_argument("-n", "--questions", type=int, default=1_000_000)
+    ap.add_argument("--min", dest="min_table", type=int, default=2)
+    ap.add_argument("--max", dest="max_table", type=int, default=12)
+    ap.add_argument("--minutes", type=int, default=180, help="simulated session length")
+    ap.add_argument("--accuracy", type=float, default=0.8)
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--alloc-sample", type=int, default=20_000)
+    ap.add_argument("--mode", choices=("record", "keypad", "both", "none"), default="both",
+                    help="record: score answers directly; keypad: type digits and auto-submit")
+    ap.add_argument("--min-qps", type=float, default=None, help="fail if any mode is slower")
+    ap.add_argument("--live-sessions", type=int, default=1000, help="engines kept alive for the memory report (0: skip)")
+    ap.add_argument("--answered", type=int, default=60, help="questions answered by each live session")
+    ap.add_argument("--wide-max", type=int, default=10_000,
+                    help="also measure live sessions on tables 1..WIDE_MAX (0: skip)")
+    ap.add_argument("--max-session-bytes", type=int, default=None, help="fail if a live session (either range) holds more")
+    ap.add_argument("--snapshots", type=int, default=2000, help="resume snapshots timed (0: skip)")
+    ap.add_argument("--snapshot-long", type=int, default=10_000, help="also time snapshots after this many answers (0: skip)")
+    ap.add_argument("--event-minutes", type=int, default=180, help="session length for the event-log report (0: skip)")
+    ap.add_argument("--answer-s", type=float, default=0.66, help="seconds per answer in the event-log report")
+    ap.add_argument("--json", action="store_true", help="print one JSON object per mode")
+    args = ap.parse_args(argv)
+
+    modes = {"both": ("record", "keypad"), "none": ()}.get(args.mode, (args.mode,))
+    failed = False
+    for mode in modes:
+        res = run(args.questions, args.min_table, args.max_table, args.minutes, args.accuracy,
+                  args.seed, mode == "keypad", args.alloc_sample)
+        if args.json:
+            print(json.dumps(res))
+        else:
+            print(f"{res['mode']:>7}: {res['questions']:,} q in {res['seconds']:.2f}s  "
+                  f"{res['questions_per_sec']:,} q/s  {res['us_per_question']:.2f} µs/q  "
+                  f"net blocks/q {res['net_blocks_per_question']}  peak {res['peak_traced_bytes']:,} B")
+        if args.min_qps is not None and (res["questions_per_sec"] or 0) < args.min_qps:
+            failed = True
+    if args.live_sessions > 0:
+        # The sampler grows with the tables in play, so a wide range is measured next to the classroom one
+        ranges = [(args.min_table, args.max_table)]
+        if args.wide_max > args.max_table: ranges.append((1, args.wide_max))
+        for lo, hi in ranges:
+            mem = live_sessions(args.live_sessions, args.answered, lo, hi, args.minutes, args.accuracy, args.seed)
+            if args.json:
+                print(json.dumps(mem))
+            else:
+                fp = mem["footprint"]
+                print(f" memory: {mem['live_sessions']:,} live sessions on {lo}..{hi} after {mem['answered']} q  "
+                      f"{mem['bytes_per_session']:,} B/session  ({mem['mb_per_1000']} MB per 1,000)")
+                print("         one session: " + ", ".join(f"{k} {v:,}" for k, v in fp.items()))
+            if args.max_session_bytes is not None and mem["bytes_per_session"] > args.max_session_bytes:
+                failed = True
+    if args.snapshots > 0:
+        for answered in (args.answered, args.snapshot_long):
+            if answered <= 0: continue
+            snap = snapshot_cost(args.snapshots, answered, args.min_table, args.max_table, args.accuracy, args.seed)
+            if args.json:
+                print(json.dumps(snap))
+            else:
+                print(f" resume: snapshot+sign {snap['snapshot_us']} µs, decode {snap['restore_decode_us']} µs, "
+                      f"token {snap['token_bytes']} B after {snap['answered']:,} q")
+    if args.event_minutes > 0:
+        ev = event_log(args.event_minutes, args.answer_s, args.min_table, args.max_table, args.accuracy, args.seed)
+        if args.json:
+            print(json.dumps(ev))
+        else:
+            print(f" events: {ev['minutes']} min → {ev['events']:,} events ({ev['kept']:,} kept) in "
+                  f"{ev['log_bytes']:,} B, {ev['us_per_scored_question']} µs/q scored, "
+                  f"Results statistics {ev['results_stats_ms']} ms")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+# bench_startup.py — cold-start benchmark for times_tables_streamlit.py.
+# Each repeat starts a fresh interpreter (nothing imported, no Streamlit caches) and measures:
+# the `import streamlit` cost, the first Start-screen script run through AppTest (time to first
+# paint: every element of the Start screen produced), a warm rerun, the app's own per-phase split
+# of the first run (?profile=1), and the heaviest imports the first run triggered (-X importtime).
+#
+#   python benchmarks/bench_startup.py                        # 5 cold starts
+#   python benchmarks/bench_startup.py -n 10 --json
+#   python benchmarks/bench_startup.py --max-first-paint-ms 800   # exit 1 if slower (CI guard)
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+APP = ROOT / "times_tables_streamlit.py"
+MARK = "-- tt-startup: app run --"
+WATCH = ("numpy", "pandas", "altair", "requests", "sqlite3", "multiprocessing", "tt_mastery", "tt_dispatch",
+         "tt_store", "tt_roster")   # modules the Start screen should not need
+
+def _child() -> dict:
+    """One cold start, measured inside a fresh interpreter."""
+    t0 = time.perf_counter()
+    import streamlit  # noqa: F401
+    t_st = time.perf_counter()
+    sys.path.insert(0, str(HERE)); sys.path.insert(0, str(ROOT))
+    from loadtest import install_stubs
+    from streamlit.testing.v1 import AppTest
+    install_stubs(webhook=False)        # the Start screen never sends results
+    at = AppTest.from_file(str(APP), default_timeout=60)
+    at.query_params["profile"] = "1"; at.secrets["startup"] = True
+    before = set(sys.modules)
+    print(MARK, file=sys.stderr, flush=True)
+    t1 = time.perf_counter(); at.run(); t2 = time.perf_counter()
+    loaded = set(sys.modules) - before
+    at.run(); t3 = time.perf_counter()
+    if at.exception: raise RuntimeError(f"Start screen raised: {at.exception}")
+    phases = {}
+    prof = at.session_state["profiler"]
+    for name, s in prof.series.items():
+        if s: phases[name] = round(s[0], 2)                 # the first (cold) run
+    return {"import_streamlit_ms": (t_st - t0) * 1000.0, "first_paint_ms": (t2 - t1) * 1000.0,
+            "warm_rerun_ms": (t3 - t2) * 1000.0, "phases_ms": phases,
+            "watched_loaded": sorted(m for m in WATCH if m in loaded),
+            "elements": len(at.main.children) if hasattr(at.main, "children") else None}
+
+def _importtime(stderr: str, top: int) -> list:
+    """Heaviest top-level imports after MARK, from -X importtime lines (self | cumulative | name)."""
+    rows, seen = [], False
+    for line in stderr.splitlines():
+        if MARK in line: seen = True; continue
+        if not seen or not line.startswith("import time:"): continue
+        parts = line.split("|")
+        if len(parts) != 3 or parts[2].startswith("  "): continue      # nested import
+        try: rows.append((parts[2].strip(), int(parts[1]) / 1000.0))
+        except ValueError: pass
+    return [{"module": m, "ms": round(ms, 2)} for m, ms in sorted(rows, key=lambda r: -r[1])[:top]]
+
+def run(repeats: int, top: int) -> dict:
+    cold, imports = [], []
+    for _ in range(repeats):
+        p = subprocess.run([sys.executable, "-X", "importtime", __file__, "--child"], cwd=str(ROOT),
+                           capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "0"})
+        if p.returncode != 0:
+            raise RuntimeError(f"child failed:\n{p.stderr[-2000:]}")
+        cold.append(json.loads(p.stdout.strip().splitlines()[-1]))
+        imports.append(_importtime(p.stderr, top))
+    med = lambda k: round(statistics.median(c[k] for c in cold), 1)
+    phase_names = sorted({n for c in cold for n in c["phases_ms"]})
+    return {
+        "repeats": repeats,
+        "import_streamlit_ms": med("import_streamlit_ms"),
+        "first_paint_ms": med("first_paint_ms"),
+        "first_paint_ms_max": round(max(c["first_paint_ms"] for c in cold), 1),
+        "warm_rerun_ms": med("warm_rerun_ms"),
+        "phases_ms": {n: round(statistics.median(c["phases_ms"].get(n, 0.0) for c in cold), 2) for n in phase_names},
+        "heavy_modules_loaded": sorted({m for c in cold for m in c["watched_loaded"]}),
+        "top_imports": imports[-1],
+    }
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Cold-start benchmark for the Start screen.")
+    ap.add_argument("-n", "--repeats", type=int, default=5, help="fresh interpreters to start")
+    ap.add_argument("--top", type=int, default=12, help="imports listed from the first run")
+    ap.add_argument("--max-first-paint-ms", type=float, default=None, help="fail if the median is slower")
+    ap.add_argument("--json", action="store_true", help="print the result as one JSON object")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.child:
+        print(json.dumps(_child())); return 0
+
+    res = run(args.repeats, args.top)
+    if args.json:
+        print(json.dumps(res))
+    else:
+        print(f"{res['repeats']} cold starts (median): import streamlit {res['import_streamlit_ms']} ms, "
+              f"Start first paint {res['first_paint_ms']} ms (max {res['first_paint_ms_max']}), "
+              f"warm rerun {res['warm_rerun_ms']} ms")
+        print("  first run by phase (ms): " + ", ".join(f"{k} {v}" for k, v in res["phases_ms"].items()))
+        print("  heavy modules loaded for Start: " + (", ".join(res["heavy_modules_loaded"]) or "none"))
+        print("  imports triggered by the first run (cumulative ms):")
+        for r in res["top_imports"]: print(f"    {r['ms']:>8.1f}  {r['module']}")
+    if args.max_first_paint_ms is not None and res["first_paint_ms"] > args.max_first_paint_ms:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+# loadtest.py — concurrent-learner load test for times_tables_streamlit.py via Streamlit's AppTest.
+# Worker processes each drive a share of the simulated learners: every learner is a real AppTest
+# session (cookie manager and Discord webhook stubbed) that answers at human speed. The headline
+# figure is runner mode, the production default: the fragment reruns every 1 s and the learner
+# answers prefetched questions locally, syncing results through the `tt_runner` component value.
+# Per-keypress mode (?runner=0: a 100 ms tick plus a rerun per digit via `tt_keypad`) is measured
+# afterwards as a secondary figure. Reports reruns/sec, rerun latency percentiles, CPU per rerun,
+# RSS per session, and the resulting "learners per core" capacity estimate for each mode.
+#
+#   python benchmarks/loadtest.py                          # 8 learners per mode, 1 worker per core, 20 s each
+#   python benchmarks/loadtest.py --keypad-sessions 0      # runner mode only
+#   python benchmarks/loadtest.py --sessions 40 --seconds 60 --json
+#   python benchmarks/loadtest.py --min-learners-per-core 10   # exit 1 if below (deploy guard)
+#
+# AppTest has no fragment scheduler, so each tick is a full script run, and AppTest itself
+# costs more per run than the app. Sessions therefore run with ?profile=1: the app's own rerun
+# total gives the capacity estimate, and whole-process CPU gives a floor that includes the harness.
+
+import argparse
+import heapq
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from tt_latency import LatencyHistogram  # noqa: E402
+
+APP = ROOT / "times_tables_streamlit.py"
+
+# ---------- Stubs (installed in each worker before any session runs) ----------
+class StubCookies:
+    """In-memory stand-in for EncryptedCookieManager, one store per simulated browser.
+
+    AppTest gives every session the same session id, so the driver names the browser about to
+    run (`StubCookies.browser`); shared cookies would hand each learner the last one's resume id.
+    """
+    stores: dict = {}
+    browser = ""
+
+    def __init__(self, prefix: str = "", password: str = ""):
+        self._d = self.stores.setdefault(self.browser, {})
+    def ready(self) -> bool: return True
+    def save(self): pass
+    def get(self, k, d=None): return self._d.get(k, d)
+    def __getitem__(self, k): return self._d[k]
+    def __setitem__(self, k, v): self._d[k] = v
+    def pop(self, k, d=None): return self._d.pop(k, d)
+
+def install_stubs(webhook: bool = True):
+    """Stub the cookie manager (and, unless webhook=False, the Discord send) and quiet AppTest."""
+    import streamlit_cookies_manager
+    streamlit_cookies_manager.EncryptedCookieManager = StubCookies
+
+    if webhook:                             # importing tt_dispatch pulls in requests
+        import tt_dispatch
+        def submit(self, url, content):
+            fut = Future(); fut.set_result({"status": 204, "ok": True, "stubbed": True}); return fut
+        tt_dispatch.WebhookDispatcher.submit = submit
+
+    # AppTest reads widget state for every element of the last run; widgets the next screen no
+    # longer renders can raise KeyError while the tree is rebuilt, so treat them as stateless.
+    from streamlit.testing.v1 import element_tree
+    get_state = element_tree.get_widget_state
+    def safe_state(node):
+        try: return get_state(node)
+        except KeyError: return None
+    element_tree.get_widget_state = safe_state
+
+    from streamlit import logger
+    logger.set_log_level("error")          # AppTest runs in bare mode: one warning per run otherwise
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource                                   # peak, not current, off Linux
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+# ---------- Learner model ----------
+class Learner:
+    """One AppTest session; subclasses add the mode's query parameter, tick and input schedule."""
+    MODE = ""
+    TICK_S = 1.0
+    query: dict = {}
+
+    def __init__(self, n: int, rng: random.Random, accuracy: float, think: tuple, key_gap: tuple):
+        from streamlit.testing.v1 import AppTest
+        self.rng = rng; self.accuracy = accuracy; self.think = think; self.key_gap = key_gap
+        self.at = AppTest.from_file(str(APP), default_timeout=60)
+        self.at.query_params.update({"user": f"load{n}", "minutes": "180", "profile": "1", **self.query})
+        self.at.secrets["loadtest"] = True                 # a secrets dict, so st.secrets lookups stay quiet
+        self.seq = 0; self.answers = 0
+        self.browser = f"learner-{n}"
+
+    def run(self):
+        StubCookies.browser = self.browser; self.at.run()
+
+    def start(self):
+        self.run()
+        next(b for b in self.at.button if b.label == "Start").click(); self.run()
+        if not self.at.session_state["screen"] == "practice":
+            raise RuntimeError("session did not reach the practice screen")
+
+    def script_ms(self) -> float | None:
+        """The app's own measure of its last full rerun (RerunProfiler, ?profile=1)."""
+        s = self.at.session_state["profiler"].series.get("total:full")
+        return s[-1] if s else None
+
+    def overdue(self) -> bool:
+        """True if input is due on this tick without a new action (runner result re-sends)."""
+        return False
+
+class KeypadLearner(Learner):
+    """Per-keypress mode (?runner=0): a rerun every digit through `tt_keypad`, ticked like the practice fragment."""
+    MODE = "keypad"
+    TICK_S = 0.1                   # PRACTICE_TICK_S in the app
+    query = {"runner": "0"}
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self.typing = []; self.pending = []
+
+    def next_delay(self) -> float:
+        if self.typing: return self.rng.uniform(*self.key_gap)
+        return self.rng.uniform(*self.think)
+
+    def act(self) -> bool:
+        """Queue the next digit on the keypad component (a new answer starts when the last is typed).
+
+        Like the component, unacknowledged presses are re-sent as one batch until the app's ack covers them.
+        """
+        if not self.typing:
+            eng = self.at.session_state["engine"]
+            ans = eng.a * eng.b
+            if self.rng.random() >= self.accuracy: ans += self.rng.choice((-1, 1)) * max(1, eng.a)
+            self.typing = list(str(max(0, ans))); self.answers += 1
+        self.seq += 1
+        ack = self.at.session_state["kp_timing"]["seq"]
+        self.pending = [k for k in self.pending if k[1] > ack] + [[self.typing.pop(0), self.seq]]
+        self.at.session_state["tt_keypad"] = {"keys": list(self.pending), "seq": self.seq,
+                                              "t": time.time() * 1000.0, "lat": {"p": [], "t": []}}
+        return True
+
+class RunnerLearner(Learner):
+    """Runner mode (the default): answers prefetched questions locally and syncs results through `tt_runner`.
+
+    Mirrors the component's client: it asks the outstanding questions in the server's order, retypes
+    after a wrong entry, times out at the per-question limit, and sends its unacknowledged results
+    every SYNC_EVERY answers, after a timeout, when fewer than SYNC_LOW questions are left, or once
+    the oldest has waited SYNC_MAX_S. The fragment itself reruns every RUNNER_TICK_S.
+    """
+    MODE = "runner"
+    TICK_S = 1.0                   # RUNNER_TICK_S in the app
+    SYNC_EVERY, SYNC_LOW, SYNC_MAX_S, FLASH_S = 4, 3, 3.0, 0.6
+    query = {}
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self.queue = []; self.cur = None; self.pending = []; self.n = 0; self.first_pending = 0.0
+
+    def run(self):
+        super().run(); self.refresh()
+
+    def refresh(self):
+        """Take the component args from the last run: the ack and the outstanding questions."""
+        ss = self.at.session_state
+        if "runner_acked" not in ss: return                   # not on the practice screen yet
+        acked = ss["runner_acked"]
+        self.pending = [r for r in self.pending if r["n"] > acked]
+        asked = {r["qid"] for r in self.pending} | ({self.cur[0]} if self.cur else set())
+        eng = ss["engine"]
+        self.queue = [q for q in eng.issued if q[0] not in asked] if eng.running else []
+        self.per_q = float(eng.per_q)
+
+    def next_delay(self) -> float:
+        """Seconds until the current question is finished (think, type, any retype, the OK flash)."""
+        if self.cur is None:
+            self.cur = self.queue.pop(0) if self.queue else None
+            if self.cur is None: return self.TICK_S            # waiting for the next prefetch
+        digits = len(str(self.cur[1] * self.cur[2]))
+        self.tries = 0 if self.rng.random() < self.accuracy else 1
+        d = self.rng.uniform(*self.think) + sum(self.rng.uniform(*self.key_gap) for _ in range(digits * (1 + self.tries)))
+        self.ok = d + self.FLASH_S < self.per_q
+        self.took = d + self.FLASH_S if self.ok else self.per_q
+        return self.took
+
+    def act(self) -> bool:
+        """Finish the current question; True if that sends a sync (a rerun)."""
+        if self.cur is None: return False
+        qid, a, b = self.cur; self.cur = None
+        self.n += 1; self.answers += 1
+        self.pending.append({"n": self.n, "qid": qid, "ans": a * b if self.ok else "",
+                             "ms": int(self.took * 1000), "tries": self.tries})
+        if len(self.pending) == 1: self.first_pending = time.perf_counter()
+        if not self.ok or len(self.pending) >= self.SYNC_EVERY or len(self.queue) < self.SYNC_LOW:
+            self.sync(); return True
+        return False
+
+    def overdue(self) -> bool:
+        """The oldest unacknowledged result has waited SYNC_MAX_S (checked on the fragment tick)."""
+        if self.pending and time.perf_counter() - self.first_pending >= self.SYNC_MAX_S:
+            self.first_pending = time.perf_counter(); self.sync(); return True
+        return False
+
+    def sync(self):
+        self.seq += 1
+        self.at.session_state["tt_runner"] = {"kind": "runner", "seq": self.seq, "results": list(self.pending),
+                                              "done": False, "lat": {"p": [], "t": []}}
+
+MODES = {cls.MODE: cls for cls in (RunnerLearner, KeypadLearner)}
+
+def _worker(job: dict) -> dict:
+    """Drive `job["sessions"]` learners of `job["mode"]` for `job["seconds"]`; returns raw counters and latencies."""
+    install_stubs()
+    cls = MODES[job["mode"]]; tick = cls.TICK_S
+    rng = random.Random(job["seed"])
+    cls(-1, random.Random(0), 1.0, job["think"], job["key_gap"]).start()   # warm-up: imports, caches
+    rss0 = _rss_bytes()
+    learners = [cls(job["first"] + i, random.Random(rng.random()), job["accuracy"], job["think"], job["key_gap"])
+                for i in range(job["sessions"])]
+    for lr in learners: lr.start()
+    rss1 = _rss_bytes()
+
+    # Event queue: (due, order, learner index, kind); ticks every TICK_S, input on the learner's schedule
+    now = time.perf_counter(); events = []; order = 0
+    for i, lr in enumerate(learners):
+        heapq.heappush(events, (now + rng.uniform(0, tick), order, i, "tick")); order += 1
+        heapq.heappush(events, (now + lr.next_delay(), order, i, "input")); order += 1
+    end = now + job["seconds"]
+    lat, lag, script = [], [], []; counts = {"tick": 0, "input": 0}; errors = 0
+    cpu0 = time.process_time(); wall0 = time.perf_counter()
+
+    def rerun(lr, kind, due, t0):
+        lr.run()
+        lat.append((time.perf_counter() - t0) * 1000.0); counts[kind] += 1
+        ms = lr.script_ms()
+        if ms is not None: script.append(ms)
+        return 1 if lr.at.exception else 0
+
+    while events:
+        due, _, i, kind = heapq.heappop(events)
+        if due >= end: break
+        wait = due - time.perf_counter()
+        if wait > 0: time.sleep(wait)
+        lr = learners[i]
+        t0 = time.perf_counter(); lag.append((t0 - due) * 1000.0)
+        if kind == "tick":
+            if lr.overdue(): errors += rerun(lr, "input", due, t0); t0 = time.perf_counter()
+            errors += rerun(lr, "tick", due, t0)
+            nxt = max(due + tick, time.perf_counter())     # a late tick fires again as soon as possible (like run_every)
+        else:
+            if lr.act(): errors += rerun(lr, "input", due, t0)
+            nxt = time.perf_counter() + lr.next_delay()
+        heapq.heappush(events, (nxt, order, i, kind)); order += 1
+    wall = time.perf_counter() - wall0; cpu = time.process_time() - cpu0
+    return {"sessions": len(learners), "wall_s": wall, "cpu_s": cpu, "ticks": counts["tick"], "inputs": counts["input"],
+            "answers": sum(lr.answers for lr in learners), "errors": errors, "lat_ms": lat, "lag_ms": lag,
+            "script_ms": script, "rss_start": rss0, "rss_sessions": rss1, "rss_end": _rss_bytes(),
+            "questions": sum(lr.at.session_state["engine"].total_questions for lr in learners)}
+
+# ---------- Driver ----------
+def run(sessions: int, workers: int, seconds: float, accuracy: float, think: tuple, key_gap: tuple,
+        seed: int, headroom: float, mode: str = "runner") -> dict:
+    workers = max(1, min(workers, sessions))
+    share = [sessions // workers + (1 if w < sessions % workers else 0) for w in range(workers)]
+    jobs, first = [], 0
+    for w, n in enumerate(share):
+        jobs.append({"mode": mode, "sessions": n, "first": first, "seconds": seconds, "accuracy": accuracy,
+                     "think": think, "key_gap": key_gap, "seed": seed + w}); first += n
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_worker, jobs))
+
+    lat, lag, script = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for r in results:
+        for v in r["lat_ms"]: lat.record(v)
+        for v in r["lag_ms"]: lag.record(v)
+        for v in r["script_ms"]: script.record(v)
+    inputs = sum(r["inputs"] for r in results)
+    reruns = sum(r["ticks"] for r in results) + inputs
+    wall = max(r["wall_s"] for r in results); cpu = sum(r["cpu_s"] for r in results)
+    learner_s = sum(r["sessions"] * r["wall_s"] for r in results)
+    cpu_per_rerun = cpu / reruns if reruns else None
+    script_s = script.summary()["mean"] / 1000.0 if script.summary()["n"] else None
+    # Demand of one learner: a rerun per fragment tick plus one per input rerun at the observed
+    # rate (every keypress in keypad mode, every result sync in runner mode)
+    demand_rps = 1.0 / MODES[mode].TICK_S + (inputs / learner_s if learner_s else 0.0)
+    return {
+        "mode": mode, "sessions": sessions, "workers": workers, "seconds": round(wall, 2),
+        "reruns": reruns, "reruns_per_sec": round(reruns / wall, 1) if wall else None,
+        "input_reruns": inputs, "answers": sum(r["answers"] for r in results),
+        "questions": sum(r["questions"] for r in results), "errors": sum(r["errors"] for r in results),
+        "rerun_ms": lat.summary(), "script_ms": script.summary(), "schedule_lag_ms": lag.summary(),
+        "cpu_s": round(cpu, 2), "cpu_ms_per_rerun": round(cpu_per_rerun * 1000.0, 2) if cpu_per_rerun else None,
+        "rss_mb_per_session": round(sum(r["rss_sessions"] - r["rss_start"] for r in results) / sessions / 2**20, 2),
+        "rss_mb_worker_end": round(max(r["rss_end"] for r in results) / 2**20, 1),
+        "demand_reruns_per_learner_s": round(demand_rps, 2),
+        "learners_per_core": round(headroom / (script_s * demand_rps), 1) if script_s else None,
+        "learners_per_core_floor": round(headroom / (cpu_per_rerun * demand_rps), 1) if cpu_per_rerun else None,
+        "headroom": headroom,
+    }
+
+def _report(res: dict):
+    rm, sm, lg = res["rerun_ms"], res["script_ms"], res["schedule_lag_ms"]
+    inputs = "result syncs" if res["mode"] == "runner" else "keys"
+    print(f"{res['mode']} mode: {res['sessions']} learners on {res['workers']} worker(s) for {res['seconds']}s: "
+          f"{res['reruns']:,} reruns ({res['reruns_per_sec']}/s), {res['input_reruns']:,} {inputs}, "
+          f"{res['questions']:,} questions, {res['errors']} errors")
+    print(f"  rerun ms  p50 {rm['p50']}  p90 {rm['p90']}  p99 {rm['p99']}  max {rm['max']}  (AppTest run)")
+    print(f"  script ms p50 {sm['p50']}  p90 {sm['p90']}  p99 {sm['p99']}  max {sm['max']}  (app's own timer)")
+    print(f"  lag ms    p50 {lg['p50']}  p90 {lg['p90']}  p99 {lg['p99']}  (time behind schedule)")
+    print(f"  cpu {res['cpu_ms_per_rerun']} ms/rerun  rss {res['rss_mb_per_session']} MB/session  "
+          f"worker peak {res['rss_mb_worker_end']} MB")
+    print(f"  ≈ {res['learners_per_core']} learners per core (floor {res['learners_per_core_floor']} with harness "
+          f"overhead; {res['demand_reruns_per_learner_s']} reruns/s per learner, {int(res['headroom'] * 100)}% CPU)")
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Load-test the Streamlit app with concurrent simulated learners.")
+    ap.add_argument("-s", "--sessions", type=int, default=8, help="simulated learners in runner mode (the default)")
+    ap.add_argument("-k", "--keypad-sessions", type=int, default=None,
+                    help="learners for the secondary per-keypress (?runner=0) figure; default --sessions, 0 skips it")
+    ap.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    ap.add_argument("-t", "--seconds", type=float, default=20.0, help="measured duration of each mode")
+    ap.add_argument("--accuracy", type=float, default=0.8)
+    ap.add_argument("--think", type=float, nargs=2, default=(1.0, 4.0), metavar=("MIN", "MAX"),
+                    help="seconds before typing an answer")
+    ap.add_argument("--key-gap", type=float, nargs=2, default=(0.15, 0.35), metavar=("MIN", "MAX"),
+                    help="seconds between digits")
+    ap.add_argument("--headroom", type=float, default=0.7, help="CPU share a core may spend on learners")
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--min-learners-per-core", type=float, default=None,
+                    help="fail if runner-mode capacity is lower")
+    ap.add_argument("--json", action="store_true", help="print the result as one JSON object")
+    args = ap.parse_args(argv)
+    if not (ROOT / "keypad_component" / "index.html").exists():
+        print("keypad_component/index.html is missing: the keypad component paths cannot be exercised", file=sys.stderr)
+        return 2
+
+    common = (args.workers, args.seconds, args.accuracy, tuple(args.think), tuple(args.key_gap), args.seed, args.headroom)
+    res = run(args.sessions, *common, mode="runner")
+    keypad_sessions = args.sessions if args.keypad_sessions is None else args.keypad_sessions
+    if keypad_sessions > 0: res["keypad"] = run(keypad_sessions, *common, mode="keypad")
+    if args.json:
+        print(json.dumps(res))
+    else:
+        _report(res)
+        if "keypad" in res:
+            print("secondary, per-keypress fallback (?runner=0):")
+            _report(res["keypad"])
+    if args.min_learners_per_core is not None and (res["learners_per_core"] or 0) < args.min_learners_per_core:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
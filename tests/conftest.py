@@ -0,0 +1,36 @@
+# conftest.py — shared fixtures for the pytest suite. The app's modules live at the repo root
+# (as the benchmarks import them), so the root goes on sys.path first.
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tt_engine import SessionEngine  # noqa: E402
+
+class SimClock:
+    """Virtual monotonic clock; tests advance it instead of sleeping."""
+    def __init__(self): self.t = 0.0
+    def __call__(self) -> float: return self.t
+
+class GapRandom(random.Random):
+    """random.Random whose randint returns the queued repeat gaps, so splices land where a test says."""
+    def __init__(self, gaps=(), seed: int = 1):
+        super().__init__(seed); self.gaps = list(gaps)
+    def randint(self, a, b):
+        return self.gaps.pop(0) if self.gaps else super().randint(a, b)
+
+@pytest.fixture
+def clock() -> SimClock:
+    return SimClock()
+
+@pytest.fixture
+def make_engine(clock):
+    """SessionEngine factory on the test clock: make_engine(gaps=(...), **SessionEngine kwargs)."""
+    def make(gaps=(), seed: int = 1, **kw) -> SessionEngine:
+        kw.setdefault("total_seconds", 3600)
+        return SessionEngine(clock=clock, rng=GapRandom(gaps, seed), **kw)
+    return make
@@ -0,0 +1,143 @@
+# test_engine.py — SessionEngine: question selection, runner-mode repeat splicing, result scoring, snapshot and restore.
+
+from tt_engine import SNAPSHOT_FACTS, pack_fact
+
+def _facts(eng) -> list:
+    return [(a, b) for _, a, b in eng.issued]
+
+def _miss(eng, qid):
+    assert eng.apply_result(qid, None, 1.0)
+
+def test_runner_repeat_is_spliced_into_prefetched_questions(make_engine):
+    eng = make_engine(gaps=[3]); eng.start(runner=True)
+    (qid, a, b), *_ = eng.prefetch(8)
+    _miss(eng, qid)
+    assert _facts(eng)[2] == (a, b)                # third question after the miss, not after the prefetch
+    assert len(eng.issued) == 8 and (a, b) not in _facts(eng)[:2]
+    assert pack_fact(a, b) not in eng.repeats
+
+def test_repeat_beyond_the_prefetch_goes_on_the_heap(make_engine):
+    eng = make_engine(gaps=[4]); eng.start(runner=True)
+    (qid, a, b), = eng.prefetch(1)
+    eng.prefetch(3)                                   # three more outstanding behind it
+    _miss(eng, qid)
+    assert (a, b) not in _facts(eng)
+    assert eng.repeats.items() == [(pack_fact(a, b), 2)]
+    eng.prefetch(4)
+    assert _facts(eng)[3] == (a, b)
+
+def test_earlier_splice_keeps_its_place_and_wins_a_tie(make_engine):
+    eng = make_engine(gaps=[4, 3]); eng.start(runner=True)
+    first, second = eng.prefetch(8)[:2]
+    _miss(eng, first[0])                              # due 4th from now
+    _miss(eng, second[0])                             # due 3rd from now: same question as the first
+    facts = _facts(eng)
+    assert facts[2] == first[1:] and facts[3] == second[1:]
+
+def test_later_splice_does_not_push_an_earlier_one_back(make_engine):
+    eng = make_engine(gaps=[4, 2]); eng.start(runner=True)
+    first, second = eng.prefetch(8)[:2]
+    _miss(eng, first[0])                              # slot 4 after the first miss = slot 3 now
+    _miss(eng, second[0])                             # slot 2
+    facts = _facts(eng)
+    assert facts[1] == second[1:] and facts[2] == first[1:]
+
+def test_repeat_spliced_after_a_result_was_sent_is_asked_next(make_engine):
+    eng = make_engine(gaps=[2]); eng.start(runner=True)
+    q1, q2, q3 = eng.prefetch(8)[:3]
+    _miss(eng, q1[0])                                 # repeat lands between q2 and q3 ...
+    assert eng.apply_result(q2[0], q2[1] * q2[2], 1.0)
+    assert eng.apply_result(q3[0], q3[1] * q3[2], 1.0)   # ... but the client already answered q3
+    assert _facts(eng)[0] == q1[1:]
+
+def test_passed_over_spliced_repeat_is_requeued_not_lost(make_engine):
+    eng = make_engine(gaps=[2]); eng.start(runner=True)
+    q1, q2 = eng.prefetch(8)[:2]
+    _miss(eng, q1[0])
+    assert eng.apply_result(q2[0], q2[1] * q2[2], 1.0)
+    rep_qid = eng.issued[0][0]
+    assert eng.issued[0][1:] == q1[1:] and rep_qid in eng.spliced
+    last = eng.prefetch(8)[-1]
+    assert last[0] > rep_qid
+    assert eng.apply_result(last[0], last[1] * last[2], 1.0)   # skips everything before it
+    assert list(eng.issued) == [(rep_qid, *q1[1:])]              # fresh questions dropped, repeat kept
+    assert eng.sampler.is_banned(*q1[1:])
+    assert eng.apply_result(rep_qid, q1[1] * q1[2], 1.0)
+    assert not eng.sampler.is_banned(*q1[1:]) and not eng.spliced
+
+def test_apply_result_judges_the_answer_itself(make_engine):
+    eng = make_engine(per_q=10); eng.start(runner=True)
+    (qid, a, b), = eng.prefetch(1)
+    assert eng.apply_result(qid, a * b + 1, 1.0)     # a wrong answer is not taken as correct
+    assert eng.correct_questions == 0 and (a, b) in eng.missed_items
+    (qid, a, b), = eng.prefetch(1)
+    assert eng.apply_result(qid, a * b, 1.0)
+    assert eng.correct_questions == 1
+
+def test_apply_result_clamps_response_time(make_engine):
+    eng = make_engine(per_q=10); eng.start(runner=True)
+    (qid, a, b), = eng.prefetch(1)
+    eng.apply_result(qid, None, 3600.0)
+    (qid, a, b), = eng.prefetch(1)
+    eng.apply_result(qid, a * b, -5.0)
+    assert eng.total_time_spent == 10.0
+    assert [ms for ms in eng.events.ms] == [10000, 0]
+
+def test_apply_result_ignores_unknown_and_repeated_qids(make_engine):
+    eng = make_engine(); eng.start(runner=True)
+    (qid, a, b), = eng.prefetch(1)
+    assert not eng.apply_result(qid + 100, a * b, 1.0)
+    assert eng.apply_result(qid, a * b, 1.0)
+    assert not eng.apply_result(qid, a * b, 1.0)
+    assert eng.total_questions == 1
+
+def test_snapshot_keeps_only_the_most_recent_missed_facts(make_engine):
+    eng = make_engine(min_table=1, max_table=10000, total_seconds=1_000_000); eng.start(runner=True)
+    for _ in range(3 * SNAPSHOT_FACTS):
+        (qid, a, b), = eng.prefetch(1)
+        _miss(eng, qid)
+    (qid, a, b), = eng.prefetch(1)
+    while pack_fact(a, b) in eng.attempts_wrong:      # end on a first miss, so a repeat is pending
+        eng.apply_result(qid, a * b, 1.0); (qid, a, b), = eng.prefetch(1)
+    _miss(eng, qid)
+    snap = eng.snapshot()
+    for key in ("attempts_wrong", "wrong", "missed", "twice", "banned"):
+        assert len(snap[key]) <= SNAPSHOT_FACTS
+    assert snap["wrong"] == eng.wrong_attempt_items.packed()[-SNAPSHOT_FACTS:]
+    awaiting = [k for k, _ in eng.repeats.items()] + [pack_fact(a, b) for q, a, b in eng.issued if q in eng.spliced]
+    assert awaiting and set(awaiting) <= set(snap["banned"])     # repeats still wait for their turn
+
+def test_select_next_item_asks_revisits_then_due_repeats_then_draws(make_engine):
+    eng = make_engine(min_table=2, max_table=12); eng.start(revisit=[(3, 4), (5, 6)], runner=True)
+    eng.repeats.schedule(pack_fact(7, 8), 1); eng.sampler.ban(7, 8)
+    assert [eng.select_next_item(), eng.select_next_item()] == [(3, 4), (5, 6)]
+    assert eng.select_next_item() == (7, 8)           # due at the first question the scheduler counts
+    assert not eng.sampler.is_banned(7, 8)
+    a, b = eng.select_next_item()
+    assert 2 <= a <= 12 and 1 <= b <= 12
+
+def _played(make_engine, clock, n=40):
+    eng = make_engine(min_table=2, max_table=12, gaps=[2, 3, 4] * n); eng.start(runner=True, seed=42)
+    for i in range(n):
+        (qid, a, b), *_ = eng.prefetch(1)
+        clock.t += 1.5
+        assert eng.apply_result(qid, a * b if i % 3 else None, 1.5)
+    eng.prefetch(8)
+    return eng
+
+def test_snapshot_restore_round_trip(make_engine, clock):
+    eng = _played(make_engine, clock)
+    snap = eng.snapshot()
+    twin = make_engine(min_table=2, max_table=12, seed=99); twin.restore(snap)
+    again = twin.snapshot()
+    assert sorted(again.pop("banned")) == sorted(snap.pop("banned"))
+    assert again == snap
+    assert (twin.total_questions, twin.correct_questions) == (40, 26)
+    assert twin.wrong_attempt_items.packed() == eng.wrong_attempt_items.packed()
+
+def test_restored_session_asks_the_same_questions_next(make_engine, clock):
+    eng = _played(make_engine, clock)
+    twin = make_engine(min_table=2, max_table=12, seed=99); twin.restore(eng.snapshot())
+    outstanding = _facts(eng)
+    assert [(a, b) for _, a, b in twin.prefetch(8)] == outstanding     # prefetched questions first
+    assert [twin.select_next_item() for _ in range(20)] == [eng.select_next_item() for _ in range(20)]
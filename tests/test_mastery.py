@@ -0,0 +1,47 @@
+# test_mastery.py — MasteryModel: the compact to_bytes/from_bytes form.
+
+import struct
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from tt_mastery import MASTERY_VERSION, MasteryModel  # noqa: E402
+
+def _model() -> MasteryModel:
+    m = MasteryModel()
+    for day, (a, b, ok, rt) in enumerate([(2, 3, True, 1.5), (7, 8, False, 6.0), (7, 8, True, 4.2),
+                                          (12, 12, True, 2.0), (40, 5, False, 30.0)]):
+        m.observe(a, b, ok, rt); m.commit(20000 + day)
+    return m
+
+def test_round_trip_keeps_seen_facts_within_quantization():
+    m = _model()
+    back = MasteryModel.from_bytes(m.to_bytes())
+    assert back.rows == m.rows
+    seen = np.flatnonzero(m.n)
+    assert np.array_equal(np.flatnonzero(back.n), seen)
+    assert np.array_equal(back.n[seen], m.n[seen])
+    assert np.array_equal(back.last[seen], m.last[seen])
+    assert np.allclose(back.acc[seen], m.acc[seen], atol=1 / 255)
+    assert np.allclose(back.lat[seen], np.minimum(m.lat[seen], 25.5), atol=0.05)   # deciseconds, capped
+
+def test_limit_keeps_the_most_recently_seen():
+    m = _model()
+    back = MasteryModel.from_bytes(m.to_bytes(limit=2))
+    assert [divmod(int(i), 12) for i in np.flatnonzero(back.n)] == [(11, 11), (39, 4)]   # 12×12 and 40×5
+
+def test_empty_model_round_trips():
+    back = MasteryModel.from_bytes(MasteryModel().to_bytes())
+    assert back.rows == 12 and not back.n.any()
+
+def test_weights_survive_the_round_trip():
+    m = _model()
+    ids, w = m.weights(2, 12, 20010)
+    ids2, w2 = MasteryModel.from_bytes(m.to_bytes()).weights(2, 12, 20010)
+    assert np.array_equal(ids, ids2) and np.allclose(w, w2, atol=0.02)
+
+def test_unknown_version_is_rejected():
+    blob = bytearray(_model().to_bytes()); struct.pack_into("<B", blob, 0, MASTERY_VERSION + 1)
+    with pytest.raises(ValueError):
+        MasteryModel.from_bytes(bytes(blob))
@@ -0,0 +1,76 @@
+# test_persist.py — tt_persist: the one-cookie state token, v1 migration and the mastery token.
+
+import base64
+import json
+
+import pytest
+
+from tt_persist import (MASTERY_TOKEN_VERSION, PERSIST_VERSION, _frame, _put_str, _put_uint, decode_mastery,
+                        decode_state, empty_state, encode_mastery, encode_state, state_from_v1)
+
+def _state() -> dict:
+    state = empty_state()
+    state["settings"] = {"user": "ann", "min_table": 3, "max_table": 14, "per_q": 9, "minutes": 2}
+    state["streak"] = {"last": "2026-10-15", "count": 4}
+    state["history"] = [{"t": f"2026-10-{d:02d}T10:0{d % 10}:00+00:00", "pct": 50 + d, "avg": 3.25, "q": 10 + d}
+                        for d in range(1, 13)]
+    state["revisit"] = {"v": 1, "min": 3, "max": 14, "items": [[3, 7], [4, 8], [14, 12]]}
+    return state
+
+def test_state_round_trip():
+    state = _state()
+    back = decode_state(encode_state(state))
+    assert back["settings"] == state["settings"]
+    assert back["streak"] == state["streak"]
+    assert back["history"] == state["history"][-10:]               # HISTORY_KEEP most recent
+    assert back["revisit"] == state["revisit"]
+    assert back["mastery"] is None
+
+def test_empty_state_round_trip():
+    assert decode_state(encode_state(empty_state())) == empty_state()
+
+def test_v1_cookies_migrate():
+    state = state_from_v1(
+        json.dumps({"user": "ann", "min_table": "3", "max_table": 4, "per_q": 9, "minutes": 2}),
+        json.dumps({"v": 1, "items": [{"t": "2026-10-14T10:00:00+00:00", "pct": 50, "avg": 3.2, "q": 10},
+                                      {"t": "2026-10-15T10:00:00+00:00", "pct": "x"}]}),
+        json.dumps({"last": "2026-10-15", "count": 4}),
+        json.dumps({"v": 1, "min": 3, "max": 4, "items": [[3, 7], ["4", 8], ["bad"]]}))
+    assert state["settings"] == {"user": "ann", "min_table": 3, "max_table": 4, "per_q": 9, "minutes": 2}
+    assert state["history"] == [{"t": "2026-10-14T10:00:00+00:00", "pct": 50, "avg": 3.2, "q": 10}]
+    assert state["streak"] == {"last": "2026-10-15", "count": 4}
+    assert state["revisit"]["items"] == [[3, 7], [4, 8]]
+    assert decode_state(encode_state(state))["revisit"] == state["revisit"]
+
+def test_v1_corrupt_or_missing_cookies_give_defaults():
+    assert state_from_v1("{not json", None, "[]", "") == empty_state()
+
+def test_older_state_token_with_mastery_still_reads():
+    body = bytearray(); _put_uint(body, 8); _put_uint(body, 0)     # _HAS_MASTERY only, no history
+    _put_str(body, "ann"); _put_uint(body, 3); body += b"\x01\x02\x03"
+    assert decode_state(_frame(PERSIST_VERSION, bytes(body)))["mastery"] == {"user": "ann", "blob": b"\x01\x02\x03"}
+
+def _raw(token: str) -> bytes:
+    return base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+
+def _tok(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+@pytest.mark.parametrize("token", ["", "!!!not base64!!!", _tok(bytes([PERSIST_VERSION])), _tok(bytes([9, 0])),
+                                   _tok(bytes([PERSIST_VERSION | 0x80]) + b"\xff\xff")])
+def test_malformed_state_tokens_are_rejected(token):
+    with pytest.raises(ValueError):
+        decode_state(token)
+
+def test_truncated_state_token_is_rejected():
+    raw = _raw(encode_state(_state()))
+    with pytest.raises(ValueError):
+        decode_state(_tok(raw[:len(raw) // 2]))
+
+def test_mastery_token_round_trip_and_rejection():
+    blob = bytes(range(256)) * 2
+    assert decode_mastery(encode_mastery("ann", blob)) == {"user": "ann", "blob": blob}
+    with pytest.raises(ValueError):
+        decode_mastery(encode_state(_state()))                        # a state token: another version
+    with pytest.raises(ValueError):
+        decode_mastery(_tok(bytes([MASTERY_TOKEN_VERSION, 0x7f])))   # name longer than the token
@@ -0,0 +1,97 @@
+# test_qr.py — tt_qr: generated codes read back to their text. A small reader written from the
+# standard (format bits, unmasking, zigzag placement, block interleaving, Reed–Solomon syndromes,
+# byte mode) checks every level and mask; OpenCV's detector, when installed, reads the Assign link.
+
+import re
+
+import pytest
+
+import tt_qr
+from tt_qr import qr_matrix, qr_png, qr_svg
+
+LINK = "https://times-tables-from-chalkface.streamlit.app/?user=ann&min=2&max=12&minutes=5&per_q=9&seed=424242"
+TEXTS = ["7", "HELLO", LINK, "×÷ times tables ✓", LINK * 3]
+_LEVEL_BY_BITS = {v[0]: k for k, v in tt_qr._ECC_LEVELS.items()}
+
+class _Block(list):
+    """One RS block's codewords, data first."""
+    n_data = 0
+
+def _syndromes_zero(block) -> bool:
+    """A codeword block is valid iff it vanishes at α^0..α^(n_ecc - 1)."""
+    n_ecc = len(block) - block.n_data
+    for i in range(n_ecc):
+        s = 0
+        for w in block: s = tt_qr._gf_mul(s, tt_qr._EXP[i]) ^ w
+        if s: return False
+    return True
+
+def read(grid) -> tuple[str, str, int]:
+    """(text, level, mask) of a module grid."""
+    size = len(grid); ver = (size - 17) // 4
+    cells = [(8, i) for i in range(6)] + [(8, 7), (8, 8), (7, 8)] + [(14 - i, 8) for i in range(9, 15)]
+    fmt = sum(1 << i for i, (x, y) in enumerate(cells) if grid[y][x]) ^ 0x5412
+    level, mask = _LEVEL_BY_BITS[fmt >> 13], (fmt >> 10) & 7
+    fixed = tt_qr._Matrix(ver); tt_qr._draw_function_patterns(fixed, ver)
+    flip = tt_qr._MASKS[mask]
+    bits = []
+    right = size - 1
+    while right >= 1:                                  # two-module columns, snaking up and down
+        if right == 6: right = 5
+        rows = range(size - 1, -1, -1) if ((right + 1) & 2) == 0 else range(size)
+        for y in rows:
+            for x in (right, right - 1):
+                if not fixed.fixed[y][x]: bits.append(grid[y][x] ^ flip(x, y))
+        right -= 2
+    raw = tt_qr._raw_modules(ver) // 8
+    words = [int("".join("1" if b else "0" for b in bits[i:i + 8]), 2) for i in range(0, raw * 8, 8)]
+    _, ecc, blocks = tt_qr._ECC_LEVELS[level]
+    n_blocks, n_ecc = blocks[ver], ecc[ver]
+    n_short = n_blocks - raw % n_blocks
+    data_len = [raw // n_blocks - n_ecc + (i >= n_short) for i in range(n_blocks)]
+    out = [_Block() for _ in range(n_blocks)]; k = 0
+    for i in range(max(data_len)):                     # data codewords, interleaved
+        for j, blk in enumerate(out):
+            if i < data_len[j]: blk.append(words[k]); k += 1
+    for blk in out: blk.n_data = len(blk)
+    for _ in range(n_ecc):                             # then ECC codewords, interleaved
+        for blk in out: blk.append(words[k]); k += 1
+    assert all(_syndromes_zero(blk) for blk in out)
+    stream = "".join(format(w, "08b") for blk in out for w in blk[:blk.n_data])
+    assert stream[:4] == "0100"                        # byte mode
+    count = 8 if ver <= 9 else 16
+    n = int(stream[4:4 + count], 2); p = 4 + count
+    return bytes(int(stream[p + 8 * i:p + 8 * i + 8], 2) for i in range(n)).decode("utf-8"), level, mask
+
+@pytest.mark.parametrize("level", "LMQH")
+@pytest.mark.parametrize("text", TEXTS)
+def test_every_mask_reads_back(text, level):
+    for mask in range(8):
+        assert read(qr_matrix(text, level, mask)) == (text, level, mask)
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_smallest_version_and_automatic_mask(text):
+    grid = qr_matrix(text)
+    assert read(grid)[0] == text
+    ver = (len(grid) - 17) // 4
+    if ver > 1:                                        # one version smaller would not hold it
+        count = 8 if ver - 1 <= 9 else 16
+        assert 4 + count + 8 * len(text.encode()) > 8 * tt_qr._data_codewords(ver - 1, "M")
+
+def test_svg_draws_every_dark_module():
+    grid = qr_matrix(LINK)
+    runs = re.findall(r"M(\d+),(\d+)h(\d+)", qr_svg(LINK))
+    assert sum(int(w) for _, _, w in runs) == sum(map(sum, grid))
+
+def test_bad_level_and_oversized_text_are_rejected():
+    with pytest.raises(ValueError):
+        qr_matrix(LINK, "X")
+    with pytest.raises(ValueError):
+        qr_matrix("x" * 3000, "H")
+
+def test_assign_link_png_scans():
+    np = pytest.importorskip("numpy")
+    cv2 = pytest.importorskip("cv2")
+    img = cv2.imdecode(np.frombuffer(qr_png(LINK), np.uint8), cv2.IMREAD_GRAYSCALE)
+    text, points, _ = cv2.QRCodeDetector().detectAndDecode(img)
+    assert points is not None and text == LINK
@@ -0,0 +1,53 @@
+# test_results.py — ResultAggregator: incremental folding and its JSON checkpoint.
+
+import json
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from tt_results import ResultAggregator, ResultSink, result_record  # noqa: E402
+
+def _write(path, n, start=0):
+    sink = ResultSink(str(path))
+    for i in range(start, start + n):
+        user = "2024" if i % 7 == 0 else f"u{i % 5}"             # a numeric-looking name stays a string
+        sink.append(result_record(user, f"s{i}", 2, 12, 6, 3, 20, i % 21, 60.0, [(3, 4)] * (i % 3),
+                                  [(7, 8)] if i % 4 == 0 else [], ts=1.7e9 + i))
+
+def test_checkpoint_round_trip(tmp_path):
+    path = tmp_path / "results.jsonl"
+    _write(path, 300)
+    agg = ResultAggregator(str(path)); agg.refresh()
+    again = ResultAggregator(str(path))                              # resumes from <path>.agg
+    assert (again.records, again.offset) == (300, agg.offset)
+    pd.testing.assert_frame_equal(again.learners(), agg.learners())
+    pd.testing.assert_frame_equal(again.facts(), agg.facts())
+    assert "2024" in again.learners().index
+    json.loads((tmp_path / "results.jsonl.agg").read_text())        # plain JSON, no pickle
+
+def test_resumed_aggregator_folds_only_new_lines(tmp_path):
+    path = tmp_path / "results.jsonl"
+    _write(path, 100)
+    ResultAggregator(str(path)).refresh()
+    _write(path, 50, start=100)
+    resumed = ResultAggregator(str(path))
+    assert resumed.refresh() == 50
+    fresh = ResultAggregator(str(path), checkpoint=False); fresh.refresh()
+    pd.testing.assert_frame_equal(resumed.learners().sort_index(), fresh.learners().sort_index())
+
+def test_unreadable_checkpoint_is_ignored(tmp_path):
+    path = tmp_path / "results.jsonl"
+    _write(path, 10)
+    (tmp_path / "results.jsonl.agg").write_bytes(b"\x80\x04not json")
+    agg = ResultAggregator(str(path))
+    assert agg.records == 0 and agg.refresh() == 10
+
+def test_refresh_steps_are_bounded(tmp_path):
+    path = tmp_path / "results.jsonl"
+    _write(path, 200)
+    agg = ResultAggregator(str(path), checkpoint=False)
+    steps = 0
+    while agg.pending_bytes:
+        agg.refresh(max_bytes=4096); steps += 1
+    assert agg.records == 200 and steps > 5
@@ -0,0 +1,51 @@
+# test_resume.py — tt_resume: signed snapshot tokens (signature, expiry) and the in-process store.
+
+import pytest
+
+from tt_resume import RESUME_TTL_S, SnapshotStore, decode_snapshot, encode_snapshot
+
+KEY = b"k" * 32
+WALL = 1_800_000_000
+
+def _snap(make_engine, clock) -> dict:
+    eng = make_engine(min_table=2, max_table=12); eng.start(runner=True, seed=7)
+    for i in range(12):
+        (qid, a, b), *_ = eng.prefetch(1)
+        clock.t += 2.0
+        eng.apply_result(qid, a * b if i % 2 else None, 2.0)
+    eng.prefetch(4)
+    return eng.snapshot()
+
+def test_token_round_trip(make_engine, clock):
+    snap = _snap(make_engine, clock)
+    back = decode_snapshot(encode_snapshot(snap, KEY, "ann", "s1", wall=WALL), KEY, now=WALL + 60)
+    assert (back.pop("user"), back.pop("session_id"), back.pop("wall")) == ("ann", "s1", WALL)
+    assert back == {**snap, "repeats": [tuple(p) for p in snap["repeats"]],
+                    "attempts_wrong": [tuple(p) for p in snap["attempts_wrong"]]}
+
+def test_tampered_or_foreign_token_is_rejected(make_engine, clock):
+    token = encode_snapshot(_snap(make_engine, clock), KEY, "ann", "s1", wall=WALL)
+    flipped = token[:20] + ("A" if token[20] != "A" else "B") + token[21:]
+    for bad, key in ((flipped, KEY), (token, b"x" * 32), (token[:-4], KEY)):
+        with pytest.raises(ValueError, match="signature"):
+            decode_snapshot(bad, key, now=WALL)
+
+def test_malformed_token_is_rejected():
+    for bad in ("", "!!", "AAAA"):
+        with pytest.raises(ValueError):
+            decode_snapshot(bad, KEY, now=WALL)
+
+def test_expired_token_is_rejected(make_engine, clock):
+    token = encode_snapshot(_snap(make_engine, clock), KEY, "ann", "s1", wall=WALL)
+    assert decode_snapshot(token, KEY, now=WALL + RESUME_TTL_S)["user"] == "ann"
+    with pytest.raises(ValueError, match="expired"):
+        decode_snapshot(token, KEY, now=WALL + RESUME_TTL_S + 1)
+    with pytest.raises(ValueError, match="expired"):
+        decode_snapshot(token, KEY, max_age_s=10, now=WALL + 11)
+
+def test_store_drops_the_least_recently_written():
+    store = SnapshotStore(max_entries=2)
+    store.put("a", "1"); store.put("b", "2"); store.put("a", "3"); store.put("c", "4")
+    assert (store.get("a"), store.get("b"), store.get("c"), len(store)) == ("3", None, "4", 2)
+    store.pop("a"); store.pop("missing")
+    assert store.get("a") is None and len(store) == 1
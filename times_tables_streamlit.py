@@ -1,30 +1,55 @@
 # times_tables_streamlit.py — mobile-first, 3 screens (Start → Practice → Results) + Assign helper
 # Features: Numeric keypad (custom or fallback), auto-submit, spaced repetition,
-# Discord webhook, cookies (settings, history, streak, revisit), adaptive timing,
+# Discord webhook, cookie (settings, history, streak, revisit), adaptive timing,
 # URL-parameter bootstrap for initial settings, Assign page with sharable link + QR.
-# Version: v1.31.0
+# Version: v1.54.0
 #
-# v1.31.0:
-# - Dark-mode contrast fix for Results KPI tiles (value/label/border/background) using theme-aware CSS vars.
+# v1.54.0:
+# - Lossless keypad: the component keeps unacknowledged presses in an ordered buffer and sends
+#   the whole batch; the server applies every key after last_kp_seq in order (auto-submit checked
+#   per key) and the render's ack trims the buffer, so digits typed during a rerun are not lost.
 
 import os
-import time
 import json
-import random
+import time
+import functools
+import hmac
+import hashlib
+from html import escape
+import uuid
+import secrets
 import logging
 from datetime import datetime, timedelta, timezone, date
 from pathlib import Path
 import warnings
 from urllib.parse import urlencode
+from typing import TYPE_CHECKING
 
-import requests
 import streamlit as st
-import pandas as pd
-import altair as alt
-from streamlit.components.v1 import declare_component, html as st_html
+from streamlit.errors import StreamlitAPIException
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from streamlit_cookies_manager import EncryptedCookieManager  # robust cookies
 
-APP_VERSION = "v1.31.0"
+from tt_engine import SessionEngine, MIN_PER_Q, MAX_PER_Q, OK_FLASH_S, SHAKE_S, SEED_MAX, clamp_per_q
+from tt_latency import LatencyRecorder
+from tt_profile import RerunProfiler, PayloadMeter, NULL_PROFILER
+from tt_sparkline import sparkline_svg
+from tt_qr import qr_svg, qr_png
+from tt_components import keypad_component, asset_component, static_css
+from tt_results import ResultSink, ResultAggregator, result_record
+from tt_resume import encode_snapshot, decode_snapshot, process_store
+from tt_persist import PersistedState, decode_state, state_from_v1, norm_settings, HISTORY_KEEP
+from tt_persist import encode_mastery, decode_mastery, MASTERY_TOKEN_BUDGET
+
+# Imported where first used, so the Start screen's first paint never waits for numpy, requests,
+# sqlite3 or the roster tooling: tt_mastery, tt_dispatch, tt_store, tt_roster.
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+    from tt_dispatch import WebhookDispatcher
+    from tt_mastery import MasteryModel
+    from tt_store import AttemptStore
+
+APP_VERSION = "v1.54.0"
 DEFAULT_BASE_URL = "https://times-tables-from-chalkface.streamlit.app/"
 
 # Note on st.cache deprecation: this script does NOT use st.cache.
@@ -55,6 +80,39 @@ def _secret_webhook() -> str | None:
     except Exception:
         return None
 
+def _attempts_db_path() -> str | None:
+    """Optional SQLite path for the per-attempt store (env TTT_ATTEMPTS_DB or secrets attempts_db)."""
+    v = os.getenv("TTT_ATTEMPTS_DB")
+    if v: return v
+    try:
+        v = st.secrets.get("attempts_db")
+        if v: return str(v)
+    except Exception:
+        pass
+    return None
+
+def _results_jsonl_path() -> str | None:
+    """Optional JSONL path for structured session results (env TTT_RESULTS_JSONL or secrets results_jsonl)."""
+    v = os.getenv("TTT_RESULTS_JSONL")
+    if v: return v
+    try:
+        v = st.secrets.get("results_jsonl")
+        if v: return str(v)
+    except Exception:
+        pass
+    return None
+
+def _dashboard_key() -> str | None:
+    """Optional key the dashboard URL must carry as ?key= (env TTT_DASHBOARD_KEY or secrets dashboard_key)."""
+    v = os.getenv("TTT_DASHBOARD_KEY")
+    if v: return v
+    try:
+        v = st.secrets.get("dashboard_key")
+        if v: return str(v)
+    except Exception:
+        pass
+    return None
+
 def _public_base_url() -> str | None:
     try:
         v = st.secrets.get("public_base_url")
@@ -68,7 +126,20 @@ def _public_base_url() -> str | None:
         pass
     return None
 
+def _request_base_url() -> str | None:
+    """App URL as the browser reached it (Host / X-Forwarded-Proto headers), if available."""
+    try:
+        headers = st.context.headers
+        host = headers.get("X-Forwarded-Host") or headers.get("Host")
+        if not host: return None
+        proto = headers.get("X-Forwarded-Proto") or ("http" if host.startswith(("localhost", "127.")) else "https")
+        path = (st.get_option("server.baseUrlPath") or "").strip("/")
+        return f"{proto}://{host}/" + (f"{path}/" if path else "")
+    except Exception:
+        return None
+
 # ---------------- Page config + compact CSS ----------------
+_T0 = time.perf_counter()   # rerun start, for ?profile=1
 st.set_page_config(page_title="Times Tables Trainer", page_icon="✳️",
                    layout="centered", initial_sidebar_state="collapsed")
 
@@ -85,110 +156,80 @@ def _qp_scalar(name: str):
     return v
 
 DEBUG = str(_qp_scalar("debug") or "0").lower() in ("1", "true", "yes")
+PROFILE = str(_qp_scalar("profile") or "0").lower() in ("1", "true", "yes")
+METER = str(_qp_scalar("bytes") or "0").lower() in ("1", "true", "yes")
 
-if not DEBUG:
-    st.markdown("""
-    <style>
-      div[data-testid="stToolbar"], div[data-testid="stDecoration"], header, footer, #MainMenu { display: none !important; }
-    </style>
-    """, unsafe_allow_html=True)
-
-# ---- GLOBAL STYLES (light/dark aware) ----
-st.markdown("""
-<style>
-  /* Layout tightening + bottom padding to clear fixed session bar */
-  .block-container{ max-width: 480px !important; padding: 4px 8px 72px !important; }
-  [data-testid="stVerticalBlock"]{ gap: 6px !important; }
-  .element-container{ padding-top: 0.1rem !important; padding-bottom: 0.1rem !important; }
-
-  /* Base tokens (light theme defaults) */
-  :root{
-    --bg:#ffffff;
-    --fg:#0f172a;         /* slate-900 */
-    --muted:#64748b;      /* slate-500 */
-    --blue:#2563eb; --blue2:#60a5fa;
-    --ok-bg:#ecfdf5; --ok-bd:#16a34a; --ok-fg:#065f46;
-    --bad-bg:#fef2f2; --bad-bd:#dc2626; --bad-fg:#7f1d1d;
-    --slate-bd:#cbd5e1;   /* light border */
-
-    --amber:#f59e0b; --amber2:#fbbf24;
-
-    /* KPI variables (Results tiles) — LIGHT */
-    --kpi-bg:#ffffff;
-    --kpi-bd:#cbd5e1;
-    --kpi-v:#0f172a;      /* value text */
-    --kpi-l:#64748b;      /* label text */
-
-    /* Caption */
-    --mini:#64748b;
-  }
-
-  /* Dark theme overrides for good contrast */
-  @media (prefers-color-scheme: dark){
-    :root{
-      --bg:#0b1220;
-      --fg:#e5e7eb;       /* slate-200 */
-      --muted:#94a3b8;    /* slate-400 */
-      --slate-bd:#334155; /* darker border */
-
-      /* KPI variables — DARK (higher contrast on dark bg) */
-      --kpi-bg:#0f172a;   /* panel bg */
-      --kpi-bd:#334155;   /* border */
-      --kpi-v:#e5e7eb;    /* value */
-      --kpi-l:#a8b1bb;    /* label */
-
-      --mini:#94a3b8;     /* captions */
-    }
-  }
-
-  /* Tiny titlebar (minimise top whitespace) */
-  .tt-title{ font-weight:700; font-size:1rem; margin:2px 0 2px; color: var(--fg); }
-
-  /* Practice prompt + answer */
-  .tt-prompt h1 { font-size: clamp(40px, 15vw, 80px); line-height: 1; margin: 0px 0 2px; text-align:center; color: var(--fg); }
-  @media (max-width: 420px){ .tt-prompt h1{ font-size: clamp(36px, 14vw, 64px); } }
-  .answer-display{ font-size:1.6rem; font-weight:700; text-align:center; padding:.24rem .5rem; border:2px solid var(--slate-bd); border-radius:.6rem; background:#ffffff; margin:2px 0 2px; color:#111827; }
-  .answer-display.ok{ background:var(--ok-bg); border:3px dashed var(--ok-bd); color:var(--ok-fg); }
-  .answer-display.bad{ background:var(--bad-bg); border:3px solid var(--bad-bd); color:var(--bad-fg); }
-
-  /* Buttons */
-  .stButton>button[kind="primary"]{ background:var(--blue) !important; color:#ffffff !important; border:none !important; font-weight:700; width:100%; min-height:44px; }
-  .stButton>button{ min-height:40px; width:100%; }
-
-  /* Bars */
-  .barwrap{ background:#e5e7eb; border:1px solid var(--slate-bd); border-radius:10px; height:6px; overflow:hidden; }
-  .barlabel{ display:flex; justify-content:space-between; font-size:.78rem; color:var(--muted); margin:0 2px 2px; }
-  .barfill-q{ background:linear-gradient(90deg, var(--amber), var(--amber2)); height:100%; width:0%; transition:width .12s linear; }
-  .barfill-s{ background:linear-gradient(90deg, var(--blue), var(--blue2)); height:100%; width:0%; transition:width .12s linear; }
-
-  /* Fixed session bar (centred to content width) */
-  .fixed-bottom{ position: fixed; left: 0; right: 0; bottom: 0; background: var(--bg); z-index: 1000; border-top:1px solid var(--slate-bd); }
-  .fixed-bottom .inner{ max-width: 480px; margin: 0 auto; padding: 4px 8px 6px; }
-
-  /* Results — KPI tiles use theme variables for contrast */
-  .kpi-grid{display:grid;grid-template-columns:repeat(2,1fr);gap:6px;margin:4px 0;}
-  .kpi{border:1px solid var(--kpi-bd);border-radius:8px;padding:6px 8px;background:var(--kpi-bg)}
-  .kpi .v{font-weight:700;font-size:1.05rem;line-height:1;color:var(--kpi-v)}
-  .kpi .l{font-size:.78rem;color:var(--kpi-l);margin-top:2px}
-  @media (max-width:360px){.kpi .v{font-size:1rem}}
-
-  .mini-caption{ font-size: 0.78rem; color: var(--mini); margin-top: 6px; } /* captions/legends */
-</style>
-""", unsafe_allow_html=True)
+def _profiler():
+    """This session's rerun profiler (a no-op unless ?profile=1)."""
+    if not PROFILE: return NULL_PROFILER
+    ss = st.session_state
+    if "profiler" not in ss:
+        ss.profiler = RerunProfiler(snapshot_dir=os.getenv("TTT_PROFILE_DIR") or None,
+                                    slow_ms=float(os.getenv("TTT_PROFILE_SLOW_MS", "250") or 250))
+    return ss.profiler
+
+def _meter():
+    """This session's payload meter (a no-op unless ?bytes=1); TTT_RERUN_BYTES_BUDGET sets a budget."""
+    if not METER: return NULL_PROFILER
+    ss = st.session_state
+    if "payload_meter" not in ss:
+        budget = os.getenv("TTT_RERUN_BYTES_BUDGET")
+        ss.payload_meter = PayloadMeter(budget=int(budget) if budget else None)
+    meter = ss.payload_meter
+    meter.attach(get_script_run_ctx())
+    return meter
+
+def _profiled(fn):
+    """Time and meter a fragment's own reruns; inside a full rerun it is measured by _render."""
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        prof = _profiler(); own = prof.begin(f"fragment:{fn.__name__}")
+        meter = _meter(); metered = meter.begin("fragment")
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if own: prof.mark(fn.__name__); prof.finish()
+            if metered: meter.finish(st.session_state.get("screen", "?"))
+    return run
+
+_prof = _profiler()
+_prof.begin("full", t0=_T0)
+_meter().begin("full")
+
+# ---- Static assets: tt.css linked into the page once, not resent on every rerun ----
+HIDE_CHROME_CSS = 'div[data-testid="stToolbar"], div[data-testid="stDecoration"], header, footer, #MainMenu { display: none !important; }'
+_assets = asset_component()
+
+def _inject_static_css():
+    """Link tt.css via the asset component; inline it when the component is missing or blocked."""
+    if _assets is not None and st.session_state.get("tt_assets") != "blocked":
+        _assets(hide_chrome=not DEBUG, default=None, key="tt_assets")
+    else:
+        st.markdown(f"<style>{'' if DEBUG else HIDE_CHROME_CSS}{static_css()}</style>", unsafe_allow_html=True)
+
+_inject_static_css()
+_prof.mark("page_config_css")
 
 # ---------------- Cookies ----------------
 COOKIE_PREFIX = "ttt/"
+COOKIE_STATE_KEY = "s"           # v2: settings+history+streak+revisit in one tt_persist token
+COOKIE_RESUME_KEY = "r"          # resume id of the running session (tt_resume); removed at its end
+COOKIE_MASTERY_KEY = "m"         # tt_persist.encode_mastery token, at most MASTERY_TOKEN_BUDGET chars
+COOKIE_PASSWORD = os.environ.get("COOKIES_PASSWORD", os.environ.get("COOKIE_PASSWORD", "insecure-dev-cookie-key"))
+# v1 cookies (separate JSON values) — read once for migration, removed on the next save
 COOKIE_SETTINGS_KEY = "settings"
 COOKIE_HISTORY_KEY = "history"
 COOKIE_STREAK_KEY = "streak"
 COOKIE_REVISIT_KEY = "revisit"   # {"v":1,"min":int,"max":int,"items":[[a,b],...]}
+LEGACY_COOKIE_KEYS = (COOKIE_SETTINGS_KEY, COOKIE_HISTORY_KEY, COOKIE_STREAK_KEY, COOKIE_REVISIT_KEY)
 
 cookies = EncryptedCookieManager(
     prefix=COOKIE_PREFIX,
-    password=os.environ.get("COOKIES_PASSWORD", os.environ.get("COOKIE_PASSWORD", "insecure-dev-cookie-key")),
+    password=COOKIE_PASSWORD,
 )
 if not cookies.ready():
     st.stop()
+_prof.mark("cookies")
 
 def _cookies_set(key: str, value: str | None):
     if value is None:
@@ -198,27 +239,40 @@ def _cookies_set(key: str, value: str | None):
         cookies[key] = value
 
 def _cookies_flush():
+    _persist_write_back()
     try: cookies.save()
     except Exception as e: logger.warning("Cookie flush failed: %s", e)
 
+# ---------- Persisted state (single cookie, decoded once per browser session) ----------
+def _persist_read_cookie() -> PersistedState:
+    raw = cookies.get(COOKIE_STATE_KEY)
+    if raw:
+        try: return PersistedState.from_dict(decode_state(raw))
+        except ValueError as e: logger.warning("State cookie unreadable, falling back to v1: %s", e)
+    legacy = [cookies.get(k) for k in LEGACY_COOKIE_KEYS]
+    # Migrate: a v1 cookie present means the next flush must write v2 and drop the old ones
+    return PersistedState.from_dict(state_from_v1(*legacy), dirty=any(legacy))
+
+def _persist() -> PersistedState:
+    ss = st.session_state
+    if "persist" not in ss: ss.persist = _persist_read_cookie()
+    return ss.persist
+
+def _persist_write_back():
+    """Encode + set the state cookie only if something changed since the last write."""
+    p = _persist()
+    if not p.dirty: return
+    _cookies_set(COOKIE_STATE_KEY, p.encode())
+    for k in LEGACY_COOKIE_KEYS:
+        if cookies.get(k) is not None: _cookies_set(k, None)
+    p.dirty = False
+
 # ---------- History ----------
 def _history_load() -> dict:
-    raw = cookies.get(COOKIE_HISTORY_KEY)
-    if not raw: return {"v": 1, "items": []}
-    try:
-        data = json.loads(raw); items = data.get("items") or []
-        clean = []
-        for it in items:
-            try:
-                clean.append({"t": str(it.get("t")), "pct": int(it.get("pct", 0)),
-                              "avg": float(it.get("avg", 0.0)), "q": int(it.get("q", 0))})
-            except Exception: continue
-        return {"v": 1, "items": clean}
-    except Exception:
-        return {"v": 1, "items": []}
+    return {"v": 1, "items": _persist().history}
 
 def _history_save(data: dict):
-    _cookies_set(COOKIE_HISTORY_KEY, json.dumps(data, separators=(",", ":")))
+    p = _persist(); p.history = data["items"]; p.touch()
 
 def _history_append_session(pct: int, avg: float, q: int):
     data = _history_load()
@@ -227,12 +281,13 @@ def _history_append_session(pct: int, avg: float, q: int):
     def _key(it):
         try: return datetime.fromisoformat(it["t"].replace("Z",""))
         except Exception: return datetime.min.replace(tzinfo=timezone.utc)
-    data["items"] = sorted(data["items"], key=_key)[-10:]
+    data["items"] = sorted(data["items"], key=_key)[-HISTORY_KEEP:]
     _history_save(data)
 
-def _history_for_last_10_days() -> pd.DataFrame:
+def _history_for_last_10_days() -> list[dict]:
+    """Up to 10 sessions from the last 10 days, oldest first: {"when", "label", "pct", "avg"}."""
     data = _history_load(); items = data["items"]
-    if not items: return pd.DataFrame(columns=["when","pct","avg"])
+    if not items: return []
     now = datetime.now(timezone.utc); cutoff = now - timedelta(days=10)
     rows=[]
     for it in items:
@@ -242,23 +297,52 @@ def _history_for_last_10_days() -> pd.DataFrame:
         except Exception: continue
         if ts >= cutoff: rows.append({"when": ts, "pct": int(it["pct"]), "avg": float(it["avg"])})
     rows = sorted(rows, key=lambda r: r["when"])[-10:]
-    if not rows: return pd.DataFrame(columns=["when","pct","avg"])
-    df = pd.DataFrame(rows)
-    try: df["label"] = df["when"].dt.tz_convert("UTC").dt.strftime("%d %b")
-    except Exception: df["label"] = df["when"].dt.strftime("%d %b")
-    return df
+    for r in rows: r["label"] = r["when"].astimezone(timezone.utc).strftime("%d %b")
+    return rows
+
+# ---------- Mastery (per-fact model, persisted per user) ----------
+MASTERY_COOKIE_FACTS = 200   # most recently seen facts kept in the cookie (fewer if over budget)
+
+def _epoch_day() -> int:
+    return (datetime.now(timezone.utc).date() - date(1970, 1, 1)).days
+
+def _mastery() -> "MasteryModel":
+    """The current user's model, decoded once and kept in session_state."""
+    from tt_mastery import MasteryModel
+    ss = st.session_state
+    user = (ss.user or "").strip()
+    if "mastery" not in ss or ss.get("mastery_user") != user:
+        model = None
+        saved = None
+        raw = cookies.get(COOKIE_MASTERY_KEY)
+        if raw:
+            try: saved = decode_mastery(raw)
+            except ValueError as e: logger.warning("Mastery cookie unreadable: %s", e)
+        saved = saved or _persist().mastery            # older state tokens carried it inline
+        if saved and saved.get("user") == user:
+            try: model = MasteryModel.from_bytes(saved["blob"])
+            except Exception as e: logger.warning("Mastery data unreadable, starting fresh: %s", e)
+        ss.mastery = model or MasteryModel(); ss.mastery_user = user
+    return ss.mastery
+
+def _mastery_save():
+    """Write the model to its own cookie: the most recently seen facts that fit MASTERY_TOKEN_BUDGET."""
+    m = _mastery(); m.commit(_epoch_day())
+    user = st.session_state.mastery_user; limit = MASTERY_COOKIE_FACTS
+    token = encode_mastery(user, m.to_bytes(limit=limit))
+    while len(token) > MASTERY_TOKEN_BUDGET and limit:
+        limit = limit * 3 // 4
+        token = encode_mastery(user, m.to_bytes(limit=limit))
+    _cookies_set(COOKIE_MASTERY_KEY, token)
+    p = _persist()
+    if p.mastery is not None: p.mastery = None; p.touch()      # migrated out of the state cookie
 
 # ---------- Streak ----------
 def _streak_load() -> dict:
-    raw = cookies.get(COOKIE_STREAK_KEY)
-    if not raw: return {"last": None, "count": 0}
-    try:
-        data = json.loads(raw); return {"last": data.get("last"), "count": int(data.get("count", 0))}
-    except Exception:
-        return {"last": None, "count": 0}
+    return _persist().streak
 
 def _streak_save(last_day: str, count: int):
-    _cookies_set(COOKIE_STREAK_KEY, json.dumps({"last": last_day, "count": int(count)}, separators=(",", ":")))
+    p = _persist(); p.streak = {"last": last_day, "count": int(count)}; p.touch()
 
 def _streak_update_on_session_end() -> int:
     today = datetime.now(timezone.utc).date()
@@ -276,10 +360,10 @@ def _streak_update_on_session_end() -> int:
 
 # ---------- Settings cookie ----------
 def _cookies_read_apply_settings():
-    raw = cookies.get(COOKIE_SETTINGS_KEY)
-    if not raw: return False
+    data = _persist().settings
+    if not data: return False
     try:
-        data = json.loads(raw); ss = st.session_state
+        ss = st.session_state
         ss.user = str(data.get("user", ss.user))
         ss.min_table = int(data.get("min_table", ss.min_table))
         ss.max_table = int(data.get("max_table", ss.max_table))
@@ -291,93 +375,58 @@ def _cookies_read_apply_settings():
 
 def _cookies_set_current_settings_no_flush():
     ss = st.session_state
-    _cookies_set(COOKIE_SETTINGS_KEY, json.dumps({
+    p = _persist()
+    settings = norm_settings({
         "user": ss.user, "min_table": ss.min_table, "max_table": ss.max_table,
         "per_q": ss.per_q, "minutes": ss.total_seconds // 60
-    }, separators=(",", ":")))
+    })
+    if settings != p.settings:
+        p.settings = settings; p.touch()
 
 def _cookies_save_current_settings():
     _cookies_set_current_settings_no_flush(); _cookies_flush()
 
 # ---------- Revisit cookie ----------
 def _revisit_load() -> dict:
-    raw = cookies.get(COOKIE_REVISIT_KEY)
-    if not raw: return {"v": 1, "min": None, "max": None, "items": []}
-    try:
-        data = json.loads(raw)
-        items = data.get("items") or []
-        norm = []
-        for it in items:
-            try:
-                a, b = int(it[0]), int(it[1])
-                norm.append([a, b])
-            except Exception:
-                continue
-        return {"v": 1, "min": data.get("min"), "max": data.get("max"), "items": norm}
-    except Exception:
-        return {"v": 1, "min": None, "max": None, "items": []}
+    return _persist().revisit
 
 def _revisit_save(min_table: int, max_table: int, items: list[tuple[int,int]]):
     uniq = sorted({(int(a), int(b)) for (a, b) in items})
-    payload = {"v": 1, "min": int(min_table), "max": int(max_table),
-               "items": [[a, b] for (a, b) in uniq]}
-    _cookies_set(COOKIE_REVISIT_KEY, json.dumps(payload, separators=(",", ":")))
+    p = _persist()
+    p.revisit = {"v": 1, "min": int(min_table), "max": int(max_table),
+                 "items": [[a, b] for (a, b) in uniq]}
+    p.touch()
 
-def _revisit_prepare_for_session():
+def _revisit_items_for_session() -> list[tuple[int,int]]:
     ss = st.session_state
     data = _revisit_load()
     same_range = (data.get("min") == ss.min_table) and (data.get("max") == ss.max_table)
     if same_range and data.get("items"):
-        items = [(int(a), int(b)) for (a, b) in data["items"]]
-        ss.revisit_queue = items[:]
-        ss.revisit_loaded = items[:]
-    else:
-        ss.revisit_queue = []
-        ss.revisit_loaded = []
+        return [(int(a), int(b)) for (a, b) in data["items"]]
+    return []
 
 # ---------------- State ----------------
 def _init_state():
     ss = st.session_state
     ss.setdefault("screen", "start")
-    ss.setdefault("running", False)
-    ss.setdefault("finished", False)
 
     ss.setdefault("user", "")
     ss.setdefault("min_table", 2)
     ss.setdefault("max_table", 12)  # default remains 12; no hard max in UI now
     ss.setdefault("total_seconds", 180)
     ss.setdefault("per_q", 10)
+    ss.setdefault("seed", None)        # shared question set from an assignment link (?seed=); not saved
 
-    ss.setdefault("session_start", 0.0)
-    ss.setdefault("deadline", 0.0)
-    ss.setdefault("q_start", 0.0)
-    ss.setdefault("q_deadline", 0.0)
-
-    ss.setdefault("awaiting_answer", False)
-    ss.setdefault("a", None); ss.setdefault("b", None)
-
-    ss.setdefault("total_questions", 0)
-    ss.setdefault("correct_questions", 0)
-    ss.setdefault("total_time_spent", 0.0)
-
-    ss.setdefault("wrong_attempt_items", [])
-    ss.setdefault("missed_items", [])
-    ss.setdefault("wrong_twice", [])
-    ss.setdefault("attempts_wrong", {})
-    ss.setdefault("scheduled_repeats", [])
+    # Session counters, current question, repeats and timers live in the engine
+    if "engine" not in ss: ss.engine = SessionEngine()
 
-    ss.setdefault("entry", "")
     ss.setdefault("needs_rerun", False)
-    ss.setdefault("shake_until", 0.0)
-    ss.setdefault("ok_until", 0.0)
-    ss.setdefault("pending_correct", False)
     ss.setdefault("last_kp_seq", -1)
+    ss.setdefault("kp_timing", {"seq": -1, "t2": 0.0})   # receipt of the last handled press (epoch ms)
+    if "latency" not in ss: ss.latency = LatencyRecorder()
 
     ss.setdefault("settings_loaded", False)
 
-    ss.setdefault("revisit_queue", [])
-    ss.setdefault("revisit_loaded", [])
-
     env_hook = os.getenv("DISCORD_WEBHOOK")
     sec_hook = _secret_webhook()
     default_hook = DISCORD_WEBHOOK_DEFAULT
@@ -392,6 +441,7 @@ def _init_state():
     ss.setdefault("streak_count", _streak_load().get("count", 0))
 
 _init_state()
+_prof.mark("init_state")
 
 # ---------- Apply URL settings once (override cookie on first load) ----------
 def _apply_url_settings_from_qp_once() -> bool:
@@ -426,11 +476,14 @@ def _apply_url_settings_from_qp_once() -> bool:
         ss.total_seconds = int(mins_v) * 60
         found = True
 
+    seed_v, ok = _as_int("seed", minv=0, maxv=SEED_MAX)
+    if ok: ss.seed = seed_v; found = True
+
     if ss.min_table > ss.max_table:
         ss.min_table, ss.max_table = ss.max_table, ss.min_table
 
     screen_q = (_qp_scalar("screen") or "").strip().lower()
-    if screen_q in ("start", "practice", "results", "assign"):
+    if screen_q in ("start", "practice", "results", "assign", "dashboard"):
         ss.screen = screen_q
 
     return found
@@ -441,89 +494,55 @@ if not st.session_state.settings_loaded:
     else:
         _cookies_read_apply_settings()
         st.session_state.settings_loaded = True
+_prof.mark("bootstrap")
 
 # ---------------- Keypad component ----------------
 KP_COMPONENT_AVAILABLE = False
 KP_LOAD_ERROR = ""
 def _register_keypad_component():
     global KP_COMPONENT_AVAILABLE, KP_LOAD_ERROR, keypad
-    try:
-        comp_dir = Path(__file__).with_name("keypad_component")
-        if comp_dir.exists() and (comp_dir / "index.html").exists():
-            keypad = declare_component("tt_keypad", path=str(comp_dir))  # returns "CODE|SEQ" or None
-            KP_COMPONENT_AVAILABLE = True
-        else:
-            KP_COMPONENT_AVAILABLE = False
-            KP_LOAD_ERROR = f"Keypad component not found at: {comp_dir}/index.html"
-            def keypad(default=None, key=None): return None
-    except Exception as e:
-        KP_COMPONENT_AVAILABLE = False
-        KP_LOAD_ERROR = f"{type(e).__name__}: {e}"
-        def keypad(default=None, key=None): return None
+    keypad, KP_LOAD_ERROR = keypad_component()   # declared once per process (tt_components)
+    KP_COMPONENT_AVAILABLE = keypad is not None
+    if not KP_COMPONENT_AVAILABLE:
+        def keypad(default=None, key=None, **kwargs): return None
 
 _register_keypad_component()
 
-# ---------------- Core logic ----------------
-MULTIPLIERS = list(range(1, 13))  # multipliers stay 1..12; "table" (a) may exceed 12
-MIN_PER_Q = 2
-MAX_PER_Q = 60
-
-def _now() -> float: return time.monotonic()
-def _required_digits() -> int: return len(str(abs(st.session_state.a * st.session_state.b)))
-def _clamp_per_q(x: float | int) -> int: return int(min(MAX_PER_Q, max(MIN_PER_Q, round(float(x)))))
-
-def _decrement_scheduled():
-    for s in st.session_state.scheduled_repeats: s["remaining"] -= 1
+# Runner mode (default with the custom keypad): questions are answered client-side
+RUNNER = KP_COMPONENT_AVAILABLE and str(_qp_scalar("runner") or "1").lower() not in ("0", "false", "no")
+_prof.mark("components")
 
-def _pop_due_repeat():
-    for i, s in enumerate(st.session_state.scheduled_repeats):
-        if s["remaining"] <= 0: return st.session_state.scheduled_repeats.pop(i)["item"]
-    return None
-
-def _random_item():
-    ss = st.session_state
-    banned = {t["item"] for t in ss.scheduled_repeats} | {k for k, v in ss.attempts_wrong.items() if v >= 2}
-    for _ in range(200):
-        a = random.randint(ss.min_table, ss.max_table); b = random.choice(MULTIPLIERS)
-        if (a, b) not in banned: return (a, b)
-    cands = [(a, b) for a in range(ss.min_table, ss.max_table + 1) for b in MULTIPLIERS if (a, b) not in banned]
-    return random.choice(cands) if cands else (random.randint(ss.min_table, ss.max_table), random.choice(MULTIPLIERS))
-
-def _select_next_item():
-    if st.session_state.revisit_queue:
-        return st.session_state.revisit_queue.pop(0)
-    _decrement_scheduled()
-    due = _pop_due_repeat()
-    if due: return due
-    return _random_item()
-
-def _new_question():
-    ss = st.session_state
-    ss.a, ss.b = _select_next_item()
-    ss.q_start = _now()
-    ss.q_deadline = ss.q_start + float(ss.per_q)
-    ss.awaiting_answer = True
-    ss.entry = ""; ss.pending_correct = False; ss.ok_until = 0.0; ss.shake_until = 0.0
+# ---------------- Core logic ----------------
+# Rules live in tt_engine.SessionEngine; these wrappers drive it and react to its transitions.
+def _eng() -> SessionEngine: return st.session_state.engine
+def _now() -> float: return _eng().now()
+def _clamp_per_q(x: float | int) -> int: return clamp_per_q(x)
 
 def _build_results_text():
-    ss = st.session_state
-    total = ss.total_questions or 1
-    pct = round(100 * (ss.correct_questions / total))
+    ss = st.session_state; eng = _eng()
+    total = eng.total_questions or 1
+    pct = round(100 * (eng.correct_questions / total))
     lines = [
         "**Times Tables Results**",
         f"User: {ss.user or 'Anonymous'}",
-        f"Score: {ss.correct_questions}/{ss.total_questions} ({pct}%)",
-        f"Avg: {ss.total_time_spent/total:.2f}s  •  Time: {ss.total_time_spent:.0f}s",
+        f"Score: {eng.correct_questions}/{eng.total_questions} ({pct}%)",
+        f"Avg: {eng.total_time_spent/total:.2f}s  •  Time: {eng.total_time_spent:.0f}s",
         f"Streak: {ss.streak_count} day(s)",
         f"Per Q now: {ss.per_q}s",
     ]
     wrong = ", ".join(
-        f"{a}×{b}" + (" (×2)" if (a, b) in ss.wrong_twice else "")
-        for (a, b) in sorted(set(ss.wrong_attempt_items))
+        f"{a}×{b}" + (" (×2)" if (a, b) in eng.wrong_twice else "")
+        for (a, b) in sorted(eng.wrong_attempt_items)
     )
     if wrong: lines.append(f"Revisit: {wrong}")
     return "\n".join(lines)
 
+def _build_result_record() -> dict:
+    ss = st.session_state; eng = _eng()
+    return result_record(ss.user, ss.session_id, ss.min_table, ss.max_table, ss.per_q, ss.total_seconds // 60,
+                         eng.total_questions, eng.correct_questions, eng.total_time_spent,
+                         eng.wrong_attempt_items, eng.wrong_twice, seed=eng.seed)
+
 def _get_webhook_url() -> str:
     ss = st.session_state
     ui = (ss.webhook_url or "").strip()
@@ -536,10 +555,18 @@ def _get_webhook_url() -> str:
     })
     return eff
 
+@st.cache_resource(show_spinner=False)
+def _webhook_dispatcher() -> "WebhookDispatcher":
+    """Process-wide background sender shared by every learner session."""
+    from tt_dispatch import WebhookDispatcher
+    return WebhookDispatcher()
+
 def _send_results_discord(text: str | None = None):
+    """Queue results for background delivery; ss.last_webhook is completed when the send finishes."""
+    from tt_dispatch import MAX_CONTENT_CHARS
     url = _get_webhook_url(); ss = st.session_state
     content = (text or _build_results_text()).strip()
-    if len(content) > 1900: content = content[:1900] + "…"
+    if len(content) > MAX_CONTENT_CHARS: content = content[:MAX_CONTENT_CHARS] + "…"
     payload = {"content": content}
     attempt_info = {
         "when": datetime.now(timezone.utc).isoformat(),
@@ -547,167 +574,328 @@ def _send_results_discord(text: str | None = None):
         "bytes": len(json.dumps(payload)),
         "content_preview": content[:200] + ("…" if len(content) > 200 else ""),
         "sources": ss.webhook_sources.copy(),
+        "status": None, "ok": None, "pending": True,
     }
-    try:
-        r = requests.post(url, json=payload, timeout=10)
-        attempt_info.update({"status": r.status_code, "ok": r.ok, "response": (r.text or "")[:500]})
-        if r.ok: logger.info("Discord webhook success (status %s)", r.status_code)
-        else: logger.error("Discord webhook non-2xx (status %s): %s", r.status_code, (r.text or "")[:200])
-    except requests.exceptions.RequestException as e:
-        attempt_info.update({"status": None, "ok": False, "error": f"RequestException: {e}"})
-        logger.exception("Discord webhook request error")
-    except Exception as e:
-        attempt_info.update({"status": None, "ok": False, "error": f"{type(e).__name__}: {e}"})
-        logger.exception("Discord webhook unexpected error")
     ss.last_webhook = attempt_info
 
+    def _done(fut):
+        # Runs on the dispatcher thread: mutate the dict already held in session_state.
+        try: attempt_info.update(fut.result())
+        except Exception as e: attempt_info.update({"ok": False, "error": f"{type(e).__name__}: {e}"})
+        attempt_info["pending"] = False
+
+    _webhook_dispatcher().submit(url, content).add_done_callback(_done)
+
+@st.cache_resource(show_spinner=False)
+def _roster_pool() -> "ProcessPoolExecutor":
+    """Process-wide QR workers for class rosters; spawned (not forked) away from the server's threads."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=max(1, min(4, os.cpu_count() or 1)),
+                               mp_context=multiprocessing.get_context("spawn"))
+
+@st.cache_resource(show_spinner=False)
+def _result_sink(path: str) -> ResultSink:
+    return ResultSink(path)
+
+@st.cache_resource(show_spinner=False)
+def _result_aggregator(path: str) -> ResultAggregator:
+    """Process-wide running totals; every dashboard viewer shares one fold of the file."""
+    return ResultAggregator(path)
+
+@st.cache_resource(show_spinner=False)
+def _attempt_store(path: str) -> "AttemptStore":
+    """Process-wide attempt log; writes are buffered and flushed by its own thread."""
+    from tt_store import AttemptStore
+    return AttemptStore(path)
+
+def _record_hooks(*hooks):
+    def on_record(a, b, correct, timed_out, dur):
+        for h in hooks: h(a, b, correct, timed_out, dur)
+    return on_record
+
+def _session_engine(seed: int | None) -> SessionEngine:
+    """An engine for the current settings and session_id, with selection weights and record hooks."""
+    ss = st.session_state
+    eng = SessionEngine(min_table=ss.min_table, max_table=ss.max_table,
+                        per_q=ss.per_q, total_seconds=ss.total_seconds)
+
+    # Weight random selection by the learner's mastery (one vectorized pass over the facts seen).
+    # A seeded session is a class's shared set: uniform weights and no carried-over revisits,
+    # so its deck depends only on the seed and the range.
+    mastery = _mastery()
+    if seed is None:
+        eng.sampler.load_weights(*mastery.weights(ss.min_table, ss.max_table, _epoch_day()))
+
+    hooks = [lambda a, b, correct, timed_out, dur: mastery.observe(a, b, correct, dur)]
+    db_path = _attempts_db_path()
+    if db_path:
+        store, user, sid = _attempt_store(db_path), ss.user, ss.session_id
+        hooks.append(lambda a, b, correct, timed_out, dur: store.record(
+            user, a, b, correct, timed_out, dur, sid))
+    eng.on_record = _record_hooks(*hooks)
+    ss.last_kp_seq = -1; ss.runner_acked = 0; ss.runner_seq = 0
+    ss.kp_timing = {"seq": -1, "t2": 0.0}
+    return eng
+
 def _start_session():
+    """New practice session; the caller flushes cookies (that saves the resume id too)."""
     ss = st.session_state
-    ss.running = True; ss.finished = False
-    ss.session_start = _now(); ss.deadline = ss.session_start + float(ss.total_seconds)
-    ss.total_questions = 0; ss.correct_questions = 0; ss.total_time_spent = 0.0
-    ss.wrong_attempt_items = []; ss.missed_items = []; ss.wrong_twice = []; ss.attempts_wrong = {}; ss.scheduled_repeats = []
-    ss.entry = ""
-    ss.pending_correct = False
-    ss.shake_until = 0.0
-    ss.ok_until = 0.0
-    ss.last_kp_seq = -1
-    _revisit_prepare_for_session()
-    _new_question()
+    ss.session_id = uuid.uuid4().hex
+    seed = ss.get("seed")
+    ss.engine = _session_engine(seed)
+    ss.engine.start(revisit=_revisit_items_for_session() if seed is None else (), runner=RUNNER, seed=seed)
+    ss.resume_id = secrets.token_urlsafe(16)
+    _cookies_set(COOKIE_RESUME_KEY, ss.resume_id)
+    _resume_snapshot()
     ss.screen = "practice"; ss.needs_rerun = True
 
-def _end_session():
+# ---------- Resume (tt_resume) ----------
+RESUME_EVERY_Q = 5      # scored steps store a snapshot once this many questions were scored since the last
+RESUME_EVERY_S = 5.0    # ... or this many seconds passed, so a reload loses at most the last few answers
+
+def _resume_key() -> bytes:
+    """HMAC key for snapshots (env TTT_RESUME_KEY or secrets resume_key, else the cookie password)."""
+    ss = st.session_state
+    if "resume_key" not in ss:
+        v = os.getenv("TTT_RESUME_KEY")
+        if not v:
+            try: v = st.secrets.get("resume_key")
+            except Exception: v = None
+        ss.resume_key = hashlib.sha256(b"ttt-resume:" + str(v or COOKIE_PASSWORD).encode("utf-8")).digest()
+    return ss.resume_key
+
+def _resume_snapshot(force: bool = True):
+    """Store the running session's signed snapshot under this browser's resume id (tens of µs).
+
+    Scored steps pass force=False and are debounced: RESUME_EVERY_Q questions or RESUME_EVERY_S
+    seconds since the last snapshot of this browser session.
+    """
+    ss = st.session_state; rid = ss.get("resume_id")
+    if not rid: return
+    eng = _eng(); now = time.time(); last = ss.get("resume_last")
+    if not force and last and eng.total_questions - last[0] < RESUME_EVERY_Q and now - last[1] < RESUME_EVERY_S: return
+    process_store().put(rid, encode_snapshot(eng.snapshot(), _resume_key(), ss.user, ss.session_id))
+    ss.resume_last = (eng.total_questions, now)
+
+def _resume_clear():
+    ss = st.session_state; rid = ss.get("resume_id")
+    if rid: process_store().pop(rid)
+    ss.resume_id = None
+    _cookies_set(COOKIE_RESUME_KEY, None)
+
+def _resume_from_cookie() -> bool:
+    """A new browser session whose cookie names a live snapshot picks that session back up."""
     ss = st.session_state
-    ss.running = False; ss.finished = True; ss.awaiting_answer = False
+    rid = cookies.get(COOKIE_RESUME_KEY)
+    token = process_store().get(rid) if rid else None
+    if not token: return False
+    try: snap = decode_snapshot(token, _resume_key())
+    except ValueError as e:
+        logger.info("Not resuming session: %s", e); process_store().pop(rid); return False
+    ss.user = snap["user"]; ss.min_table = snap["min"]; ss.max_table = snap["max"]
+    ss.per_q = snap["per_q"]; ss.total_seconds = snap["total_seconds"]; ss.seed = snap["seed"]
+    ss.session_id = snap["session_id"]; ss.resume_id = rid
+    ss.engine = _session_engine(ss.seed)
+    snap["runner"] = RUNNER                      # this page's mode, not the old one's
+    ss.engine.restore(snap)
+    ss.screen = "practice"; ss.needs_rerun = True
+    if ss.engine.finished: _end_session()
+    else: st.toast("Picked up your session where you left off.")
+    return True
+
+def _end_session():
+    ss = st.session_state; eng = _eng()
+    eng.end()
 
-    total = max(1, ss.total_questions)
-    pct = int(round(100.0 * ss.correct_questions / total))
-    avg = float(ss.total_time_spent / total) if total else 0.0
+    total = max(1, eng.total_questions)
+    pct = int(round(100.0 * eng.correct_questions / total))
+    avg = float(eng.total_time_spent / total) if total else 0.0
 
-    _history_append_session(pct=pct, avg=avg, q=ss.total_questions)
+    _history_append_session(pct=pct, avg=avg, q=eng.total_questions)
     ss.streak_count = _streak_update_on_session_end()
 
-    wrong_any = sorted({(a, b) for (a, b) in ss.wrong_attempt_items})
+    wrong_any = sorted(eng.wrong_attempt_items)
     _revisit_save(ss.min_table, ss.max_table, wrong_any)
+    _mastery_save()
+    _resume_clear()
 
     _cookies_set_current_settings_no_flush()
     _cookies_flush()
 
     try: _send_results_discord()
     except Exception: logger.exception("Discord send failed")
+    results_path = _results_jsonl_path()
+    if results_path:
+        try: _result_sink(results_path).append(_build_result_record())
+        except Exception: logger.exception("Result record failed")
 
     ss.screen = "results"; ss.needs_rerun = True
 
-def _record_question(correct: bool, timed_out: bool):
-    ss = st.session_state
-    duration = _now() - ss.q_start
-    ss.total_questions += 1
-    ss.total_time_spent += duration
-    item = (ss.a, ss.b)
-
-    # Adaptive timing
-    if correct and duration <= (1.0/3.0) * float(ss.per_q):
-        ss.per_q = _clamp_per_q(ss.per_q * 0.9)    # speed up
-    elif duration >= (2.0/3.0) * float(ss.per_q):
-        ss.per_q = _clamp_per_q(ss.per_q * 1.1)    # slow down
-
-    if correct:
-        ss.correct_questions += 1
-        ss.scheduled_repeats = [s for s in ss.scheduled_repeats if s["item"] != item]
-    else:
-        cnt = ss.attempts_wrong.get(item, 0) + 1
-        ss.attempts_wrong[item] = cnt
-        if item not in ss.wrong_attempt_items: ss.wrong_attempt_items.append(item)
-        if timed_out and item not in ss.missed_items: ss.missed_items.append(item)
-        if cnt == 1:
-            if item not in (s["item"] for s in ss.scheduled_repeats):
-                ss.scheduled_repeats.append({"item": item, "remaining": random.randint(2, 4)})
-        else:
-            if item not in ss.wrong_twice: ss.wrong_twice.append(item)
-            ss.scheduled_repeats = [s for s in ss.scheduled_repeats if s["item"] != item]
-
-    ss.awaiting_answer = False
-
-    if _now() >= ss.deadline:
+def _after_engine_step(n_before: int):
+    """Mirror adaptive per_q into settings; finish the session or flag a rerun for a new question."""
+    ss = st.session_state; eng = _eng()
+    ss.per_q = eng.per_q
+    if eng.finished and ss.screen == "practice":
         _end_session()
-    else:
-        _new_question()
+    elif eng.total_questions != n_before:
         ss.needs_rerun = True
+        _resume_snapshot(force=False)
 
 def _tick(now_ts: float):
-    ss = st.session_state
-    if not ss.running: return
-    if ss.pending_correct and now_ts < ss.ok_until: return
-    if now_ts >= ss.deadline:
-        _end_session(); return
-    if ss.awaiting_answer and now_ts >= ss.q_deadline:
-        _record_question(False, True)
+    eng = _eng(); n_before = eng.total_questions
+    eng.tick(now_ts)
+    _after_engine_step(n_before)
 
 def _kp_apply(code: str):
-    if not st.session_state.awaiting_answer: return
-    if code == "C": st.session_state.entry = ""
-    elif code == "B": st.session_state.entry = st.session_state.entry[:-1]
-    elif code and code.isdigit(): st.session_state.entry += code
-
-def _handle_keypad_payload(payload):
+    _eng().press(code)
+
+# ---------- Latency ----------
+# press_to_paint / tick_to_paint come from the keypad (browser clock); server_handle is receipt
+# to handled press, server_render is the whole practice rerun. Kept per session and per process.
+@st.cache_resource(show_spinner=False)
+def _latency_process() -> LatencyRecorder:
+    return LatencyRecorder()
+
+def _lat_record(name: str, ms: float):
+    st.session_state.latency.record(name, ms); _latency_process().record(name, ms)
+
+def _lat_record_client(lat):
+    if not isinstance(lat, dict): return
+    for key, name in (("p", "press_to_paint"), ("t", "tick_to_paint")):
+        samples = lat.get(key)
+        if isinstance(samples, list) and samples:
+            st.session_state.latency.record_many(name, samples); _latency_process().record_many(name, samples)
+
+def _kp_keys(payload) -> list:
+    """[(code, seq), ...] from {"keys": [[code, seq], ...]}, a single {"code", "seq"} or "CODE|SEQ".
+
+    Presses without a usable seq are dropped: the widget keeps its last value, so a seq-less press
+    could not be told apart from the same press seen again on the next tick.
+    """
+    if isinstance(payload, dict):
+        raw = payload.get("keys")
+        if not isinstance(raw, list): raw = [(payload.get("code"), payload.get("seq"))]
+    else:
+        code, _, seq_s = str(payload).partition("|"); raw = [(code, seq_s or None)]
+    keys = []
+    for item in raw:
+        if not isinstance(item, (list, tuple)) or len(item) < 2: continue
+        try: seq = int(item[1])
+        except (TypeError, ValueError): continue
+        keys.append((str(item[0] or ""), seq))
+    return keys
+
+def _handle_keypad_payload(payload, recv_ms: float | None = None):
+    """Apply keypad presses: {"keys": [[code, seq], ...], "seq", "t", "lat"} (the component's
+    unacknowledged presses, oldest first), a single {"code", "seq", ...} or a legacy "CODE|SEQ".
+
+    Keys at or below last_kp_seq were applied by an earlier rerun and are skipped; the rest are
+    applied in order, each checked for auto-submit, so fast typing loses no digits. Called once
+    per run, with the widget's value before the keypad is emitted.
+    """
     if not payload: return
-    text = str(payload); code, seq = None, None
-    if "|" in text:
-        code, seq_s = text.split("|", 1)
-        try: seq = int(seq_s)
-        except Exception: seq = None
-    else: code = text
-    last = st.session_state.get("last_kp_seq", -1)
-    if (seq is None) or (last < 0) or (seq > last):
-        st.session_state.last_kp_seq = (last + 1) if (seq is None) else seq
-        _kp_apply(code)
+    ss = st.session_state; applied = 0
+    for code, seq in _kp_keys(payload):
+        last = ss.get("last_kp_seq", -1)
+        if last >= 0 and seq <= last: continue
+        if applied: _eng().check_entry(_now())       # judge the previous key before the next one
+        ss.last_kp_seq = seq
+        _kp_apply(code); applied += 1
+    if applied and isinstance(payload, dict):
+        recv_ms = time.time() * 1000.0 if recv_ms is None else recv_ms
+        ss.kp_timing = {"seq": ss.last_kp_seq, "t2": recv_ms}
+        _lat_record("server_handle", time.time() * 1000.0 - recv_ms)
+        _lat_record_client(payload.get("lat"))
+
+def _handle_runner_payload(payload) -> bool:
+    """Apply client-side results newer than the last acknowledged one (by result count `n`; qids
+    are not in answer order once repeats are spliced in); True once the client is done."""
+    if not isinstance(payload, dict) or payload.get("kind") != "runner": return False
+    ss = st.session_state; eng = _eng()
+    if int(payload.get("seq", 0) or 0) > ss.get("runner_seq", 0):
+        ss.runner_seq = int(payload.get("seq", 0)); _lat_record_client(payload.get("lat"))
+    for r in payload.get("results") or []:
+        try:
+            n, qid = int(r.get("n", 0)), int(r.get("qid", 0))
+            ans = r.get("ans"); ans = None if ans in (None, "") else int(ans)
+            ms, tries = float(r.get("ms", 0) or 0), int(r.get("tries", 0) or 0)
+        except Exception: continue
+        if n <= ss.runner_acked or not eng.running: continue
+        eng.apply_result(qid, ans, ms / 1000.0, tries)     # the engine judges `ans` and clamps the time
+        ss.runner_acked = n
+    return bool(payload.get("done"))
 
 # ---------- Bars (compact) ----------
-def _q_bar(now_ts: float):
-    ss = st.session_state
-    q_total = max(1e-6, float(ss.per_q))
-    q_left = max(0.0, (ss.q_deadline - now_ts) if ss.running else 0.0)
+def _q_bar_html(now_ts: float) -> str:
+    eng = _eng()
+    q_total = max(1e-6, float(eng.per_q))
+    q_left = max(0.0, (eng.q_deadline - now_ts) if eng.running else 0.0)
     q_pct = max(0.0, min(100.0, 100.0 * q_left / q_total))
     # Label removed to save vertical space
-    st.markdown(f"<div class='barwrap'><div class='barfill-q' style='width:{q_pct:.0f}%'></div></div>", unsafe_allow_html=True)
+    return f"<div class='barwrap'><div class='barfill-q' style='width:{q_pct:.0f}%'></div></div>"
 
 def _s_bar(now_ts: float):
-    ss = st.session_state
-    s_total = max(1e-6, float(ss.total_seconds))
-    s_left = max(0.0, (ss.deadline - now_ts) if ss.running else 0.0)
-    s_pct = max(0.0, min(100.0, 100.0 * s_left / s_total))
-    st.markdown(f"""
-<div class='fixed-bottom'>
-  <div class='inner'>
-    <div class='barlabel'><span>Session</span></div>
-    <div class='barwrap'><div class='barfill-s' style='width:{s_pct:.0f}%'></div></div>
-  </div>
-</div>
-""", unsafe_allow_html=True)
+    """Session bar drained by a CSS animation: emitted by full reruns only, never per tick."""
+    eng = _eng()
+    s_total = max(1e-6, float(eng.total_seconds))
+    elapsed = min(s_total, max(0.0, now_ts - (eng.deadline - s_total))) if eng.running else s_total
+    st.markdown(f"<div class='fixed-bottom'><div class='inner'><div class='barlabel'><span>Session</span></div>"
+                f"<div class='barwrap'><div class='barfill-s' style='animation-duration:{s_total:.1f}s;"
+                f"animation-delay:-{elapsed:.1f}s'></div></div></div></div>", unsafe_allow_html=True)
 
 # ---------- Debug expander ----------
 def _debug_cookies_expander(title="Debug: cookies"):
     with st.expander(title, expanded=False):
         st.write("**settings_loaded flag:**", st.session_state.get("settings_loaded"))
-        st.write("**Exists — settings/history/streak/revisit:**",
-                 bool(cookies.get(COOKIE_SETTINGS_KEY)),
-                 bool(cookies.get(COOKIE_HISTORY_KEY)),
-                 bool(cookies.get(COOKIE_STREAK_KEY)),
-                 bool(cookies.get(COOKIE_REVISIT_KEY)))
-        raw_settings = cookies.get(COOKIE_SETTINGS_KEY) or ""
-        raw_revisit  = cookies.get(COOKIE_REVISIT_KEY) or ""
-        st.write("**settings (raw JSON) preview:**")
-        st.code(raw_settings[:600] + ("…" if len(raw_settings) > 600 else ""), language="json")
-        st.write("**revisit (raw JSON) preview:**")
-        st.code(raw_revisit[:600] + ("…" if len(raw_revisit) > 600 else ""), language="json")
-        try: parsed = json.loads(raw_settings) if raw_settings else {}
-        except Exception as e: parsed = {"_error": f"JSON parse failed: {e}"}
-        try: parsed_r = json.loads(raw_revisit) if raw_revisit else {}
-        except Exception as e: parsed_r = {"_error": f"JSON parse failed: {e}"}
-        st.write("**settings (parsed):**", parsed)
-        st.write("**revisit (parsed):**", parsed_r)
+        p = _persist()
+        raw_state = cookies.get(COOKIE_STATE_KEY) or ""
+        st.write("**State cookie (v2) bytes:**", len(raw_state), "— cache dirty:", p.dirty)
+        st.write("**Mastery cookie bytes:**", len(cookies.get(COOKIE_MASTERY_KEY) or ""),
+                 f"(budget {MASTERY_TOKEN_BUDGET})")
+        st.write("**Legacy v1 cookies present — settings/history/streak/revisit:**",
+                 *(bool(cookies.get(k)) for k in LEGACY_COOKIE_KEYS))
+        st.write("**state token preview:**")
+        st.code(raw_state[:600] + ("…" if len(raw_state) > 600 else ""), language="text")
+        st.write("**state (cached, decoded once per session):**", p.to_dict())
         st.write("**session_state.per_q (live):**", st.session_state.get("per_q"))
 
+def _debug_latency_expander(title="Debug: latency"):
+    with st.expander(title, expanded=False):
+        ss = st.session_state
+        st.write("**This session (ms):**", ss.latency.summary())
+        st.write("**This server process (ms):**", _latency_process().summary())
+        st.download_button("Download latency JSON", data=_latency_process().to_json(
+                               session=ss.latency.summary(), app_version=APP_VERSION),
+                           file_name="ttt-latency.json", mime="application/json", key="dl_latency")
+
+def _rows_table(rows: list[dict]):
+    """Small markdown table (st.dataframe would load pandas + pyarrow into the measured process)."""
+    cols = list(rows[0])
+    st.markdown("\n".join(["| " + " | ".join(cols) + " |", "|" + "---|" * len(cols)]
+                          + ["| " + " | ".join(str(r.get(c, "")) for c in cols) + " |" for r in rows]))
+
+def _profile_panel():
+    prof = _profiler()
+    with st.expander(f"Profile: reruns ({prof.reruns}, ms, last {prof.window})", expanded=False):
+        rows = prof.summary()
+        if rows: _rows_table(rows)
+        else: st.write("No finished reruns yet.")
+        fp = _eng().footprint()
+        st.caption(f"Session engine: {fp.pop('total'):,} B (" + ", ".join(f"{k} {v:,}" for k, v in fp.items()) + ")")
+        if prof.snapshot_dir:
+            st.write(f"**cProfile snapshots** (reruns ≥ {prof.slow_ms:.0f} ms) in `{prof.snapshot_dir}`:",
+                     list(prof.snapshots) or "none yet")
+
+def _payload_panel():
+    meter = _meter()
+    with meter.excluded():
+        budget = f", budget {meter.budget} B" if meter.budget is not None else ""
+        with st.expander(f"Payload: bytes per rerun (last {meter.window}{budget})", expanded=False):
+            rows = meter.summary()
+            if rows: _rows_table(rows)
+            else: st.write("No finished reruns yet.")
+
 # ---------------- Helpers for Start/Assign ----------------
 def _current_params_from_state() -> dict:
     ss = st.session_state
@@ -720,6 +908,8 @@ def _current_params_from_state() -> dict:
     }
     if ss.user and ss.user.strip():
         params["user"] = ss.user.strip()
+    if ss.seed is not None:
+        params["seed"] = int(ss.seed)
     if DEBUG:
         params["debug"] = "1"
     return params
@@ -758,6 +948,7 @@ def _apply_assign_qp_and_persist():
     ss.per_q = _int_or(ss.per_q, "per_q", MIN_PER_Q, MAX_PER_Q)
     mins = _int_or(ss.total_seconds // 60, "minutes", 0, 180)
     ss.total_seconds = int(mins) * 60
+    ss.seed = _int_or(ss.seed, "seed", 0, SEED_MAX)
 
     if ss.min_table > ss.max_table:
         ss.min_table, ss.max_table = ss.max_table, ss.min_table
@@ -770,7 +961,7 @@ def screen_start():
     # Tiny title (reduces top whitespace)
     st.markdown("<div class='tt-title'>Practice Times Tables</div>", unsafe_allow_html=True)
     if KP_LOAD_ERROR: st.info(f"Keypad component: {KP_LOAD_ERROR}. Using fallback keypad.", icon="ℹ️")
-    if DEBUG: _debug_cookies_expander()
+    if DEBUG: _debug_cookies_expander(); _debug_latency_expander()
 
     # Live widgets (no form)
     st.session_state.user = st.text_input("User (required)", st.session_state.user,
@@ -799,14 +990,15 @@ def screen_start():
 
     if st.session_state.min_table > st.session_state.max_table:
         st.session_state.min_table, st.session_state.max_table = st.session_state.max_table, st.session_state.min_table
+    if st.session_state.seed is not None:
+        st.caption(f"Question set #{st.session_state.seed} (shared by everyone with this link).")
 
     # Primary Start
     if st.button("Start", type="primary", use_container_width=True):
         if not st.session_state.user or not st.session_state.user.strip():
             st.error("Please enter a User name to continue.")
         else:
-            _cookies_save_current_settings()
-            _start_session(); st.rerun()
+            _start_session(); _cookies_save_current_settings(); st.rerun()
 
 def render_fallback_keypad():
     rows = [["1","2","3"], ["4","5","6"], ["7","8","9"], ["C","0","B"]]
@@ -821,73 +1013,105 @@ def render_fallback_keypad():
             else:
                 cols[c].button("Back", key=key, use_container_width=True, on_click=_kp_apply, args=("B",))
 
+# Practice runs as a fragment: ticks and keypresses rerun only this function, not the whole
+# script (page config, CSS, cookies, bootstrap). Screen transitions trigger a full-app rerun.
+PRACTICE_TICK_S = 0.1
+
+def _rerun_practice():
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()  # scope="fragment" is only valid during a fragment rerun
+
+@st.fragment(run_every=PRACTICE_TICK_S)
+@_profiled
 def screen_practice():
+    ss = st.session_state; eng = _eng()
+    run_ms = time.time() * 1000.0
     now_ts = _now()
     _tick(now_ts)  # may end the session
 
-    if not st.session_state.running and st.session_state.finished and st.session_state.screen != "results":
+    if not eng.running and eng.finished and st.session_state.screen != "results":
         st.session_state.screen = "results"; st.rerun(); return
 
-    # Compact top bar (label removed)
-    _q_bar(now_ts)
-
-    # Prompt / answer / keypad packed closely
-    prompt_area = st.container(); answer_area = st.container(); keypad_area = st.container()
+    # Bar, prompt and answer are one element (one delta per tick); the keypad sits below it
+    top_area = st.container(); keypad_area = st.container()
 
+    # Apply the presses before emitting the keypad so this rerun's args acknowledge them; keypad()
+    # returns the same widget value, so it is not handled a second time
+    was_pending = eng.pending_correct
+    if KP_COMPONENT_AVAILABLE: _handle_keypad_payload(ss.get("tt_keypad"), run_ms)
     with keypad_area:
         if KP_COMPONENT_AVAILABLE:
-            payload = keypad(default=None, key="tt_keypad")
+            t = ss.kp_timing
+            keypad(ack=int(t["seq"]), t2=t["t2"], t3=time.time() * 1000.0, srv=run_ms, default=None, key="tt_keypad")
         else:
-            payload = None
             render_fallback_keypad()
 
-    _handle_keypad_payload(payload)
+    eng.check_entry(now_ts)
+    if eng.pending_correct and not was_pending:
+        st.session_state.needs_rerun = True  # just judged correct: repaint the green flash now
 
-    if st.session_state.awaiting_answer:
-        target = st.session_state.a * st.session_state.b
-        need = _required_digits()
-        if len(st.session_state.entry) == need:
-            try:
-                val = int(st.session_state.entry)
-            except ValueError:
-                st.session_state.entry = ""; st.session_state.shake_until = now_ts + 0.45
-            else:
-                if val == target:
-                    st.session_state.awaiting_answer = False
-                    st.session_state.pending_correct = True
-                    st.session_state.ok_until = now_ts + 0.6
-                    st.session_state.needs_rerun = True
-                else:
-                    st.session_state.entry = ""
-                    if (st.session_state.a, st.session_state.b) not in st.session_state.wrong_attempt_items:
-                        st.session_state.wrong_attempt_items.append((st.session_state.a, st.session_state.b))
-                    st.session_state.shake_until = now_ts + 0.45
-
-    if st.session_state.pending_correct and now_ts >= st.session_state.ok_until:
-        st.session_state.pending_correct = False
-        _record_question(True, False)
-
-    with prompt_area:
-        st.markdown(f"<div class='tt-prompt'><h1>{st.session_state.a} × {st.session_state.b}</h1></div>", unsafe_allow_html=True)
-
-    with answer_area:
-        classes = ["answer-display"]
-        if st.session_state.pending_correct and now_ts < st.session_state.ok_until: classes.append("ok")
-        elif now_ts < st.session_state.shake_until: classes += ["bad","shake"]
-        st.markdown(f"<div class='{' '.join(classes)}'>{st.session_state.entry or '&nbsp;'}</div>", unsafe_allow_html=True)
-
-    # Fixed Session bar at the very bottom, compact and always visible
-    _s_bar(now_ts)
-
-    if st.session_state.running and _now() >= st.session_state.deadline:
-        _end_session()
+    n_before = eng.total_questions
+    eng.settle(now_ts)
+    _after_engine_step(n_before)
+
+    classes = ["answer-display"]
+    if eng.pending_correct and now_ts < eng.ok_until: classes.append("ok")
+    elif now_ts < eng.shake_until: classes += ["bad","shake"]
+    top_area.markdown(f"{_q_bar_html(now_ts)}<div class='tt-prompt'><h1>{eng.a} × {eng.b}</h1></div>"
+                      f"<div class='{' '.join(classes)}'>{eng.entry or '&nbsp;'}</div>", unsafe_allow_html=True)
+
+    # Footer lives in the fragment so the per-Q value tracks adaptive timing
+    st.markdown(f"<div class='mini-caption'>Times Tables Trainer {APP_VERSION} — per-Q: {int(st.session_state.per_q)}s</div>", unsafe_allow_html=True)
+
+    if eng.running and _now() >= eng.deadline:
+        eng.end(); _after_engine_step(eng.total_questions)
+
+    _lat_record("server_render", time.time() * 1000.0 - run_ms)
+    if st.session_state.screen != "practice":
+        st.session_state.needs_rerun = False; st.rerun()
+    elif st.session_state.needs_rerun:
+        st.session_state.needs_rerun = False; _rerun_practice()
+
+# Runner mode: the component owns the question loop, so the server only syncs results, keeps the
+# prefetch topped up and moves the session bar. A short grace after the deadline lets the
+# client's final batch land before results are computed.
+RUNNER_TICK_S = 1.0
+RUNNER_PREFETCH = 8
+RUNNER_GRACE_S = 2.0
+
+@st.fragment(run_every=RUNNER_TICK_S)
+@_profiled
+def screen_practice_runner():
+    ss = st.session_state; eng = _eng()
+    run_ms = time.time() * 1000.0
+    now_ts = _now()
+    questions = [[qid, a, b, a * b] for (qid, a, b) in eng.prefetch(RUNNER_PREFETCH)] if eng.running else []
+    payload = keypad(mode="runner", questions=questions, per_q=int(eng.per_q),
+                     remaining_ms=int(max(0.0, eng.deadline - now_ts) * 1000), acked=int(ss.runner_acked),
+                     flash_ms=int(OK_FLASH_S * 1000), shake_ms=int(SHAKE_S * 1000),
+                     default=None, key="tt_runner")
+
+    n_before = eng.total_questions
+    done = _handle_runner_payload(payload)
+    if eng.running and (done or _now() >= eng.deadline + RUNNER_GRACE_S): eng.end()
+    _after_engine_step(n_before)   # new results → rerun so the component gets acked/prefetch
+
+    st.markdown(f"<div class='mini-caption'>Times Tables Trainer {APP_VERSION} — per-Q: {int(ss.per_q)}s</div>", unsafe_allow_html=True)
+
+    _lat_record("server_render", time.time() * 1000.0 - run_ms)
+    if ss.screen != "practice":
+        ss.needs_rerun = False; st.rerun()
+    elif ss.needs_rerun:
+        ss.needs_rerun = False; _rerun_practice()
 
 def screen_results():
-    ss = st.session_state
-    total = ss.total_questions; correct = ss.correct_questions
-    avg = (ss.total_time_spent / total) if total else 0.0
+    ss = st.session_state; eng = _eng()
+    total = eng.total_questions; correct = eng.correct_questions
+    avg = (eng.total_time_spent / total) if total else 0.0
     pct = int(round((100.0 * correct / total), 0)) if total else 0
-    time_spent = ss.total_time_spent; streak = ss.streak_count
+    time_spent = eng.total_time_spent; streak = ss.streak_count
 
     # 2×2 CSS Grid KPI tiles (dark-mode aware colours via CSS vars)
     st.markdown(
@@ -906,149 +1130,203 @@ def screen_results():
     st.markdown(f"<div class='mini-caption' style='margin-top:8px'>Per-question time now: {ss.per_q}s</div>", unsafe_allow_html=True)
 
     # Side-by-side mini charts
-    df = _history_for_last_10_days()
-    if not df.empty:
+    _prof.mark("screen_results")
+    rows = _history_for_last_10_days()
+    if rows:
+        score = sparkline_svg(tuple((r["label"], r["pct"]) for r in rows), "var(--blue2)", "{:.0f}%", "Score")
+        avg_t = sparkline_svg(tuple((r["label"], round(r["avg"], 2)) for r in rows), "var(--blue)", "{:.1f}s",
+                              "Average time per question")
         c_left, c_right = st.columns(2, gap="small")
         with c_left:
-            ch1 = (
-                alt.Chart(df)
-                .mark_line(point=True)
-                .encode(
-                    x=alt.X("label:N", axis=alt.Axis(title=None, labelAngle=0, labelFontSize=9)),
-                    y=alt.Y("pct:Q", axis=alt.Axis(title=None, labelFontSize=9)),
-                )
-                .properties(height=80)
-            )
-            st.altair_chart(ch1, use_container_width=True)
-            st.markdown("<div class='mini-caption'>Score</div>", unsafe_allow_html=True)
+            st.markdown(f"{score}<div class='mini-caption'>Score</div>", unsafe_allow_html=True)
         with c_right:
-            ch2 = (
-                alt.Chart(df)
-                .mark_line(point=True, color="#2563eb")
-                .encode(
-                    x=alt.X("label:N", axis=alt.Axis(title=None, labelAngle=0, labelFontSize=9)),
-                    y=alt.Y("avg:Q", axis=alt.Axis(title=None, labelFontSize=9)),
-                )
-                .properties(height=80)
-            )
-            st.altair_chart(ch2, use_container_width=True)
-            st.markdown("<div class='mini-caption'>Av. time/question</div>", unsafe_allow_html=True)
+            st.markdown(f"{avg_t}<div class='mini-caption'>Av. time/question</div>", unsafe_allow_html=True)
     else:
         st.markdown("<div class='mini-caption'>No recent history yet — complete a few sessions to see your progress.</div>", unsafe_allow_html=True)
+    _prof.mark("charts")
 
     # Collapsible details
     with st.expander("More details", expanded=False):
-        carried = ss.revisit_loaded
+        carried = eng.revisit_loaded
         st.write("Carried over: " + (", ".join(f"{a}×{b}" for (a, b) in carried) if carried else "None."))
-        wrong_any = sorted(list(set(ss.wrong_attempt_items)))
+        wrong_any = sorted(eng.wrong_attempt_items)
         st.write("To revisit: " + (", ".join(
-            f"{a}×{b}{' (×2)' if (a, b) in ss.wrong_twice else ''}" for a, b in wrong_any
+            f"{a}×{b}{' (×2)' if (a, b) in eng.wrong_twice else ''}" for a, b in wrong_any
         ) or "None."))
 
+    if len(eng.events): _timing_expander(eng)
+    _prof.mark("timing")
+
     if DEBUG:
         _debug_cookies_expander("Debug: cookies (Results)")
+        _debug_latency_expander("Debug: latency (Results)")
+        db_path = _attempts_db_path()
+        if db_path:
+            with st.expander("Debug: attempt store", expanded=False):
+                store = _attempt_store(db_path)
+                st.write("**This user:**", store.user_summary(ss.user))
+                st.write("**Weakest facts:**", store.fact_stats(ss.user, limit=10))
 
     if st.button("Start Over", type="primary", use_container_width=True):
         ss = st.session_state
         ss.screen = "start"
-        ss.running = False
-        ss.finished = False
-        ss.awaiting_answer = False
-        ss.pending_correct = False
-        ss.entry = ""
-        ss.revisit_queue = []
-        ss.revisit_loaded = []
+        ss.engine.reset()
         ss.last_kp_seq = -1
         st.rerun()
 
+def _timing_expander(eng):
+    """Per-fact and per-table latency percentiles and a table × multiplier heatmap (tt_events, NumPy)."""
+    from tt_events import fact_stats, table_stats, heatmap, heatmap_svg
+    sec = lambda v: "–" if v is None else f"{v:.1f}s"
+    fmt = lambda r, key: {key: r["label"], "asked": r["n"], "correct": f"{100 * r['acc']:.0f}%",
+                          "median": sec(r["p50"]), "p90": sec(r["p90"])}
+    with st.expander("Timing by fact", expanded=False):
+        grid = heatmap(eng.events, eng.min_table, eng.max_table)
+        more = f" · {grid['omitted']} less-asked tables not shown" if grid["omitted"] else ""
+        st.markdown(heatmap_svg(grid) + f"<div class='mini-caption'>Colour: % correct · number: median seconds{more}</div>",
+                    unsafe_allow_html=True)
+        st.markdown("**By table**"); _rows_table([fmt(r, "table") for r in table_stats(eng.events)])
+        st.markdown("**Slowest facts**"); _rows_table([fmt(r, "fact") for r in fact_stats(eng.events)[:10]])
+
 def screen_assign():
     # Minimal heading to remove excess top whitespace
     st.markdown("<div class='tt-title'>Assign</div>", unsafe_allow_html=True)
 
+    from tt_roster import assignment_params, assignment_url
+
     # Apply query params on entry and persist them immediately
     _apply_assign_qp_and_persist()
     ss = st.session_state
 
+    # Same questions for everyone with the link: a seed in the URL (kept in the Assign URL too)
+    def _toggle_seed():
+        ss.seed = secrets.randbelow(SEED_MAX + 1) if ss.assign_same else None
+        _set_url_params(_current_params_from_state())
+    ss.assign_same = ss.seed is not None          # reflects a seed that arrived in the URL
+    st.checkbox("Same questions for everyone with this link", key="assign_same", on_change=_toggle_seed,
+                help="Adds a seed to the link, so every learner gets the same question order.")
+
     # Build link from the (now persisted) current state; learners land on Start
-    params = {
-        "user": ss.user or "",
-        "min": int(ss.min_table),
-        "max": int(ss.max_table),
-        "per_q": int(_clamp_per_q(ss.per_q)),
-        "minutes": int(ss.total_seconds // 60),
-        "screen": "start",
-        **({"debug": "1"} if DEBUG else {}),
-    }
-    if not params["user"]:
-        params.pop("user", None)
-    qs = urlencode(params)
+    params = assignment_params(ss.user or "", ss.min_table, ss.max_table, ss.per_q,
+                               ss.total_seconds // 60, debug=DEBUG, seed=ss.seed)
 
     st.write("Copy this link and send it to the learner. They can also grab it from the QR code below.")
 
-    # Choose a base URL: prefer window.top in the browser; otherwise env/secrets; otherwise DEFAULT
-    fallback_base = os.getenv("PUBLIC_BASE_URL") or _public_base_url() or DEFAULT_BASE_URL
+    # Configured base URL first (stable for printed codes), then the URL this page was served on
+    base = os.getenv("PUBLIC_BASE_URL") or _public_base_url() or _request_base_url() or DEFAULT_BASE_URL
+    abs_url = assignment_url(base, params)
+    st.markdown(f"<p style='margin:4px 0'><strong>Full URL:</strong> <a href='{escape(abs_url, quote=True)}' "
+                f"rel='noopener'>{escape(abs_url)}</a></p>", unsafe_allow_html=True)
 
-    # Responsive, centred QR (w: up to 420) and taller iframe so it doesn't get clipped
-    st_html(f"""
-      <div id="assign-wrap" style="margin-top:4px">
-        <p style="margin:4px 0"><strong>Full URL:</strong> <span id="fullurl"></span></p>
-        <div id="qrcode" style="margin-top:8px; display:flex; justify-content:center; align-items:center;"></div>
-      </div>
-      <script>
-        (function() {{
-          var qs = {json.dumps(qs)};
-          var base = "";
-          try {{
-            var topLoc = window.top && window.top.location;
-            if (topLoc) {{
-              base = topLoc.origin + topLoc.pathname;
-            }}
-          }} catch (e) {{}}
-          if (!base || base.startsWith("null") || base.includes("srcdoc")) {{
-            base = {json.dumps(fallback_base)};
-          }}
-          var abs = base + (qs ? ("?" + qs) : "");
-          var a = document.createElement('a');
-          a.href = abs; a.rel = 'noopener'; a.textContent = abs;
-          var span = document.getElementById('fullurl'); span.innerHTML = '';
-          span.appendChild(a);
-
-          var q = document.getElementById('qrcode');
-          q.innerHTML = '';
-          var width = 320;
-          try {{
-            var w = q.parentElement.getBoundingClientRect().width || 320;
-            width = Math.max(140, Math.min(420, Math.floor(w - 16)));
-          }} catch (e) {{}}
-
-          var s = document.createElement('script');
-          s.src = "https://cdnjs.cloudflare.com/ajax/libs/qrcodejs/1.0.0/qrcode.min.js";
-          s.onload = function(){{
-            try {{ new QRCode(q, {{ text: abs, width: width, height: width }}); }}
-            catch (e) {{ q.innerHTML = '<em>Could not render QR.</em>'; }}
-          }};
-          document.currentScript.parentNode.appendChild(s);
-        }})();
-      </script>
-    """, height=520)
+    # QR encoded here (tt_qr, cached per URL): no CDN script, works offline
+    st.markdown(f"<div style='max-width:420px; margin:8px auto'>{qr_svg(abs_url)}</div>", unsafe_allow_html=True)
+    st.download_button("Download QR (PNG)", data=qr_png(abs_url), file_name="times-tables-assignment.png",
+                       mime="image/png", use_container_width=True)
+
+    _assign_class(base)
 
     if st.button("Back to Start", use_container_width=True):
         st.session_state.screen = "start"; st.rerun()
 
+def _assign_class(base: str):
+    """Whole-class assignment: CSV roster in, printable sheet / zip of QR codes out."""
+    from tt_roster import parse_roster, build_class_pack
+    ss = st.session_state
+    with st.expander("Whole class (CSV roster)"):
+        st.caption("One learner per row: name, then optional min, max, per_q, minutes "
+                   "(or a header row with a name column). Blank cells use the settings above.")
+        up = st.file_uploader("Class roster", type=["csv", "txt"], key="roster_file")
+        if up is not None and st.button("Generate class links", use_container_width=True):
+            defaults = {"min_table": ss.min_table, "max_table": ss.max_table,
+                        "per_q": ss.per_q, "minutes": ss.total_seconds // 60}
+            learners, problems = parse_roster(up.getvalue().decode("utf-8-sig", errors="replace"), defaults)
+            pack = None
+            if learners:
+                with st.spinner(f"Generating {len(learners)} QR codes…"):
+                    pack = build_class_pack(learners, base, pool=_roster_pool(), debug=DEBUG, seed=ss.seed)
+            ss.roster_pack = {"name": Path(up.name).stem or "class", "problems": problems, "pack": pack}
+        rp = ss.get("roster_pack")
+        if not rp: return
+        for msg in rp["problems"][:20]: st.warning(msg)
+        pack = rp["pack"]
+        if pack is None: st.error("No learners found in that file."); return
+        st.success(f"{pack['count']} learner links ready ({pack['seconds']:.2f}s).")
+        c1, c2 = st.columns(2)
+        c1.download_button("Printable sheet (HTML)", data=pack["sheet"], file_name=f"{rp['name']}-links.html",
+                           mime="text/html", use_container_width=True)
+        c2.download_button("QR codes (zip)", data=pack["zip"], file_name=f"{rp['name']}-links.zip",
+                           mime="application/zip", use_container_width=True)
+
+DASHBOARD_STEP_BYTES = 16 << 20   # parsed per catch-up step while the dashboard reads a large file
+DASHBOARD_CATCHUP_S = 0.25        # catch-up steps run on their own fragment timer
+
+@st.fragment(run_every=DASHBOARD_CATCHUP_S)
+def _dashboard_catch_up(agg):
+    """Fold the results file in bounded steps, one per fragment tick; a full rerun once caught up."""
+    agg.refresh(max_bytes=DASHBOARD_STEP_BYTES)
+    pending = agg.pending_bytes
+    if pending <= 0: st.rerun()
+    st.progress(agg.offset / (agg.offset + pending), text=f"Reading results… {agg.records:,} so far")
+
+def _dashboard_tables(agg):
+    agg.refresh()
+    learners = agg.learners()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Sessions", f"{agg.records:,}"); c2.metric("Learners", f"{len(learners):,}")
+    c3.metric("Refresh", f"{agg.last_refresh_s * 1000:.0f} ms")
+    if learners.empty:
+        st.write("No results yet.")
+    else:
+        st.markdown("**Learners**")
+        st.dataframe(learners, use_container_width=True)
+        st.download_button("Download learners (CSV)", data=learners.to_csv(), file_name="learners.csv",
+                           mime="text/csv", use_container_width=True)
+        st.markdown("**Most-missed facts**")
+        st.dataframe(agg.facts(limit=40), use_container_width=True)
+    if agg.bad_lines: st.caption(f"{agg.bad_lines} unreadable line(s) skipped.")
+    if st.button("Refresh", use_container_width=True): st.rerun()
+
+def screen_dashboard():
+    st.markdown("<div class='tt-title'>Class results</div>", unsafe_allow_html=True)
+    key = _dashboard_key()
+    if key and not hmac.compare_digest(str(_qp_scalar("key") or ""), key):
+        st.error("This dashboard needs its access key in the URL (?key=…)."); return
+    path = _results_jsonl_path()
+    if not path:
+        st.info("Set TTT_RESULTS_JSONL (or results_jsonl in secrets) to collect session results.")
+    else:
+        agg = _result_aggregator(path)
+        if agg.pending_bytes > DASHBOARD_STEP_BYTES:
+            _dashboard_catch_up(agg)   # first load of a large file: the page stays live while it is read
+        else:
+            _dashboard_tables(agg)
+    if st.button("Back to Start", use_container_width=True):
+        st.session_state.screen = "start"; st.rerun()
+
 # ---------------- Router + single footer ----------------
 def _render():
+    if not st.session_state.get("resume_checked"):          # once per browser session, before any screen
+        st.session_state.resume_checked = True
+        if st.session_state.screen == "start":
+            try: _resume_from_cookie()
+            except Exception as e:                          # a failed resume must not cost the Start screen
+                logger.warning("Resume failed: %s: %s", type(e).__name__, e); st.session_state.screen = "start"
+    screen = st.session_state.screen
     try:
-        screen = st.session_state.screen
         if screen == "start":
             screen_start()
         elif screen == "practice":
-            screen_practice()
+            _s_bar(_now())   # fixed at the bottom; animated by CSS, so fragments never resend it
+            screen_practice_runner() if _eng().runner else screen_practice()
         elif screen == "assign":
             screen_assign()
+        elif screen == "dashboard":
+            screen_dashboard()
         else:
             screen_results()
     except Exception as e:
         st.error("Unhandled exception while rendering."); st.exception(e)
+    _prof.mark(f"screen_{screen}")
 
     # Footer (kept small so it stays above fold)
     if st.session_state.screen == "start":
@@ -1056,14 +1334,18 @@ def _render():
         assign_qs = urlencode(_current_params_from_state())
         st.markdown(f"<div class='mini-caption'>Times Tables Trainer {APP_VERSION} from The Chalkface Project. "
                     f"<a href='?{assign_qs}'>Assign</a></div>", unsafe_allow_html=True)
-    elif st.session_state.screen == "practice":
-        st.markdown(f"<div class='mini-caption'>Times Tables Trainer {APP_VERSION} — per-Q: {int(st.session_state.per_q)}s</div>", unsafe_allow_html=True)
-    else:
+    elif st.session_state.screen != "practice":  # practice footer is rendered inside its fragment
         st.markdown(f"<div class='mini-caption'>Times Tables Trainer {APP_VERSION} from The Chalkface Project</div>", unsafe_allow_html=True)
+    _prof.mark("footer")
+    if PROFILE: _profile_panel()
+    if METER: _payload_panel()
 
+    # The practice fragment ticks itself (run_every); only transitions need a full rerun here
     if st.session_state.needs_rerun:
         st.session_state.needs_rerun = False; st.rerun()
-    elif st.session_state.running:
-        time.sleep(0.1); st.rerun()
 
-_render()
+try:
+    _render()
+finally:
+    _prof.finish()   # also on st.rerun(), which unwinds through here
+    _meter().finish(st.session_state.get("screen", "?"))
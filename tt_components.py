@@ -0,0 +1,33 @@
+# tt_components.py — one-time setup for the app's custom components and static stylesheet.
+# The app script re-executes on every rerun, so functions and caches defined in it are rebuilt
+# each time (and an st.cache_resource lookup costs more than the declaration it would save). This
+# module is imported once per process: components are declared and tt.css is read exactly once.
+
+from functools import lru_cache
+from pathlib import Path
+
+from streamlit.components.v1 import declare_component
+
+ROOT = Path(__file__).resolve().parent
+ASSETS_DIR = ROOT / "assets_component"
+KEYPAD_DIR = ROOT / "keypad_component"
+
+@lru_cache(maxsize=None)
+def keypad_component() -> tuple:
+    """(component function or None, load error)."""
+    try:
+        if (KEYPAD_DIR / "index.html").exists():
+            return declare_component("tt_keypad", path=str(KEYPAD_DIR)), ""  # returns a press payload or None
+        return None, f"Keypad component not found at: {KEYPAD_DIR}/index.html"
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+@lru_cache(maxsize=None)
+def asset_component():
+    """The tt.css injector, or None when its files are missing."""
+    try: return declare_component("tt_assets", path=str(ASSETS_DIR)) if (ASSETS_DIR / "index.html").exists() else None
+    except Exception: return None
+
+@lru_cache(maxsize=1)
+def static_css() -> str:
+    return (ASSETS_DIR / "tt.css").read_text(encoding="utf-8")
@@ -0,0 +1,124 @@
+# tt_dispatch.py — background Discord webhook delivery for the Times Tables Trainer.
+# One dispatcher per process (held by st.cache_resource in the app) owns a worker thread and a
+# pooled HTTP session. Results from many learners are queued, coalesced per webhook URL into
+# digest messages that fit Discord's content limit, and sent while honouring rate limits, so
+# ending a session never waits on the network.
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("ttt")
+
+MAX_CONTENT_CHARS = 1900     # Discord allows 2000; keep headroom as _send_results_discord does
+DIGEST_SEPARATOR = "\n\n"
+
+class WebhookDispatcher:
+    """Queue webhook messages and deliver them as digests from a daemon thread.
+
+    `submit(url, content)` returns a Future resolving to an attempt dict
+    (`status`, `ok`, `response` or `error`, `batched`, `digest_chars`, `sent_at`).
+    Messages arriving within `linger` seconds of each other for the same URL share a digest.
+    """
+
+    def __init__(self, linger: float = 1.0, timeout: float = 10.0, max_retries: int = 3,
+                 max_chars: int = MAX_CONTENT_CHARS, session: requests.Session | None = None):
+        self.linger = float(linger)
+        self.timeout = float(timeout)
+        self.max_retries = int(max_retries)
+        self.max_chars = int(max_chars)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+            session.mount("https://", adapter); session.mount("http://", adapter)
+        self._session = session
+        self._q: queue.Queue = queue.Queue()
+        self._blocked_until: dict[str, float] = {}   # url -> monotonic time the bucket refills
+        self._thread = threading.Thread(target=self._run, name="ttt-webhook", daemon=True)
+        self._thread.start()
+
+    # ---------- Public ----------
+    def submit(self, url: str, content: str) -> Future:
+        fut: Future = Future()
+        content = (content or "").strip()
+        if len(content) > self.max_chars: content = content[:self.max_chars] + "…"
+        self._q.put((url, content, fut))
+        return fut
+
+    def pending(self) -> int:
+        return self._q.qsize()
+
+    # ---------- Worker ----------
+    def _run(self):
+        while True:
+            batch = [self._q.get()]
+            end = time.monotonic() + self.linger
+            while True:
+                left = end - time.monotonic()
+                if left <= 0: break
+                try: batch.append(self._q.get(timeout=left))
+                except queue.Empty: break
+            by_url: dict[str, list] = {}
+            for url, content, fut in batch:
+                by_url.setdefault(url, []).append((content, fut))
+            for url, items in by_url.items():
+                for digest, futs in self._digests(items):
+                    try:
+                        result = self._deliver(url, digest)
+                    except Exception as e:  # never let the worker die
+                        logger.exception("Discord webhook unexpected error")
+                        result = {"status": None, "ok": False, "error": f"{type(e).__name__}: {e}"}
+                    result.update({"batched": len(futs), "digest_chars": len(digest),
+                                   "sent_at": time.time()})
+                    for fut in futs:
+                        if not fut.done(): fut.set_result(dict(result))
+
+    def _digests(self, items):
+        """Pack messages into digests of at most max_chars, preserving arrival order."""
+        cur, futs, size = [], [], 0
+        for content, fut in items:
+            extra = len(content) + (len(DIGEST_SEPARATOR) if cur else 0)
+            if cur and size + extra > self.max_chars:
+                yield DIGEST_SEPARATOR.join(cur), futs
+                cur, futs, size = [], [], 0
+                extra = len(content)
+            cur.append(content); futs.append(fut); size += extra
+        if cur: yield DIGEST_SEPARATOR.join(cur), futs
+
+    def _wait_for_bucket(self, url: str):
+        delay = self._blocked_until.get(url, 0.0) - time.monotonic()
+        if delay > 0: time.sleep(delay)
+
+    def _note_rate_headers(self, url: str, r: requests.Response):
+        try:
+            remaining = r.headers.get("X-RateLimit-Remaining")
+            reset_after = r.headers.get("X-RateLimit-Reset-After")
+            if remaining is not None and int(remaining) <= 0 and reset_after is not None:
+                self._blocked_until[url] = time.monotonic() + float(reset_after)
+        except (TypeError, ValueError):
+            pass
+
+    def _deliver(self, url: str, content: str) -> dict:
+        payload = {"content": content}
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_bucket(url)
+            try:
+                r = self._session.post(url, json=payload, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                logger.exception("Discord webhook request error")
+                return {"status": None, "ok": False, "error": f"RequestException: {e}"}
+            self._note_rate_headers(url, r)
+            if r.status_code == 429 and attempt < self.max_retries:
+                try: retry_after = float((r.json() or {}).get("retry_after", 1.0))
+                except Exception: retry_after = float(r.headers.get("Retry-After", 1.0) or 1.0)
+                logger.warning("Discord webhook rate limited; retrying in %.2fs", retry_after)
+                self._blocked_until[url] = time.monotonic() + retry_after
+                continue
+            if r.ok: logger.info("Discord webhook success (status %s)", r.status_code)
+            else: logger.error("Discord webhook non-2xx (status %s): %s", r.status_code, (r.text or "")[:200])
+            return {"status": r.status_code, "ok": r.ok, "response": (r.text or "")[:500]}
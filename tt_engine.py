@@ -0,0 +1,773 @@
+# tt_engine.py — headless session engine for the Times Tables Trainer.
+# Pure Python (no Streamlit): question selection, spaced repeats, adaptive per-question timing,
+# keypad entry and session clocks. The Streamlit screens own one engine per browser session and
+# only render its state; benchmarks and tools drive it directly with a simulated clock/RNG.
+
+import heapq
+import random
+import sys
+import time
+import types
+from array import array
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+
+MULTIPLIERS = list(range(1, 13))  # multipliers stay 1..12; "table" (a) may exceed 12
+MIN_PER_Q = 2
+MAX_PER_Q = 60
+
+SEED_MAX = 999_999   # seeds in assignment links (?seed=) are 0..SEED_MAX
+DECK_MIN = 64        # picks drawn when a session starts (about one per second of session),
+DECK_MAX = 512       # clamped to this range; a long session draws further blocks as it goes
+
+EVENT_CAPACITY = 16384   # events kept per session: 180 minutes at one answer every 0.66 s
+SNAPSHOT_FACTS = 128     # facts kept per list in a resume snapshot (the most recently missed)
+OUT_CORRECT, OUT_WRONG, OUT_TIMEOUT = 0, 1, 2   # EventLog outcomes
+
+OK_FLASH_S = 0.6     # green "correct" flash before the next question
+SHAKE_S = 0.45       # red "wrong" shake
+
+def clamp_per_q(x: float | int) -> int:
+    return int(min(MAX_PER_Q, max(MIN_PER_Q, round(float(x)))))
+
+# ---------- Packed facts ----------
+# A fact a×b is one small int: multipliers (1..12) take the low 4 bits, the table the rest.
+FACT_BITS = 4
+
+def pack_fact(a: int, b: int) -> int: return (int(a) << FACT_BITS) | int(b)
+def unpack_fact(k: int) -> tuple[int, int]: return k >> FACT_BITS, k & ((1 << FACT_BITS) - 1)
+
+class FactSet:
+    """Facts as packed ints with O(1) membership, iterated in insertion order as (a, b) pairs.
+
+    Backed by a dict used as an ordered set, so the results report lists facts in the order
+    they were first missed; `in`, `len` and iteration behave like the lists it replaces.
+    """
+    __slots__ = ("_keys",)
+
+    def __init__(self, items=()):
+        self._keys = dict.fromkeys(pack_fact(a, b) for a, b in items)
+
+    def add(self, item) -> bool:
+        """Add (a, b); False if it was already there."""
+        k = pack_fact(*item)
+        if k in self._keys: return False
+        self._keys[k] = None
+        return True
+
+    def __contains__(self, item) -> bool: return pack_fact(*item) in self._keys
+    def __len__(self) -> int: return len(self._keys)
+    def __iter__(self): return map(unpack_fact, self._keys)
+    def __repr__(self) -> str: return f"FactSet({list(self)})"
+    def clear(self): self._keys.clear()
+    def packed(self, limit: int | None = None) -> list[int]:
+        """Packed facts in insertion order; only the last `limit` added if given."""
+        if limit is None or len(self._keys) <= limit: return list(self._keys)
+        return list(islice(reversed(self._keys), limit))[::-1]
+
+    @classmethod
+    def from_packed(cls, keys) -> "FactSet":
+        fs = cls(); fs._keys = dict.fromkeys(int(k) for k in keys); return fs
+
+_SHARED = (type, types.FunctionType, types.MethodType, types.BuiltinFunctionType, types.ModuleType)
+
+def deep_sizeof(obj, seen: set | None = None) -> int:
+    """Bytes held by `obj` and the containers and slot/instance attributes it owns (each object once).
+
+    Functions, methods and classes are not followed: they are shared, not per-session state.
+    """
+    seen = set() if seen is None else seen
+    stack = [obj]; total = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SHARED): continue
+        seen.add(id(o)); total += sys.getsizeof(o)
+        if isinstance(o, dict): stack.extend(o.keys()); stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)): stack.extend(o)
+        elif isinstance(o, (str, bytes, bytearray, int, float, bool, array)) or o is None: pass
+        else:
+            for cls in type(o).__mro__:
+                for name in getattr(cls, "__slots__", ()):
+                    if hasattr(o, name): stack.append(getattr(o, name))
+            if hasattr(o, "__dict__"): stack.append(o.__dict__)
+    return total
+
+@lru_cache(maxsize=8)
+def _multiplier_index(multipliers: tuple) -> dict:
+    return {b: i for i, b in enumerate(multipliers)}
+
+class _Fenwick:
+    """Fenwick tree over `size` leaves that all start at `unit`, storing only what moved.
+
+    Node i of the uniform tree is unit × lowbit(i), so it is computed, and `_delta` holds the
+    nodes changed since (O(log size) per leaf changed). Memory follows the leaves touched, not
+    `size`.
+    """
+    __slots__ = ("size", "unit", "top", "_delta")
+
+    def __init__(self, size: int, unit: float):
+        self.size = size; self.unit = unit
+        self.top = 1 << (size.bit_length() - 1) if size else 0
+        self._delta: dict[int, float] = {}
+
+    def add(self, i: int, d: float):
+        """Add `d` to leaf i (0-based)."""
+        if not d: return
+        delta = self._delta; size = self.size; i += 1
+        while i <= size:
+            v = delta.get(i, 0.0) + d
+            if v: delta[i] = v
+            else: del delta[i]
+            i += i & -i
+
+    def total(self) -> float:
+        delta = self._delta; i = self.size; s = self.unit * i
+        while i > 0:
+            s += delta.get(i, 0.0); i -= i & -i
+        return s
+
+    def find(self, u: float) -> tuple[int, float]:
+        """(leaf, u - prefix sum before it) for the leaf where the running sum passes u."""
+        delta = self._delta; unit = self.unit; size = self.size
+        pos = 0; step = self.top
+        while step:
+            nxt = pos + step
+            if nxt <= size:
+                node = unit * step + delta.get(nxt, 0.0)      # lowbit(nxt) == step here
+                if node <= u: pos = nxt; u -= node
+            step >>= 1
+        return pos, u
+
+    def reset(self): self._delta.clear()
+
+class FactSampler:
+    """Weighted sampler over the (table × multiplier) grid: a Fenwick tree over tables, then a
+    scan of the chosen table's multipliers.
+
+    Every fact weighs DEFAULT_WEIGHT until `set_weight`/`load_weights` says otherwise; a table
+    gets its own array of multiplier weights only then, and the trees store only the nodes that
+    moved. So a session holds memory for the facts it weights or bans, not for the range: a
+    1..10000 range costs what 2..12 does. `draw`, `ban`, `unban` and `set_weight` are
+    O(log tables + multipliers). A banned fact keeps its base weight and gets it back on `unban`.
+    """
+    __slots__ = ("min_table", "max_table", "multipliers", "_mpos", "_m", "tables", "n", "_buckets",
+                 "_banned", "_tree", "_base_tree")
+
+    DEFAULT_WEIGHT = 1.0
+
+    def __init__(self, min_table: int, max_table: int, multipliers=MULTIPLIERS):
+        self.min_table = int(min_table)
+        self.max_table = int(max_table)
+        self.multipliers = tuple(multipliers)
+        self._mpos = _multiplier_index(self.multipliers)     # shared by every sampler
+        self._m = len(self.multipliers)
+        self.tables = max(0, self.max_table - self.min_table + 1)
+        self.n = self.tables * self._m
+        self._buckets: dict[int, array] = {}         # table row -> base weights, once any differs
+        self._banned: set[int] = set()
+        unit = self.DEFAULT_WEIGHT * self._m
+        self._tree = _Fenwick(self.tables, unit)      # per-table sums of effective weights (0 while banned)
+        self._base_tree = _Fenwick(self.tables, unit) # per-table sums of base weights (FactDeck draws)
+
+    # ---------- Index ----------
+    def index(self, a: int, b: int) -> int:
+        """Grid position of a×b, or -1 if outside the grid."""
+        j = self._mpos.get(b)
+        if j is None or not (self.min_table <= a <= self.max_table): return -1
+        return (a - self.min_table) * self._m + j
+
+    def item(self, i: int) -> tuple[int, int]:
+        q, j = divmod(i, self._m)
+        return (self.min_table + q, self.multipliers[j])
+
+    def _base(self, i: int) -> float:
+        bucket = self._buckets.get(i // self._m)
+        return bucket[i % self._m] if bucket is not None else self.DEFAULT_WEIGHT
+
+    def _set_base(self, i: int, w: float):
+        t, j = divmod(i, self._m)
+        bucket = self._buckets.get(t)
+        if bucket is None:
+            if w == self.DEFAULT_WEIGHT: return
+            bucket = self._buckets[t] = array("d", [self.DEFAULT_WEIGHT]) * self._m
+        d = w - bucket[j]; bucket[j] = w
+        self._base_tree.add(t, d)
+        if i not in self._banned: self._tree.add(t, d)
+
+    def total(self) -> float: return self._tree.total()
+
+    # ---------- Public ----------
+    def weight(self, a: int, b: int) -> float:
+        i = self.index(a, b)
+        return 0.0 if i < 0 or i in self._banned else self._base(i)
+
+    def set_weight(self, a: int, b: int, w: float):
+        i = self.index(a, b)
+        if i >= 0: self._set_base(i, max(0.0, float(w)))
+
+    def load_weights(self, indices, weights):
+        """Replace every base weight at once: grid positions `indices` get `weights` (≥ 0), every
+        other fact DEFAULT_WEIGHT. Current bans are kept. O(k log tables) for k weights given.
+        """
+        self._buckets.clear(); self._tree.reset(); self._base_tree.reset()
+        for i in self._banned: self._tree.add(i // self._m, -self.DEFAULT_WEIGHT)
+        n = self.n
+        for i, w in zip(indices, weights):
+            i = int(i)
+            if 0 <= i < n: self._set_base(i, max(0.0, float(w)))
+
+    def ban(self, a: int, b: int):
+        i = self.index(a, b)
+        if i < 0 or i in self._banned: return
+        self._banned.add(i); self._tree.add(i // self._m, -self._base(i))
+
+    def unban(self, a: int, b: int):
+        i = self.index(a, b)
+        if i < 0 or i not in self._banned: return
+        self._banned.discard(i); self._tree.add(i // self._m, self._base(i))
+
+    def clear_bans(self):
+        """Unban everything (cost proportional to the number banned, not the grid size)."""
+        for i in self._banned: self._tree.add(i // self._m, self._base(i))
+        self._banned.clear()
+
+    def is_banned(self, a: int, b: int) -> bool:
+        i = self.index(a, b)
+        return i >= 0 and i in self._banned
+
+    def is_uniform(self) -> bool:
+        """True while every base weight is DEFAULT_WEIGHT (bans aside)."""
+        return not self._buckets
+
+    def _pick(self, tree: _Fenwick, rng, banned) -> int:
+        """Grid position drawn in proportion to `tree`'s weights (bans from `banned`); -1 on none."""
+        for _ in range(4):   # retries only guard against float rounding at the very end
+            total = tree.total()
+            if total <= 0.0: return -1
+            t, u = tree.find(rng.random() * total)
+            if t >= self.tables: continue
+            bucket = self._buckets.get(t); m = self._m; row = t * m; last = -1
+            for j in range(m):
+                if row + j in banned: continue
+                w = bucket[j] if bucket is not None else self.DEFAULT_WEIGHT
+                if w <= 0.0: continue
+                if u < w: return row + j
+                u -= w; last = row + j
+            if last >= 0: return last
+        return -1
+
+    def draw(self, rng):
+        """Pick a fact with probability proportional to its weight; None if all weights are 0."""
+        i = self._pick(self._tree, rng, self._banned)
+        return self.item(i) if i >= 0 else None
+
+    def draw_base(self, rng) -> int:
+        """Grid position drawn by base weight, ignoring bans; -1 if every base weight is 0."""
+        return self._pick(self._base_tree, rng, ())
+
+class FactDeck:
+    """A session's random picks drawn up front: grid indices in a flat array, read by position.
+
+    Each block is drawn from the deck's own RNG over the sampler's base weights (one `choices`
+    call while they are uniform), so a seed and range always give the same order whatever the
+    learner answers. A pick that is banned when it comes up (waiting for its repeat, or wrong
+    twice) is skipped, which is the same as drawing from the unbanned facts. `next` returns None
+    when nothing can be dealt (every fact banned, or a block of skips), and the caller falls back
+    to the sampler.
+    """
+    __slots__ = ("sampler", "rng", "block", "pos", "_picks", "dealable")
+
+    def __init__(self, sampler: FactSampler, rng, block: int):
+        self.sampler = sampler
+        self.rng = rng
+        self.block = max(1, int(block))
+        self.pos = 0
+        self._picks = array("H" if sampler.n <= 0xFFFF else "I")    # 2 bytes per pick up to 5,461 tables
+        self.dealable = sampler._base_tree.total() > 0.0
+        if self.dealable: self._extend()
+
+    def __len__(self) -> int: return len(self._picks)
+
+    def seek(self, pos: int):
+        """Continue from pick `pos` (blocks are redrawn as needed; reproducible for a seeded deck)."""
+        while self.dealable and len(self._picks) < pos: self._extend()
+        self.pos = min(int(pos), len(self._picks))
+
+    def _extend(self):
+        sampler = self.sampler
+        if sampler.is_uniform(): self._picks.extend(self.rng.choices(range(sampler.n), k=self.block))
+        else: self._picks.extend(max(0, sampler.draw_base(self.rng)) for _ in range(self.block))
+
+    def next(self):
+        sampler = self.sampler; banned = sampler._banned
+        if not self.dealable or len(banned) >= sampler.n: return None
+        picks = self._picks; pos = self.pos
+        for _ in range(self.block):
+            if pos >= len(picks): self._extend()
+            i = picks[pos]; pos += 1
+            if i not in banned:
+                self.pos = pos; return sampler.item(i)
+        self.pos = pos
+        return None
+
+class RepeatScheduler:
+    """Spaced repeats keyed on "due at question number N".
+
+    A heap of [due, seq, item] entries plus an item → entry index gives O(log n) schedule and
+    pop-due and O(1) cancel (cancelled entries are tombstoned and skipped, and the heap is
+    compacted once they outnumber live ones). `advance` moves the question counter by one.
+    """
+    __slots__ = ("qno", "_heap", "_index", "_seq", "_dead")
+
+    def __init__(self):
+        self.qno = 0
+        self._heap: list = []
+        self._index: dict = {}
+        self._seq = 0
+        self._dead = 0
+
+    def __len__(self) -> int: return len(self._index)
+    def __contains__(self, item) -> bool: return item in self._index
+
+    def clear(self):
+        self.qno = 0; self._heap.clear(); self._index.clear(); self._dead = 0
+
+    def advance(self):
+        self.qno += 1
+
+    def schedule(self, item, gap: int) -> bool:
+        """Make `item` due `gap` questions from now; False if it is already scheduled."""
+        if item in self._index: return False
+        self._seq += 1
+        entry = [self.qno + int(gap), self._seq, item]
+        self._index[item] = entry
+        heapq.heappush(self._heap, entry)
+        return True
+
+    def cancel(self, item) -> bool:
+        entry = self._index.pop(item, None)
+        if entry is None: return False
+        entry[2] = None; self._dead += 1
+        if self._dead > 32 and self._dead > len(self._index):
+            self._heap = [e for e in self._heap if e[2] is not None]
+            heapq.heapify(self._heap); self._dead = 0
+        return True
+
+    def pop_due(self):
+        """Remove and return the most overdue item, or None if nothing is due yet."""
+        heap = self._heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap); self._dead -= 1
+        if heap and heap[0][0] <= self.qno:
+            item = heapq.heappop(heap)[2]
+            del self._index[item]
+            return item
+        return None
+
+    def items(self) -> list:
+        """Live entries as (item, questions_remaining), soonest first."""
+        return [(e[2], e[0] - self.qno) for e in sorted(self._index.values())]
+
+class EventLog:
+    """Every scored question as parallel typed arrays: (fact, outcome, response ms, attempt).
+
+    One event is 6 bytes (8 for tables over 4095) and no Python object survives an append:
+    packed fact ('H'/'I'), outcome OUT_* ('B'), response time in ms ('H', capped at 65.5 s) and
+    attempt, the nth time this fact was asked this session ('B', capped at 255; counted in a
+    dict keyed by packed fact, so it holds only the facts asked whatever the table range). The
+    arrays grow by amortized O(1) appends up to `capacity`; past that the oldest events are
+    overwritten. Statistics over the log live in tt_events (vectorized, NumPy). The log is not
+    part of `snapshot()`, so a resumed session's log starts at the resume.
+    """
+    __slots__ = ("capacity", "fact", "outcome", "ms", "attempt", "n", "_asked")
+
+    def __init__(self, max_table: int = 12, capacity: int = EVENT_CAPACITY):
+        self.capacity = max(1, int(capacity))
+        self.fact = array("I" if max_table >= 1 << (16 - FACT_BITS) else "H")
+        self.outcome = array("B"); self.ms = array("H"); self.attempt = array("B")
+        self.n = 0                                        # events appended, including overwritten ones
+        self._asked: dict[int, int] = {}                  # packed fact -> times asked
+
+    def __len__(self) -> int: return min(self.n, self.capacity)
+
+    def append(self, k: int, outcome: int, seconds: float):
+        asked = self._asked
+        att = asked.get(k, 0) + 1; asked[k] = att
+        if att > 255: att = 255
+        ms = int(seconds * 1000.0)
+        if ms > 65535: ms = 65535
+        elif ms < 0: ms = 0
+        if self.n < self.capacity:
+            self.fact.append(k); self.outcome.append(outcome); self.ms.append(ms); self.attempt.append(att)
+        else:
+            i = self.n % self.capacity
+            self.fact[i] = k; self.outcome[i] = outcome; self.ms[i] = ms; self.attempt[i] = att
+        self.n += 1
+
+class SessionEngine:
+    """One learner's practice session.
+
+    `clock` is any zero-argument callable returning seconds (default: time.monotonic) and `rng`
+    any random.Random-like object with `random`/`randint`/`choice` (default: a fresh
+    random.Random). All timestamps passed in or stored are on that clock.
+
+    Random picks are dealt from a FactDeck drawn at `start`. Passing `seed` to `start` makes the
+    session reproducible: the deck and the repeat gaps come from RNGs derived from the seed, so
+    learners on the same seed and range get the same questions in the same order (apart from
+    where their own mistakes splice in repeats).
+
+    Per-fact outcomes are FactSets (packed ints, insertion-ordered) and `attempts_wrong` and the
+    repeat schedule are keyed by packed facts; `footprint()` reports the bytes a live session holds.
+    Every scored question is also appended to `events` (an EventLog) for the Results statistics.
+    """
+    __slots__ = ("clock", "rng", "min_table", "max_table", "per_q", "total_seconds", "on_record",
+                 "running", "finished", "session_start", "deadline", "q_start", "q_deadline",
+                 "awaiting_answer", "a", "b", "total_questions", "correct_questions", "total_time_spent",
+                 "wrong_attempt_items", "missed_items", "wrong_twice", "attempts_wrong", "repeats",
+                 "entry", "shake_until", "ok_until", "pending_correct", "revisit_queue", "revisit_loaded",
+                 "seed", "deck", "runner", "issued", "spliced", "next_qid", "sampler", "events")
+
+    def __init__(self, min_table: int = 2, max_table: int = 12, per_q: int = 10,
+                 total_seconds: int = 180, clock=None, rng=None):
+        self.clock = clock or time.monotonic
+        self.rng = rng or random.Random()
+        self.min_table = int(min_table)
+        self.max_table = int(max_table)
+        self.per_q = clamp_per_q(per_q)
+        self.total_seconds = int(total_seconds)
+        # Optional hook called as on_record(a, b, correct, timed_out, duration) for every scored
+        # question (e.g. to log attempts); it must not block.
+        self.on_record = None
+        self.reset()
+
+    def reset(self):
+        self.running = False
+        self.finished = False
+
+        self.session_start = 0.0
+        self.deadline = 0.0
+        self.q_start = 0.0
+        self.q_deadline = 0.0
+
+        self.awaiting_answer = False
+        self.a = None; self.b = None
+
+        self.total_questions = 0
+        self.correct_questions = 0
+        self.total_time_spent = 0.0
+
+        self.wrong_attempt_items = FactSet()     # wrong at least once, in first-missed order
+        self.missed_items = FactSet()            # timed out at least once
+        self.wrong_twice = FactSet()
+        self.attempts_wrong: dict[int, int] = {}  # packed fact -> wrong answers this session
+        self.repeats = RepeatScheduler()         # keyed by packed fact
+        self.events = EventLog(self.max_table)
+
+        self.entry = ""
+        self.shake_until = 0.0
+        self.ok_until = 0.0
+        self.pending_correct = False
+
+        self.revisit_queue = deque()
+        self.revisit_loaded = []
+        self.seed = None
+        self.deck = None
+
+        # Runner mode: questions handed to the client ahead of time, as (qid, a, b), and the qids
+        # among them that are repeats spliced in by _schedule_repeat
+        self.runner = False
+        self.issued = deque()
+        self.spliced = set()
+        self.next_qid = 0
+
+        # Facts under a scheduled repeat or wrong twice are banned from random selection.
+        # The index is kept across sessions with the same range; only the bans are cleared.
+        sampler = getattr(self, "sampler", None)
+        if sampler is not None and (sampler.min_table, sampler.max_table) == (self.min_table, self.max_table):
+            sampler.clear_bans()
+        else:
+            self.sampler = FactSampler(self.min_table, self.max_table)
+
+    # ---------- Helpers ----------
+    def now(self) -> float: return self.clock()
+
+    def footprint(self) -> dict:
+        """Bytes held by this session, per attribute group plus "total" (clock/hook excluded)."""
+        seen = {id(self.clock), id(self.on_record), id(self.sampler.multipliers), id(self.sampler._mpos)}
+        groups = {
+            "engine": sys.getsizeof(self),
+            "sampler": deep_sizeof(self.sampler, seen),
+            "rng": deep_sizeof(self.rng, seen),
+            "deck": deep_sizeof(self.deck, seen),
+            "outcomes": sum(deep_sizeof(x, seen) for x in (self.wrong_attempt_items, self.missed_items,
+                                                          self.wrong_twice, self.attempts_wrong)),
+            "repeats": deep_sizeof(self.repeats, seen),
+            "events": deep_sizeof(self.events, seen),
+            "queues": sum(deep_sizeof(x, seen) for x in (self.revisit_queue, self.revisit_loaded, self.issued, self.spliced)),
+        }
+        groups["other"] = sum(deep_sizeof(getattr(self, n), seen) for n in self.__slots__ if hasattr(self, n))
+        groups["total"] = sum(groups.values())
+        return groups
+    def required_digits(self) -> int: return len(str(abs(self.a * self.b)))
+
+    # ---------- Lifecycle ----------
+    def start(self, revisit=(), runner: bool = False, seed: int | None = None):
+        """Start a fresh session; `revisit` items (carried over from last time) are asked first.
+
+        With `runner=True` questions are not asked one at a time: the client pulls batches with
+        `prefetch` and reports outcomes through `apply_result`. The deck is drawn here from the
+        sampler's current weights (load them first); `seed` makes it reproducible.
+        """
+        self.reset()
+        if seed is not None:
+            self.seed = int(seed)
+            self.rng = random.Random(f"tt-repeats:{self.seed}")
+            deck_rng = random.Random(f"tt-deck:{self.seed}")
+        else:
+            deck_rng = self.rng
+        self.deck = FactDeck(self.sampler, deck_rng, min(DECK_MAX, max(DECK_MIN, self.total_seconds)))
+        self.running = True; self.runner = bool(runner)
+        self.session_start = self.now(); self.deadline = self.session_start + float(self.total_seconds)
+        items = [(int(a), int(b)) for (a, b) in revisit]
+        self.revisit_queue = deque(items)
+        self.revisit_loaded = items
+        if not self.runner: self.new_question()
+
+    def end(self):
+        self.running = False; self.finished = True; self.awaiting_answer = False
+
+    # ---------- Snapshot / resume ----------
+    def snapshot(self) -> dict:
+        """The running session as plain ints and lists (facts packed), for `restore` elsewhere.
+
+        Questions handed out but not yet scored (the open question, runner prefetch) go into
+        `queue`, so they are asked first after a resume rather than lost or asked twice. The
+        per-fact lists keep the SNAPSHOT_FACTS most recently missed facts, so the snapshot stays
+        bounded however long the session and whatever the range; bans go with the facts kept
+        (a fact awaiting its repeat was missed within the last few questions, so it is among them).
+        """
+        queue = []
+        if (self.awaiting_answer or self.pending_correct) and self.a is not None: queue.append(pack_fact(self.a, self.b))
+        queue += [pack_fact(a, b) for _, a, b in self.issued]
+        queue += [pack_fact(a, b) for a, b in self.revisit_queue]
+        s = self.sampler
+        attempts = self.attempts_wrong
+        if len(attempts) > SNAPSHOT_FACTS:
+            attempts = dict(reversed(list(islice(reversed(attempts.items()), SNAPSHOT_FACTS))))
+        banned = [pack_fact(*s.item(i)) for i in s._banned]
+        if len(banned) > SNAPSHOT_FACTS:                  # every ban is a missed fact
+            banned = [k for k in attempts if s.index(*unpack_fact(k)) in s._banned]
+        return {
+            "seed": self.seed, "min": self.min_table, "max": self.max_table, "per_q": self.per_q,
+            "total_seconds": self.total_seconds, "remaining_ms": int(max(0.0, self.deadline - self.now()) * 1000),
+            "questions": self.total_questions, "correct": self.correct_questions,
+            "time_ms": int(self.total_time_spent * 1000), "runner": self.runner, "next_qid": self.next_qid,
+            "qno": self.repeats.qno, "repeats": self.repeats.items(),      # (packed fact, questions to go)
+            "attempts_wrong": list(attempts.items()), "wrong": self.wrong_attempt_items.packed(SNAPSHOT_FACTS),
+            "missed": self.missed_items.packed(SNAPSHOT_FACTS), "twice": self.wrong_twice.packed(SNAPSHOT_FACTS),
+            "banned": banned, "queue": queue,
+            "revisit_loaded": [pack_fact(a, b) for a, b in self.revisit_loaded],
+            "deck_pos": self.deck.pos if self.deck is not None else 0,
+        }
+
+    def restore(self, snap: dict):
+        """Resume `snapshot()` output: same range, sampler weights already loaded.
+
+        Timers are re-anchored on this engine's clock: the remaining session time continues from
+        now (time spent disconnected is not charged) and the open question gets a fresh timer.
+        A seeded deck continues at the same pick; an unseeded one is drawn afresh.
+        """
+        self.start(runner=True, seed=snap.get("seed"))          # runner=True: ask nothing yet
+        self.runner = bool(snap.get("runner"))
+        self.per_q = clamp_per_q(snap.get("per_q", self.per_q))
+        self.deadline = self.now() + snap.get("remaining_ms", 0) / 1000.0
+        self.session_start = self.deadline - float(self.total_seconds)
+        self.total_questions = int(snap.get("questions", 0)); self.correct_questions = int(snap.get("correct", 0))
+        self.total_time_spent = snap.get("time_ms", 0) / 1000.0
+        self.next_qid = int(snap.get("next_qid", 0))
+        self.attempts_wrong = {int(k): int(n) for k, n in snap.get("attempts_wrong", ())}
+        self.wrong_attempt_items = FactSet.from_packed(snap.get("wrong", ()))
+        self.missed_items = FactSet.from_packed(snap.get("missed", ()))
+        self.wrong_twice = FactSet.from_packed(snap.get("twice", ()))
+        self.repeats.qno = int(snap.get("qno", 0))
+        for k, gap in snap.get("repeats", ()): self.repeats.schedule(int(k), int(gap))
+        for k in snap.get("banned", ()): self.sampler.ban(*unpack_fact(k))
+        self.revisit_queue = deque(unpack_fact(k) for k in snap.get("queue", ()))
+        self.revisit_loaded = [unpack_fact(k) for k in snap.get("revisit_loaded", ())]
+        if self.seed is not None: self.deck.seek(int(snap.get("deck_pos", 0)))
+        if self.now() >= self.deadline: self.end()
+        elif not self.runner: self.new_question()
+
+    # ---------- Selection ----------
+    def pop_due_repeat(self):
+        k = self.repeats.pop_due()
+        if k is None: return None
+        item = unpack_fact(k)
+        self.sampler.unban(*item)
+        return item
+
+    def random_item(self):
+        item = self.deck.next() if self.deck is not None else None
+        if item is None: item = self.sampler.draw(self.rng)
+        if item is not None: return item
+        # Everything banned: fall back to any fact in range
+        return (self.rng.randint(self.min_table, self.max_table), self.rng.choice(MULTIPLIERS))
+
+    def select_next_item(self):
+        if self.revisit_queue:
+            return self.revisit_queue.popleft()
+        self.repeats.advance()
+        due = self.pop_due_repeat()
+        if due: return due
+        return self.random_item()
+
+    def new_question(self):
+        self.a, self.b = self.select_next_item()
+        self.q_start = self.now()
+        self.q_deadline = self.q_start + float(self.per_q)
+        self.awaiting_answer = True
+        self.entry = ""; self.pending_correct = False; self.ok_until = 0.0; self.shake_until = 0.0
+
+    # ---------- Runner mode ----------
+    def prefetch(self, n: int) -> list:
+        """Issue questions until `n` are outstanding; returns them as [(qid, a, b), ...]."""
+        while len(self.issued) < n:
+            self.next_qid += 1
+            a, b = self.select_next_item()
+            self.issued.append((self.next_qid, a, b))
+        return list(self.issued)
+
+    def apply_result(self, qid: int, answer: int | None, duration: float, wrong_tries: int = 0) -> bool:
+        """Score issued question `qid` from what the client submitted; False if it is not outstanding.
+
+        The verdict is the engine's own: `answer` (None if the question timed out) is checked
+        against the issued fact, anything but its product counts as a timeout (the client only
+        submits the right answer early), and `duration` is clamped to 0..per_q.
+        """
+        issued = self.issued
+        for i, entry in enumerate(issued):
+            if entry[0] == qid: break
+        else:
+            return False
+        skipped = [issued.popleft() for _ in range(i)]       # passed over by the client
+        _, a, b = issued.popleft()
+        # Ask next what must not be lost: repeats spliced in after `qid` was issued (they may land
+        # where the client already was) and any spliced repeat passed over (its fact stays banned
+        # until it is asked). Other skipped questions are dropped.
+        spliced = self.spliced
+        issued.extendleft(reversed([e for e in skipped if e[0] > qid or e[0] in spliced]))
+        spliced.discard(qid)
+        self.a, self.b = a, b
+        if wrong_tries: self.wrong_attempt_items.add((a, b))
+        correct = answer is not None and answer == a * b
+        self._score((a, b), correct, not correct, min(max(0.0, float(duration)), float(self.per_q)))
+        return True
+
+    # ---------- Answers ----------
+    def record_question(self, correct: bool, timed_out: bool):
+        """Score the current question, adapt per_q, then ask the next one (or end the session)."""
+        self._score((self.a, self.b), correct, timed_out, self.now() - self.q_start)
+        if self.now() >= self.deadline:
+            self.end()
+        else:
+            self.new_question()
+
+    def _score(self, item, correct: bool, timed_out: bool, duration: float):
+        self.total_questions += 1
+        self.total_time_spent += duration
+
+        # Adaptive timing
+        if correct and duration <= (1.0/3.0) * float(self.per_q):
+            self.per_q = clamp_per_q(self.per_q * 0.9)    # speed up
+        elif duration >= (2.0/3.0) * float(self.per_q):
+            self.per_q = clamp_per_q(self.per_q * 1.1)    # slow down
+
+        k = pack_fact(*item)
+        if correct:
+            self.events.append(k, OUT_CORRECT, duration)
+            self.correct_questions += 1
+            self.repeats.cancel(k)
+            if self.attempts_wrong.get(k, 0) < 2: self.sampler.unban(*item)
+        else:
+            self.events.append(k, OUT_TIMEOUT if timed_out else OUT_WRONG, duration)
+            cnt = self.attempts_wrong.get(k, 0) + 1
+            self.attempts_wrong[k] = cnt
+            self.wrong_attempt_items.add(item)
+            if timed_out: self.missed_items.add(item)
+            if cnt == 1:
+                if k not in self.repeats:
+                    self._schedule_repeat(k, self.rng.randint(2, 4))
+            else:
+                self.wrong_twice.add(item)
+                self.repeats.cancel(k)
+            self.sampler.ban(*item)
+
+        self.awaiting_answer = False
+        if self.on_record is not None: self.on_record(item[0], item[1], correct, timed_out, duration)
+
+    def _schedule_repeat(self, k: int, gap: int):
+        """Ask packed fact `k` again as the `gap`-th question after the one just scored.
+
+        The scheduler counts questions as they are issued. In runner mode the next questions are
+        already issued (prefetched), so a repeat that falls among them is spliced into the issued
+        queue at its place, and one beyond them is scheduled past the outstanding questions.
+        Repeats spliced earlier keep their places and go first when due at the same question, as
+        they would on the scheduler's heap.
+        """
+        issued, spliced = self.issued, self.spliced
+        pos = gap - 1
+        while pos < len(issued) and issued[pos][0] in spliced: pos += 1
+        if pos >= len(issued):
+            self.repeats.schedule(k, pos + 1 - len(issued))
+            return
+        self.next_qid += 1
+        a, b = unpack_fact(k)
+        issued.insert(pos, (self.next_qid, a, b))
+        for i in range(pos + 2, len(issued)):
+            if issued[i][0] in spliced and issued[i - 1][0] not in spliced:
+                issued[i - 1], issued[i] = issued[i], issued[i - 1]
+        spliced.add(self.next_qid)
+
+    def press(self, code: str):
+        """Apply one keypad press: a digit, "C" (clear) or "B" (backspace)."""
+        if not self.awaiting_answer: return
+        if code == "C": self.entry = ""
+        elif code == "B": self.entry = self.entry[:-1]
+        elif code and code.isdigit(): self.entry += code
+
+    def check_entry(self, now_ts: float):
+        """Auto-submit once the entry has as many digits as the answer.
+
+        A correct answer flashes green until `ok_until` and is scored by `settle`; a wrong one
+        clears the entry, shakes, and keeps the question open.
+        """
+        if not self.awaiting_answer or len(self.entry) != self.required_digits(): return
+        try:
+            val = int(self.entry)
+        except ValueError:
+            self.entry = ""; self.shake_until = now_ts + SHAKE_S
+            return
+        if val == self.a * self.b:
+            self.awaiting_answer = False
+            self.pending_correct = True
+            self.ok_until = now_ts + OK_FLASH_S
+        else:
+            self.entry = ""
+            self.wrong_attempt_items.add((self.a, self.b))
+            self.shake_until = now_ts + SHAKE_S
+
+    def settle(self, now_ts: float):
+        """Score a pending correct answer once its flash has finished."""
+        if self.pending_correct and now_ts >= self.ok_until:
+            self.pending_correct = False
+            self.record_question(True, False)
+
+    def tick(self, now_ts: float):
+        """Advance the clocks: end the session at its deadline, time out an unanswered question."""
+        if not self.running: return
+        if self.pending_correct and now_ts < self.ok_until: return
+        if now_ts >= self.deadline:
+            self.end(); return
+        if self.awaiting_answer and now_ts >= self.q_deadline:
+            self.record_question(False, True)
@@ -0,0 +1,125 @@
+# tt_events.py — Results-screen statistics over a session's EventLog (tt_engine).
+# The log's typed arrays are copied into NumPy in bulk (a view would pin them against further
+# appends) and every statistic is a handful of whole-array operations: one sort groups events by
+# fact (or table), group medians and 90th percentiles are read off the sorted runs by index
+# arithmetic (linear interpolation, as numpy.percentile), and accuracy is a bincount. Imported
+# only when the Results screen renders.
+
+from html import escape
+
+import numpy as np
+
+from tt_engine import FACT_BITS, MULTIPLIERS, OUT_CORRECT, OUT_TIMEOUT
+
+QUANTILES = (0.5, 0.9)
+HEATMAP_MAX_ROWS = 24      # table rows drawn at most (a few KB of SVG)
+
+def event_arrays(log) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(fact, outcome, ms, attempt) as NumPy copies of an EventLog's arrays (one memcpy each)."""
+    return tuple(np.frombuffer(a.tobytes(), dtype=a.typecode) for a in (log.fact, log.outcome, log.ms, log.attempt))
+
+def _group_quantiles(keys: np.ndarray, values: np.ndarray, qs=QUANTILES) -> tuple[np.ndarray, list[np.ndarray]]:
+    """(distinct keys, [per-key quantile of `values` for q in qs]); linear interpolation."""
+    if not keys.size: return keys, [np.zeros(0) for _ in qs]
+    order = np.lexsort((values, keys))
+    k = keys[order]; v = values[order].astype(np.float64)
+    starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+    counts = np.diff(np.r_[starts, k.size])
+    out = []
+    for q in qs:
+        pos = starts + q * (counts - 1)
+        lo = np.floor(pos).astype(np.intp); hi = np.ceil(pos).astype(np.intp)
+        out.append(v[lo] + (v[hi] - v[lo]) * (pos - lo))
+    return k[starts], out
+
+def _grouped(keys: np.ndarray, outcome: np.ndarray, ms: np.ndarray) -> dict:
+    """Per distinct key: events, accuracy and p50/p90 seconds of the answered (not timed-out) ones."""
+    uniq, inv = np.unique(keys, return_inverse=True)
+    n = np.bincount(inv, minlength=uniq.size)
+    ok = np.bincount(inv, weights=(outcome == OUT_CORRECT), minlength=uniq.size)
+    answered = outcome != OUT_TIMEOUT
+    p50 = np.full(uniq.size, np.nan); p90 = np.full(uniq.size, np.nan)
+    ak, (q50, q90) = _group_quantiles(inv[answered], ms[answered])
+    p50[ak] = q50 / 1000.0; p90[ak] = q90 / 1000.0
+    return {"key": uniq, "n": n, "acc": ok / np.maximum(n, 1), "p50": p50, "p90": p90}
+
+def _rows(g: dict, label) -> list[dict]:
+    return [{"label": label(int(k)), "n": int(n), "acc": float(a),
+             "p50": None if np.isnan(p) else float(p), "p90": None if np.isnan(q) else float(q)}
+            for k, n, a, p, q in zip(g["key"], g["n"], g["acc"], g["p50"], g["p90"])]
+
+def fact_stats(log) -> list[dict]:
+    """Per fact: label "a×b", events n, accuracy 0..1 and p50/p90 seconds (None if never answered).
+
+    Slowest first (p90, unanswered facts at the top), so the list reads as "practise these next".
+    """
+    fact, outcome, ms, _ = event_arrays(log)
+    mask = (1 << FACT_BITS) - 1
+    rows = _rows(_grouped(fact, outcome, ms), lambda k: f"{k >> FACT_BITS}×{k & mask}")
+    return sorted(rows, key=lambda r: (r["p90"] is not None, -(r["p90"] or 0.0), r["acc"]))
+
+def table_stats(log) -> list[dict]:
+    """Per table (the a in a×b), in table order; same fields as fact_stats."""
+    fact, outcome, ms, _ = event_arrays(log)
+    return _rows(_grouped(fact >> FACT_BITS, outcome, ms), lambda t: f"{t}×")
+
+def heatmap(log, min_table: int, max_table: int, max_rows: int = HEATMAP_MAX_ROWS) -> dict:
+    """Table × multiplier grids for the tables in min..max that were asked: "acc" (accuracy),
+    "p50" (median seconds) and "n", NaN/0 where a fact was not asked.
+
+    Ranges can span thousands of tables, so rows are only drawn for tables in the log, and at most
+    `max_rows` of them (the most asked, in table order); "omitted" counts the rest.
+    """
+    fact, outcome, ms, _ = event_arrays(log)
+    cols = len(MULTIPLIERS)
+    g = _grouped(fact, outcome, ms)
+    t = (g["key"] >> FACT_BITS).astype(np.int64)
+    c = (g["key"] & ((1 << FACT_BITS) - 1)).astype(np.int64) - MULTIPLIERS[0]
+    keep = (t >= min_table) & (t <= max_table) & (c >= 0) & (c < cols)
+    t, c = t[keep], c[keep]
+    tables, row = np.unique(t, return_inverse=True)
+    per_table = np.bincount(row, weights=g["n"][keep], minlength=tables.size)
+    shown = np.sort(np.argsort(-per_table, kind="stable")[:max_rows]) if tables.size > max_rows else np.arange(tables.size)
+    pos = np.full(tables.size, -1, np.int64); pos[shown] = np.arange(shown.size)
+    r = pos[row]; vis = r >= 0
+    shape = (shown.size, cols)
+    acc = np.full(shape, np.nan); p50 = np.full(shape, np.nan); n = np.zeros(shape, np.int64)
+    acc[r[vis], c[vis]] = g["acc"][keep][vis]; p50[r[vis], c[vis]] = g["p50"][keep][vis]
+    n[r[vis], c[vis]] = g["n"][keep][vis]
+    return {"acc": acc, "p50": p50, "n": n, "tables": [int(x) for x in tables[shown]],
+            "omitted": int(tables.size - shown.size)}
+
+# ---------- Rendering ----------
+CELL, GAP, HEAD = 22, 2, 18
+
+def _cell_color(acc: float) -> str:
+    """Red (0%) → amber → green (100%)."""
+    return f"hsl({int(round(120 * acc))}, 70%, 45%)"
+
+def heatmap_svg(grid: dict, title: str = "Accuracy by table and multiplier") -> str:
+    """Inline SVG of `heatmap()`: colour is accuracy, the number the median seconds."""
+    tables = list(grid["tables"]); acc, p50, n = grid["acc"], grid["p50"], grid["n"]
+    head = max(HEAD, 5 * len(str(max(tables, default=0))) + 6)       # room for the widest table label
+    w = head + len(MULTIPLIERS) * (CELL + GAP); h = HEAD + len(tables) * (CELL + GAP)
+    parts = [f"<text x='{head + i * (CELL + GAP) + CELL / 2:.0f}' y='12' text-anchor='middle'>{m}</text>"
+             for i, m in enumerate(MULTIPLIERS)]
+    for r, t in enumerate(tables):
+        y = HEAD + r * (CELL + GAP)
+        parts.append(f"<text x='{head - 4}' y='{y + CELL / 2 + 3:.0f}' text-anchor='end'>{t}</text>")
+        for c, m in enumerate(MULTIPLIERS):
+            x = head + c * (CELL + GAP)
+            if not n[r, c]:
+                parts.append(f"<rect x='{x}' y='{y}' width='{CELL}' height='{CELL}' rx='3' "
+                             f"fill='var(--mini, #64748b)' fill-opacity='0.12'/>")
+                continue
+            tip = f"{t}×{m}: {int(round(100 * acc[r, c]))}% of {n[r, c]}"
+            label = ""
+            if not np.isnan(p50[r, c]):
+                tip += f", median {p50[r, c]:.1f}s"
+                label = (f"<text x='{x + CELL / 2:.0f}' y='{y + CELL / 2 + 3:.0f}' text-anchor='middle' "
+                         f"fill='#fff'>{p50[r, c]:.1f}</text>")
+            parts.append(f"<rect x='{x}' y='{y}' width='{CELL}' height='{CELL}' rx='3' "
+                         f"fill='{_cell_color(float(acc[r, c]))}'><title>{escape(tip)}</title></rect>{label}")
+    return (f"<svg class='heat' viewBox='0 0 {w} {h}' width='100%' role='img' aria-label='{escape(title)}'>"
+            f"<g fill='var(--mini, #64748b)' font-size='8' font-family='system-ui, sans-serif'>"
+            + "".join(parts) + "</g></svg>")
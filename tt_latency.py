@@ -0,0 +1,87 @@
+# tt_latency.py — latency histograms for the Times Tables Trainer.
+# The keypad component stamps presses and paints with high-resolution browser clocks; the server
+# stamps receipt, handling and the end of each practice rerun. Samples land in fixed log-spaced
+# buckets (constant memory, O(1) record) so p50/p90/p99 stay cheap to read while a lesson runs.
+
+import json
+import math
+import threading
+import time
+from array import array
+
+BUCKET_MIN_MS = 0.1          # first bucket edge
+BUCKET_GROWTH = 1.08         # ~4% worst-case error on a reported percentile
+BUCKET_COUNT = 200           # 0.1 ms … ~480 s
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+def _bucket(ms: float) -> int:
+    if ms <= BUCKET_MIN_MS: return 0
+    return min(BUCKET_COUNT - 1, 1 + int(math.log(ms / BUCKET_MIN_MS) / _LOG_GROWTH))
+
+def _bucket_upper(i: int) -> float:
+    return BUCKET_MIN_MS * BUCKET_GROWTH ** i
+
+class LatencyHistogram:
+    """Counts of millisecond samples in log-spaced buckets, plus exact count/sum/max."""
+    __slots__ = ("counts", "n", "total", "max")
+
+    def __init__(self):
+        self.counts = array("L", bytes(array("L").itemsize * BUCKET_COUNT))
+        self.n = 0; self.total = 0.0; self.max = 0.0
+
+    def record(self, ms: float):
+        ms = float(ms)
+        if not (ms >= 0.0) or math.isinf(ms): return      # drop NaN / negative (clock skew)
+        self.counts[_bucket(ms)] += 1
+        self.n += 1; self.total += ms
+        if ms > self.max: self.max = ms
+
+    def percentile(self, q: float) -> float | None:
+        """Upper edge of the bucket holding the q-th percentile (capped at the observed max)."""
+        if not self.n: return None
+        rank = max(1, math.ceil(q / 100.0 * self.n)); seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank: return min(_bucket_upper(i), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        r = lambda v: None if v is None else round(v, 1)
+        return {"n": self.n, "p50": r(self.percentile(50)), "p90": r(self.percentile(90)),
+                "p99": r(self.percentile(99)), "max": r(self.max if self.n else None),
+                "mean": r(self.total / self.n if self.n else None)}
+
+    def to_dict(self) -> dict:
+        """Summary plus the non-empty buckets as [upper_ms, count] pairs."""
+        out = self.summary()
+        out["buckets"] = [[round(_bucket_upper(i), 3), c] for i, c in enumerate(self.counts) if c]
+        return out
+
+class LatencyRecorder:
+    """Named histograms; safe to share between sessions (one lock, held only to count)."""
+
+    def __init__(self):
+        self._hists: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, name: str, ms: float):
+        with self._lock:
+            h = self._hists.get(name)
+            if h is None: h = self._hists[name] = LatencyHistogram()
+            h.record(ms)
+
+    def record_many(self, name: str, samples):
+        for ms in samples or ():
+            try: self.record(name, float(ms))
+            except (TypeError, ValueError): continue
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self._hists.items())}
+
+    def to_json(self, **meta) -> str:
+        with self._lock:
+            data = {"started_at": self.started_at, "dumped_at": time.time(), **meta,
+                    "histograms": {name: h.to_dict() for name, h in sorted(self._hists.items())}}
+        return json.dumps(data, indent=1)
@@ -0,0 +1,125 @@
+# tt_mastery.py — durable per-fact mastery model for the Times Tables Trainer.
+# Dense NumPy arrays over the global (table × multiplier) grid hold an accuracy EWMA, a latency
+# EWMA, the epoch-day each fact was last seen and an attempt count. Attempts are buffered during
+# a session and folded in with one vectorized pass at the end; selection weights for the facts
+# seen in the table range are likewise computed in one pass at session start (unseen facts keep
+# the sampler's default weight, W_NEW). No per-fact Python loops.
+
+import struct
+from array import array
+
+import numpy as np
+
+N_MULT = 12                  # fact id = (a - 1) * 12 + (b - 1); multipliers are 1..12
+ALPHA = 0.3                  # EWMA weight of the newest observation
+LAT_REF_S = 5.0              # latency that counts as "slow" when weighting
+W_NEW = 1.0                  # weight of a fact never seen (= FactSampler.DEFAULT_WEIGHT)
+W_FLOOR = 0.25               # weight of a fully mastered, fast, recently seen fact
+_HEADER = struct.Struct("<BiI")          # version, base epoch-day, fact count
+MASTERY_VERSION = 1
+
+class MasteryModel:
+    """Per-learner mastery over facts a×b (a ≥ 1, b in 1..12)."""
+
+    def __init__(self, rows: int = 12):
+        self.rows = 0
+        self.acc = np.zeros(0, np.float32)     # accuracy EWMA, 0..1
+        self.lat = np.zeros(0, np.float32)     # response-time EWMA, seconds
+        self.last = np.zeros(0, np.int32)      # epoch-day last seen (0 = never)
+        self.n = np.zeros(0, np.uint16)        # attempts seen (saturating)
+        self._grow(rows)
+        self._pending_idx = array("i"); self._pending_ok = array("b"); self._pending_rt = array("f")
+
+    def _grow(self, rows: int):
+        if rows <= self.rows: return
+        extra = (rows - self.rows) * N_MULT
+        self.acc = np.concatenate((self.acc, np.zeros(extra, np.float32)))
+        self.lat = np.concatenate((self.lat, np.zeros(extra, np.float32)))
+        self.last = np.concatenate((self.last, np.zeros(extra, np.int32)))
+        self.n = np.concatenate((self.n, np.zeros(extra, np.uint16)))
+        self.rows = rows
+
+    # ---------- Updates ----------
+    def observe(self, a: int, b: int, correct: bool, response_s: float):
+        """Buffer one attempt (O(1)); folded into the model by `commit`."""
+        if a < 1 or not (1 <= b <= N_MULT): return
+        self._pending_idx.append((a - 1) * N_MULT + (b - 1))
+        self._pending_ok.append(1 if correct else 0)
+        self._pending_rt.append(float(response_s))
+
+    def commit(self, today: int):
+        """Fold buffered attempts in with one vectorized EWMA step per fact.
+
+        k observations of a fact in one batch act like k EWMA steps of their mean:
+        alpha_eff = 1 - (1 - ALPHA)^k; a fact's first ever batch sets the value outright.
+        """
+        if not self._pending_idx: return
+        idx = np.frombuffer(self._pending_idx, dtype=np.int32)
+        self._grow(int(idx.max()) // N_MULT + 1)
+        size = self.rows * N_MULT
+        k = np.bincount(idx, minlength=size)
+        seen = np.flatnonzero(k)
+        kk = k[seen].astype(np.float32)
+        mean_ok = np.bincount(idx, weights=np.frombuffer(self._pending_ok, dtype=np.int8), minlength=size)[seen] / kk
+        mean_rt = np.bincount(idx, weights=np.frombuffer(self._pending_rt, dtype=np.float32), minlength=size)[seen] / kk
+        alpha = np.where(self.n[seen] == 0, 1.0, 1.0 - (1.0 - ALPHA) ** kk).astype(np.float32)
+        self.acc[seen] += alpha * (mean_ok.astype(np.float32) - self.acc[seen])
+        self.lat[seen] += alpha * (mean_rt.astype(np.float32) - self.lat[seen])
+        self.last[seen] = int(today)
+        self.n[seen] = np.minimum(self.n[seen].astype(np.int64) + k[seen], 65535).astype(np.uint16)
+        self._pending_idx = array("i"); self._pending_ok = array("b"); self._pending_rt = array("f")
+
+    # ---------- Selection ----------
+    def weights(self, min_table: int, max_table: int, today: int) -> tuple[np.ndarray, np.ndarray]:
+        """Selection weights of the facts seen in tables min..max, as (FactSampler grid positions
+        ((a-min)*12 + b-1), weights) for `FactSampler.load_weights`; unseen facts keep W_NEW.
+
+        Weak (inaccurate), slow and stale facts weigh more.
+        """
+        lo = (max(1, int(min_table)) - 1) * N_MULT
+        top = min(max(0, int(max_table)) * N_MULT, self.rows * N_MULT)
+        if top <= lo: return np.zeros(0, np.int64), np.zeros(0, np.float64)
+        ids = np.flatnonzero(self.n[lo:top]) + lo
+        acc = self.acc[ids].astype(np.float64); lat = self.lat[ids].astype(np.float64)
+        stale = np.maximum(0, int(today) - self.last[ids]) / 7.0
+        w = (W_FLOOR + 2.0 * (1.0 - acc) + 0.5 * np.minimum(lat / LAT_REF_S, 2.0)
+             + 0.5 * np.minimum(stale, 2.0))
+        return ids - (int(min_table) - 1) * N_MULT, w
+
+    # ---------- Persistence ----------
+    def to_bytes(self, limit: int | None = None) -> bytes:
+        """Sparse compact form: seen facts only (optionally the `limit` most recently seen).
+
+        Layout: header, then uint32 fact-id gaps, uint8 accuracy (/255), uint8 latency
+        (deciseconds, capped), uint16 last-seen day offsets, uint8 counts (capped).
+        """
+        ids = np.flatnonzero(self.n)
+        if limit is not None and ids.size > limit:
+            ids = np.sort(ids[np.argsort(self.last[ids], kind="stable")[-limit:]])
+        base = int(self.last[ids].min()) if ids.size else 0
+        gaps = np.diff(ids, prepend=-1).astype(np.uint32) - 1
+        return b"".join((
+            _HEADER.pack(MASTERY_VERSION, base, ids.size),
+            gaps.astype("<u4").tobytes(),
+            np.round(self.acc[ids] * 255).clip(0, 255).astype(np.uint8).tobytes(),
+            np.round(self.lat[ids] * 10).clip(0, 255).astype(np.uint8).tobytes(),
+            (self.last[ids] - base).clip(0, 65535).astype("<u2").tobytes(),
+            np.minimum(self.n[ids], 255).astype(np.uint8).tobytes(),
+        ))
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "MasteryModel":
+        version, base, count = _HEADER.unpack_from(blob, 0)
+        if version != MASTERY_VERSION: raise ValueError(f"unsupported mastery version {version}")
+        off = _HEADER.size
+        def take(dtype, itemsize):
+            nonlocal off
+            arr = np.frombuffer(blob, dtype=dtype, count=count, offset=off); off += count * itemsize
+            return arr
+        gaps = take("<u4", 4); acc = take(np.uint8, 1); lat = take(np.uint8, 1)
+        last = take("<u2", 2); n = take(np.uint8, 1)
+        ids = np.cumsum(gaps.astype(np.int64) + 1) - 1
+        m = cls(rows=int(ids.max()) // N_MULT + 1 if count else 12)
+        m.acc[ids] = acc / 255.0; m.lat[ids] = lat / 10.0
+        m.last[ids] = last.astype(np.int32) + base; m.n[ids] = n
+        return m
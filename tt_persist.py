@@ -0,0 +1,266 @@
+# tt_persist.py — compact persistence codec for the Times Tables Trainer.
+# Everything the app keeps in the browser (settings, last-10 history, streak, revisit list) is
+# packed into ONE cookie value: a version byte, LEB128 varints, epoch-day / epoch-minute times,
+# facts as small grid indices, optionally raw-deflated, then base64url. The v1 format (four
+# separate JSON cookies) is still readable via state_from_v1 so existing learners migrate.
+# The per-fact mastery model goes in a cookie of its own (encode_mastery), held to
+# MASTERY_TOKEN_BUDGET, so the state cookie stays a couple of hundred bytes however much a learner
+# has practised; state tokens that still carry it are read once and migrated.
+
+import base64
+import json
+import zlib
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+
+PERSIST_VERSION = 2
+_FLAG_DEFLATE = 0x80
+_HAS_SETTINGS, _HAS_STREAK, _HAS_REVISIT, _HAS_MASTERY = 1, 2, 4, 8   # _HAS_MASTERY: read only
+MASTERY_TOKEN_VERSION = 1
+MASTERY_TOKEN_BUDGET = 1500   # chars of an encode_mastery token; about 2.1 KB once encrypted
+_EPOCH_ORD = date(1970, 1, 1).toordinal()
+N_MULT = 12          # facts are packed as (a - min) * 12 + (b - 1); multipliers are 1..12
+HISTORY_KEEP = 10
+
+def empty_state() -> dict:
+    return {"settings": None, "history": [], "streak": {"last": None, "count": 0},
+            "revisit": {"v": 1, "min": None, "max": None, "items": []}, "mastery": None}
+
+@dataclass
+class PersistedState:
+    """Decoded persisted state cached for one browser session.
+
+    Callers mutate the fields in place and call `touch()`; the owner encodes and writes the
+    cookie only when `dirty` is set, so unchanged reruns never re-encode or re-encrypt.
+    """
+    settings: dict | None = None
+    history: list = field(default_factory=list)
+    streak: dict = field(default_factory=lambda: {"last": None, "count": 0})
+    revisit: dict = field(default_factory=lambda: {"v": 1, "min": None, "max": None, "items": []})
+    mastery: dict | None = None       # {"user": str, "blob": bytes} from an older token; not re-encoded
+    dirty: bool = False
+
+    @classmethod
+    def from_dict(cls, state: dict, dirty: bool = False) -> "PersistedState":
+        return cls(settings=state.get("settings"), history=state.get("history") or [],
+                   streak=state.get("streak") or {"last": None, "count": 0},
+                   revisit=state.get("revisit") or {"v": 1, "min": None, "max": None, "items": []},
+                   mastery=state.get("mastery"), dirty=dirty)
+
+    def to_dict(self) -> dict:
+        return {"settings": self.settings, "history": self.history,
+                "streak": self.streak, "revisit": self.revisit, "mastery": self.mastery}
+
+    def touch(self): self.dirty = True
+
+    def encode(self) -> str: return encode_state(self.to_dict())
+
+# ---------- Normalisers (shared by v1 and v2) ----------
+def norm_settings(data) -> dict | None:
+    if not isinstance(data, dict): return None
+    out = {}
+    try:
+        if "user" in data: out["user"] = str(data["user"])
+        for k in ("min_table", "max_table", "per_q", "minutes"):
+            if k in data: out[k] = int(data[k])
+    except Exception:
+        return None
+    return out
+
+def norm_history(items) -> list[dict]:
+    clean = []
+    for it in items or []:
+        try:
+            clean.append({"t": str(it.get("t")), "pct": int(it.get("pct", 0)),
+                          "avg": float(it.get("avg", 0.0)), "q": int(it.get("q", 0))})
+        except Exception: continue
+    return clean
+
+def norm_streak(data) -> dict:
+    try: return {"last": data.get("last"), "count": int(data.get("count", 0))}
+    except Exception: return {"last": None, "count": 0}
+
+def norm_revisit(data) -> dict:
+    norm = []
+    try:
+        for it in data.get("items") or []:
+            try: norm.append([int(it[0]), int(it[1])])
+            except Exception: continue
+        return {"v": 1, "min": data.get("min"), "max": data.get("max"), "items": norm}
+    except Exception:
+        return {"v": 1, "min": None, "max": None, "items": []}
+
+def state_from_v1(settings_raw: str | None, history_raw: str | None,
+                  streak_raw: str | None, revisit_raw: str | None) -> dict:
+    """Build a state dict from the four v1 JSON cookie values (any may be missing/corrupt)."""
+    state = empty_state()
+    def _j(raw):
+        if not raw: return None
+        try: return json.loads(raw)
+        except Exception: return None
+    state["settings"] = norm_settings(_j(settings_raw))
+    h = _j(history_raw)
+    if isinstance(h, dict): state["history"] = norm_history(h.get("items"))
+    s = _j(streak_raw)
+    if isinstance(s, dict): state["streak"] = norm_streak(s)
+    r = _j(revisit_raw)
+    if isinstance(r, dict): state["revisit"] = norm_revisit(r)
+    return state
+
+# ---------- Varints ----------
+def _put_uint(out: bytearray, v: int):
+    v = max(0, int(v))
+    while v >= 0x80:
+        out.append((v & 0x7F) | 0x80); v >>= 7
+    out.append(v)
+
+def _put_int(out: bytearray, v: int):
+    v = int(v); _put_uint(out, (v << 1) if v >= 0 else ((-v << 1) - 1))   # zigzag
+
+def _put_str(out: bytearray, s: str):
+    b = s.encode("utf-8"); _put_uint(out, len(b)); out += b
+
+class _Reader:
+    __slots__ = ("buf", "pos")
+    def __init__(self, buf: bytes): self.buf = buf; self.pos = 0
+    def uint(self) -> int:
+        shift = 0; v = 0
+        while True:
+            byte = self.buf[self.pos]; self.pos += 1
+            v |= (byte & 0x7F) << shift
+            if byte < 0x80: return v
+            shift += 7
+    def int(self) -> int:
+        v = self.uint(); return (v >> 1) if not (v & 1) else -((v + 1) >> 1)
+    def bytes(self) -> bytes:
+        n = self.uint(); b = bytes(self.buf[self.pos:self.pos + n]); self.pos += n
+        if len(b) != n: raise ValueError("truncated")
+        return b
+    def str(self) -> str:
+        return self.bytes().decode("utf-8")
+
+# ---------- Time helpers ----------
+def _iso_to_minute(t: str) -> int | None:
+    try:
+        ts = datetime.fromisoformat(str(t).replace("Z", ""))
+        if ts.tzinfo is None: ts = ts.replace(tzinfo=timezone.utc)
+        return int(ts.timestamp() // 60)
+    except Exception:
+        return None
+
+def _minute_to_iso(m: int) -> str:
+    return datetime.fromtimestamp(m * 60, timezone.utc).isoformat()
+
+def _iso_to_day(d) -> int | None:
+    try: return date.fromisoformat(str(d)).toordinal() - _EPOCH_ORD
+    except Exception: return None
+
+def _day_to_iso(n: int) -> str:
+    return date.fromordinal(n + _EPOCH_ORD).isoformat()
+
+# ---------- Codec ----------
+def encode_state(state: dict) -> str:
+    out = bytearray()
+    settings = state.get("settings")
+    streak = state.get("streak") or {}
+    revisit = state.get("revisit") or {}
+    rmin, rmax = revisit.get("min"), revisit.get("max")
+    has_revisit = rmin is not None and rmax is not None
+    last_day = _iso_to_day(streak.get("last")) if streak.get("last") else None
+    flags = (_HAS_SETTINGS if settings else 0) | (_HAS_STREAK if last_day is not None else 0) \
+            | (_HAS_REVISIT if has_revisit else 0)
+    _put_uint(out, flags)
+
+    if settings:
+        _put_str(out, str(settings.get("user", "")))
+        _put_int(out, settings.get("min_table", 0)); _put_int(out, settings.get("max_table", 0))
+        _put_uint(out, settings.get("per_q", 0)); _put_uint(out, settings.get("minutes", 0))
+
+    if last_day is not None:
+        _put_int(out, last_day); _put_uint(out, streak.get("count", 0))
+
+    hist = [(m, it) for it in (state.get("history") or [])[-HISTORY_KEEP:]
+            if (m := _iso_to_minute(it.get("t"))) is not None]
+    _put_uint(out, len(hist))
+    prev = 0
+    for m, it in hist:                      # delta-coded minutes, centisecond averages
+        _put_int(out, m - prev); prev = m
+        _put_uint(out, it.get("pct", 0)); _put_uint(out, round(float(it.get("avg", 0.0)) * 100))
+        _put_uint(out, it.get("q", 0))
+
+    if has_revisit:
+        rmin, rmax = int(rmin), int(rmax)
+        _put_int(out, rmin); _put_int(out, rmax)
+        facts = sorted({(int(a) - rmin) * N_MULT + (int(b) - 1) for a, b in revisit.get("items") or []
+                        if a >= rmin and 1 <= b <= N_MULT})
+        _put_uint(out, len(facts))
+        prev = -1
+        for f in facts:                     # sorted → small positive gaps
+            _put_uint(out, f - prev - 1); prev = f
+
+    return _frame(PERSIST_VERSION, bytes(out))
+
+def _frame(version: int, body: bytes) -> str:
+    """Version byte (+ deflate flag), the body raw-deflated if that is smaller, base64url."""
+    packed = zlib.compressobj(9, zlib.DEFLATED, -15)
+    deflated = packed.compress(body) + packed.flush()
+    if len(deflated) < len(body):
+        raw = bytes([version | _FLAG_DEFLATE]) + deflated
+    else:
+        raw = bytes([version]) + body
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def _unframe(version: int, token: str) -> bytes:
+    raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    head, body = raw[0], raw[1:]
+    if head & 0x7F != version: raise ValueError(f"unsupported version {head & 0x7F}")
+    return zlib.decompress(body, -15) if head & _FLAG_DEFLATE else body
+
+def decode_state(token: str) -> dict:
+    """Inverse of encode_state. Raises ValueError on anything malformed."""
+    try:
+        r = _Reader(_unframe(PERSIST_VERSION, token))
+        state = empty_state()
+        flags = r.uint()
+        if flags & _HAS_SETTINGS:
+            state["settings"] = {"user": r.str(), "min_table": r.int(), "max_table": r.int(),
+                                 "per_q": r.uint(), "minutes": r.uint()}
+        if flags & _HAS_STREAK:
+            state["streak"] = {"last": _day_to_iso(r.int()), "count": r.uint()}
+        m = 0
+        for _ in range(r.uint()):
+            m += r.int()
+            state["history"].append({"t": _minute_to_iso(m), "pct": r.uint(),
+                                     "avg": r.uint() / 100.0, "q": r.uint()})
+        if flags & _HAS_REVISIT:
+            rmin, rmax = r.int(), r.int()
+            items, f = [], -1
+            for _ in range(r.uint()):
+                f += r.uint() + 1
+                q, j = divmod(f, N_MULT)
+                items.append([rmin + q, j + 1])
+            state["revisit"] = {"v": 1, "min": rmin, "max": rmax, "items": items}
+        if flags & _HAS_MASTERY:
+            state["mastery"] = {"user": r.str(), "blob": r.bytes()}
+        return state
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"corrupt state token: {type(e).__name__}: {e}") from e
+
+# ---------- Mastery cookie ----------
+def encode_mastery(user: str, blob: bytes) -> str:
+    """One learner's MasteryModel.to_bytes blob as its own cookie value."""
+    out = bytearray(); _put_str(out, str(user or "")); out += bytes(blob)
+    return _frame(MASTERY_TOKEN_VERSION, bytes(out))
+
+def decode_mastery(token: str) -> dict:
+    """{"user", "blob"} from encode_mastery. Raises ValueError on anything malformed."""
+    try:
+        body = _unframe(MASTERY_TOKEN_VERSION, token)
+        r = _Reader(body); user = r.str()
+        return {"user": user, "blob": bytes(body[r.pos:])}
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"corrupt mastery token: {type(e).__name__}: {e}") from e
@@ -0,0 +1,168 @@
+# tt_profile.py — per-rerun measurement for the Times Tables Trainer.
+# RerunProfiler (`?profile=1`) times a rerun as a run of laps: `mark(name)` closes the phase that
+# ran since the previous mark. Finished reruns fold their phases into rolling windows (the last
+# N reruns), so mean, p50, p90 and max per phase stay visible across a session. Reruns slower
+# than a threshold can also leave a cProfile snapshot in a directory (pstats or snakeviz).
+# PayloadMeter (`?bytes=1`) counts the bytes each rerun sends to the browser, per screen.
+
+import cProfile
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("ttt")
+
+ROLLING = 200            # reruns kept per phase
+SNAPSHOTS_KEEP = 20      # snapshot paths listed in the panel
+
+class RerunProfiler:
+    """Lap timer for one browser session's reruns; fragments nested in a full rerun are folded in."""
+
+    def __init__(self, window: int = ROLLING, snapshot_dir: str | None = None, slow_ms: float = 250.0):
+        self.window = int(window)
+        self.snapshot_dir = snapshot_dir or None
+        self.slow_ms = float(slow_ms)
+        self.series: dict[str, deque] = {}
+        self.reruns = 0; self.aborted = 0
+        self.snapshots: deque = deque(maxlen=SNAPSHOTS_KEEP)
+        self._cur: dict | None = None
+        self._kind = ""; self._t0 = 0.0; self._lap = 0.0
+        self._prof: cProfile.Profile | None = None
+
+    def _series(self, name: str) -> deque:
+        s = self.series.get(name)
+        if s is None: s = self.series[name] = deque(maxlen=self.window)
+        return s
+
+    # ---------- Timing ----------
+    def begin(self, kind: str = "full", t0: float | None = None) -> bool:
+        """Open a rerun record; False when one is already open (a fragment inside a full rerun)."""
+        if self._cur is not None:
+            if kind != "full": return False
+            self.finish(aborted=True)      # previous rerun never reached finish (st.stop)
+        now = time.perf_counter()
+        self._kind = kind; self._t0 = now if t0 is None else float(t0); self._lap = self._t0
+        self._cur = {}
+        if self.snapshot_dir:
+            prof = cProfile.Profile()
+            try:
+                prof.enable(); self._prof = prof
+            except ValueError:             # another session's profiler is active in this process
+                self._prof = None
+        return True
+
+    def mark(self, name: str):
+        if self._cur is None: return
+        now = time.perf_counter()
+        self._cur[name] = self._cur.get(name, 0.0) + (now - self._lap) * 1000.0
+        self._lap = now
+
+    def finish(self, aborted: bool = False) -> float | None:
+        """Close the open rerun; returns its total ms."""
+        if self._cur is None: return None
+        end = self._lap if aborted else time.perf_counter()
+        total = (end - self._t0) * 1000.0
+        prof, self._prof = self._prof, None
+        if prof is not None: prof.disable()
+        for name, ms in self._cur.items(): self._series(name).append(ms)
+        self._series(f"total:{self._kind}").append(total)
+        self.reruns += 1; self.aborted += int(aborted)
+        if prof is not None and total >= self.slow_ms: self._snapshot(prof, total)
+        self._cur = None
+        return total
+
+    def _snapshot(self, prof: cProfile.Profile, total_ms: float):
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            kind = self._kind.replace(":", "-")
+            path = os.path.join(self.snapshot_dir, f"rerun-{int(time.time() * 1000)}-{kind}-{int(total_ms)}ms.prof")
+            prof.dump_stats(path)
+            self.snapshots.append(path)
+        except OSError:
+            logger.exception("Could not write profile snapshot to %s", self.snapshot_dir)
+
+    # ---------- Reporting ----------
+    def summary(self) -> list[dict]:
+        """One row per phase (totals last): n, last, mean, p50, p90, max in ms."""
+        return [_rolling_row("phase", name, s) for name, s in
+                sorted(self.series.items(), key=lambda kv: (kv[0].startswith("total:"), kv[0])) if s]
+
+def _rolling_row(label: str, name: str, s: deque, digits: int = 2) -> dict:
+    v = sorted(s); n = len(v)
+    return {label: name, "n": n, "last": round(s[-1], digits), "mean": round(sum(v) / n, digits),
+            "p50": round(v[(n - 1) // 2], digits), "p90": round(v[min(n - 1, int(0.9 * n))], digits),
+            "max": round(v[-1], digits)}
+
+class PayloadMeter:
+    """Serialized size of every message a rerun sends to the browser, keyed by screen and kind.
+
+    `attach(ctx)` wraps the script run context's `enqueue` (an internal Streamlit hook; if it is
+    missing nothing is counted). Reruns over `budget` bytes are counted per key.
+    """
+
+    def __init__(self, window: int = ROLLING, budget: int | None = None):
+        self.window = int(window)
+        self.budget = budget
+        self.series: dict[str, deque] = {}
+        self.msgs: dict[str, deque] = {}
+        self.over: dict[str, int] = {}
+        self._open = False; self._kind = ""; self._bytes = 0; self._msgs = 0
+
+    def attach(self, ctx) -> bool:
+        if ctx is None or getattr(ctx, "_tt_payload_meter", None) is self: return False
+        orig = getattr(ctx, "enqueue", None)
+        if orig is None: return False
+        def enqueue(msg):
+            if self._open:
+                self._bytes += msg.ByteSize(); self._msgs += 1
+            return orig(msg)
+        ctx.enqueue = enqueue; ctx._tt_payload_meter = self
+        return True
+
+    def begin(self, kind: str = "full") -> bool:
+        """Start counting; False when a rerun is already open (a fragment inside a full rerun)."""
+        if self._open and kind != "full": return False
+        self._open = True; self._kind = kind; self._bytes = 0; self._msgs = 0
+        return True
+
+    def finish(self, screen: str) -> int | None:
+        if not self._open: return None
+        self._open = False
+        key = f"{screen} ({self._kind})"
+        for store, value in ((self.series, self._bytes), (self.msgs, self._msgs)):
+            s = store.get(key)
+            if s is None: s = store[key] = deque(maxlen=self.window)
+            s.append(value)
+        if self.budget is not None and self._bytes > self.budget: self.over[key] = self.over.get(key, 0) + 1
+        return self._bytes
+
+    @contextmanager
+    def excluded(self):
+        """Do not count what is sent inside the block (e.g. the meter's own panel)."""
+        was, self._open = self._open, False
+        try: yield
+        finally: self._open = was
+
+    def summary(self) -> list[dict]:
+        """One row per screen/kind: bytes per rerun (n, last, mean, p50, p90, max), messages, over budget."""
+        rows = []
+        for key, s in sorted(self.series.items()):
+            if not s: continue
+            row = _rolling_row("rerun", key, s, 0)
+            m = self.msgs[key]; row["msgs"] = round(sum(m) / len(m), 1)
+            if self.budget is not None: row["over_budget"] = self.over.get(key, 0)
+            rows.append(row)
+        return rows
+
+class NullProfiler:
+    """Stand-in when profiling or metering is off: every call is a no-op."""
+    reruns = 0
+    def attach(self, ctx) -> bool: return False
+    def begin(self, kind: str = "full", t0: float | None = None) -> bool: return False
+    def mark(self, name: str): pass
+    def finish(self, *args, **kwargs): return None
+    def summary(self) -> list[dict]: return []
+
+NULL_PROFILER = NullProfiler()
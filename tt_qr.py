@@ -0,0 +1,290 @@
+# tt_qr.py — dependency-free QR Code encoder for the Assign screen.
+# Byte-mode QR (ISO/IEC 18004), versions 1–40, error-correction levels L/M/Q/H, automatic mask
+# selection by the standard penalty rules. Output is an SVG string (inline in the page) or PNG
+# bytes (download), both memoised per (text, level) so assigning the same settings again is a
+# cache hit — no CDN script, no network, no browser-side rendering.
+
+import re
+import struct
+import zlib
+from functools import lru_cache
+
+# Per level: (format bits, ECC codewords per block by version, EC block count by version)
+_ECC_LEVELS = {
+    "L": (1,
+          (-1, 7, 10, 15, 20, 26, 18, 20, 24, 30, 18, 20, 24, 26, 30, 22, 24, 28, 30, 28, 28, 28, 28, 30, 30, 26, 28,
+           30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+          (-1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 4, 4, 4, 4, 4, 6, 6, 6, 6, 7, 8, 8, 9, 9, 10, 12, 12, 12, 13, 14, 15, 16,
+           17, 18, 19, 19, 20, 21, 22, 24, 25)),
+    "M": (0,
+          (-1, 10, 16, 26, 18, 24, 16, 18, 22, 22, 26, 30, 22, 22, 24, 24, 28, 28, 26, 26, 26, 26, 28, 28, 28, 28,
+           28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28),
+          (-1, 1, 1, 1, 2, 2, 4, 4, 4, 5, 5, 5, 8, 9, 9, 10, 10, 11, 13, 14, 16, 17, 17, 18, 20, 21, 23, 25, 26, 28,
+           29, 31, 33, 35, 37, 38, 40, 43, 45, 47, 49)),
+    "Q": (3,
+          (-1, 13, 22, 18, 26, 18, 24, 18, 22, 20, 24, 28, 26, 24, 20, 30, 24, 28, 28, 26, 30, 28, 30, 30, 30, 30,
+           28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+          (-1, 1, 1, 2, 2, 4, 4, 6, 6, 8, 8, 8, 10, 12, 16, 12, 17, 16, 18, 21, 20, 23, 23, 25, 27, 29, 34, 34, 35,
+           38, 40, 43, 45, 48, 51, 53, 56, 59, 62, 65, 68)),
+    "H": (2,
+          (-1, 17, 28, 22, 16, 22, 28, 26, 26, 24, 28, 24, 28, 22, 24, 24, 30, 28, 28, 26, 28, 30, 24, 30, 30, 30,
+           30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+          (-1, 1, 1, 2, 4, 4, 4, 5, 6, 8, 8, 11, 11, 16, 16, 18, 16, 19, 21, 25, 25, 25, 34, 30, 32, 35, 37, 40, 42,
+           45, 48, 51, 54, 57, 60, 63, 66, 70, 74, 77, 81)),
+}
+
+_MASKS = (
+    lambda x, y: (x + y) % 2 == 0,
+    lambda x, y: y % 2 == 0,
+    lambda x, y: x % 3 == 0,
+    lambda x, y: (x + y) % 3 == 0,
+    lambda x, y: (x // 3 + y // 2) % 2 == 0,
+    lambda x, y: x * y % 2 + x * y % 3 == 0,
+    lambda x, y: (x * y % 2 + x * y % 3) % 2 == 0,
+    lambda x, y: ((x + y) % 2 + x * y % 3) % 2 == 0,
+)
+
+# ---------- GF(256) / Reed–Solomon ----------
+_EXP = [0] * 512; _LOG = [0] * 256
+_v = 1
+for _i in range(255):
+    _EXP[_i] = _v; _LOG[_v] = _i
+    _v <<= 1
+    if _v & 0x100: _v ^= 0x11D
+for _i in range(255, 512): _EXP[_i] = _EXP[_i - 255]
+
+def _gf_mul(a: int, b: int) -> int:
+    return 0 if a == 0 or b == 0 else _EXP[_LOG[a] + _LOG[b]]
+
+@lru_cache(maxsize=None)
+def _rs_divisor(degree: int) -> tuple:
+    result = [0] * (degree - 1) + [1]
+    root = 1
+    for _ in range(degree):
+        for j in range(degree):
+            result[j] = _gf_mul(result[j], root)
+            if j + 1 < degree: result[j] ^= result[j + 1]
+        root = _gf_mul(root, 0x02)
+    return tuple(result)
+
+def _rs_remainder(data, divisor) -> list:
+    result = [0] * len(divisor)
+    logs = [_LOG[c] if c else None for c in divisor]
+    for b in data:
+        factor = b ^ result.pop(0); result.append(0)
+        if factor == 0: continue
+        lf = _LOG[factor]
+        result = [r ^ _EXP[lc + lf] if lc is not None else r for r, lc in zip(result, logs)]
+    return result
+
+# ---------- Capacity ----------
+def _raw_modules(ver: int) -> int:
+    result = (16 * ver + 128) * ver + 64
+    if ver >= 2:
+        n = ver // 7 + 2
+        result -= (25 * n - 10) * n - 55
+        if ver >= 7: result -= 36
+    return result
+
+def _data_codewords(ver: int, level: str) -> int:
+    _, ecc, blocks = _ECC_LEVELS[level]
+    return _raw_modules(ver) // 8 - ecc[ver] * blocks[ver]
+
+def _alignment_positions(ver: int) -> list:
+    if ver == 1: return []
+    n = ver // 7 + 2; size = ver * 4 + 17
+    step = (ver * 8 + n * 3 + 5) // (n * 4 - 4) * 2
+    return [6] + sorted(size - 7 - i * step for i in range(n - 1))
+
+# ---------- Encoding ----------
+def _codewords(data: bytes, level: str) -> tuple[int, list]:
+    """Pick the smallest version that fits, then build data + interleaved ECC codewords."""
+    for ver in range(1, 41):
+        count_bits = 8 if ver <= 9 else 16
+        if 4 + count_bits + 8 * len(data) <= _data_codewords(ver, level) * 8: break
+    else:
+        raise ValueError(f"text too long for a QR code ({len(data)} bytes)")
+    cap = _data_codewords(ver, level) * 8
+    bits = [(0b0100 >> i) & 1 for i in (3, 2, 1, 0)]
+    bits += [(len(data) >> i) & 1 for i in range(count_bits - 1, -1, -1)]
+    for byte in data: bits += [(byte >> i) & 1 for i in range(7, -1, -1)]
+    bits += [0] * min(4, cap - len(bits))
+    bits += [0] * (-len(bits) % 8)
+    words = [int("".join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits), 8)]
+    pad = 0xEC
+    while len(words) < cap // 8:
+        words.append(pad); pad ^= 0xEC ^ 0x11
+
+    _, ecc, blocks = _ECC_LEVELS[level]
+    n_blocks, ecc_len = blocks[ver], ecc[ver]
+    raw = _raw_modules(ver) // 8
+    n_short = n_blocks - raw % n_blocks
+    short_len = raw // n_blocks
+    divisor = _rs_divisor(ecc_len)
+    out_blocks, k = [], 0
+    for i in range(n_blocks):
+        dat = words[k:k + short_len - ecc_len + (0 if i < n_short else 1)]; k += len(dat)
+        block = dat + _rs_remainder(dat, divisor)
+        if i < n_short: block.insert(len(dat), 0)      # placeholder keeps columns aligned
+        out_blocks.append(block)
+    result = []
+    for i in range(len(out_blocks[0])):
+        for j, block in enumerate(out_blocks):
+            if i != short_len - ecc_len or j >= n_short: result.append(block[i])
+    return ver, result
+
+class _Matrix:
+    __slots__ = ("size", "dark", "fixed")
+
+    def __init__(self, ver: int):
+        self.size = ver * 4 + 17
+        self.dark = [[False] * self.size for _ in range(self.size)]
+        self.fixed = [[False] * self.size for _ in range(self.size)]
+
+    def put(self, x: int, y: int, dark: bool):
+        self.dark[y][x] = dark; self.fixed[y][x] = True
+
+def _draw_function_patterns(m: _Matrix, ver: int):
+    size = m.size
+    for i in range(size):
+        m.put(6, i, i % 2 == 0); m.put(i, 6, i % 2 == 0)
+    for cx, cy in ((3, 3), (size - 4, 3), (3, size - 4)):
+        for dy in range(-4, 5):
+            for dx in range(-4, 5):
+                x, y = cx + dx, cy + dy
+                if 0 <= x < size and 0 <= y < size: m.put(x, y, max(abs(dx), abs(dy)) not in (2, 4))
+    pos = _alignment_positions(ver); last = len(pos) - 1
+    for i, ay in enumerate(pos):
+        for j, ax in enumerate(pos):
+            if (i, j) in ((0, 0), (0, last), (last, 0)): continue
+            for dy in range(-2, 3):
+                for dx in range(-2, 3): m.put(ax + dx, ay + dy, max(abs(dx), abs(dy)) != 1)
+    _draw_format(m, "M", 0)           # reserve; redrawn with the real level and mask
+    if ver >= 7:
+        rem = ver
+        for _ in range(12): rem = (rem << 1) ^ ((rem >> 11) * 0x1F25)
+        bits = ver << 12 | rem
+        for i in range(18):
+            bit = (bits >> i) & 1 == 1
+            a, b = size - 11 + i % 3, i // 3
+            m.put(a, b, bit); m.put(b, a, bit)
+
+def _draw_format(m: _Matrix, level: str, mask: int):
+    data = _ECC_LEVELS[level][0] << 3 | mask
+    rem = data
+    for _ in range(10): rem = (rem << 1) ^ ((rem >> 9) * 0x537)
+    bits = (data << 10 | rem) ^ 0x5412
+    bit = lambda i: (bits >> i) & 1 == 1
+    size = m.size
+    for i in range(6): m.put(8, i, bit(i))
+    m.put(8, 7, bit(6)); m.put(8, 8, bit(7)); m.put(7, 8, bit(8))
+    for i in range(9, 15): m.put(14 - i, 8, bit(i))
+    for i in range(8): m.put(size - 1 - i, 8, bit(i))
+    for i in range(8, 15): m.put(8, size - 15 + i, bit(i))
+    m.put(8, size - 8, True)
+
+def _draw_codewords(m: _Matrix, words: list):
+    size = m.size; i = 0; total = len(words) * 8
+    right = size - 1
+    while right >= 1:
+        if right == 6: right = 5
+        upward = ((right + 1) & 2) == 0
+        for vert in range(size):
+            y = size - 1 - vert if upward else vert
+            for j in (0, 1):
+                x = right - j
+                if not m.fixed[y][x] and i < total:
+                    m.dark[y][x] = (words[i >> 3] >> (7 - (i & 7))) & 1 == 1
+                    i += 1
+        right -= 2
+
+# Rows are scored as bit strings ("1" = dark): runs and finder look-alikes are regex scans and
+# the 2×2 rule is integer bit logic, so trying all eight masks stays cheap in pure Python.
+_RUN = re.compile(r"0{5,}|1{5,}")
+_FINDER = re.compile(r"(?=10111010000|00001011101)")
+
+@lru_cache(maxsize=None)
+def _mask_rows(ver: int, mask: int) -> tuple:
+    """Per row, an int with a 1 where `mask` flips a data module (function patterns excluded)."""
+    m = _Matrix(ver); _draw_function_patterns(m, ver)
+    fn = _MASKS[mask]; size = m.size
+    return tuple(int("".join("1" if not fixed[x] and fn(x, y) else "0" for x in range(size)), 2)
+                 for y, fixed in enumerate(m.fixed))
+
+@lru_cache(maxsize=None)
+def _format_rows(ver: int, level: str, mask: int) -> tuple:
+    """Per row, (cells the format information occupies, which of them are dark) as ints."""
+    m = _Matrix(ver); _draw_format(m, level, mask)
+    return tuple((_row_bits(fixed), _row_bits(dark)) for fixed, dark in zip(m.fixed, m.dark))
+
+def _row_bits(row: list) -> int:
+    return int("".join("1" if c else "0" for c in row), 2)
+
+def _penalty(rows: list, size: int) -> int:
+    strs = [format(r, f"0{size}b") for r in rows]
+    text = " ".join(strs + ["".join(col) for col in zip(*strs)])      # rows then columns, space-separated
+    runs = _RUN.findall(text)
+    score = sum(map(len, runs)) - 2 * len(runs) + 40 * len(_FINDER.findall(text))
+    inner = (1 << (size - 1)) - 1                   # pairs (x, x+1) for x < size-1
+    for r0, r1 in zip(rows, rows[1:]):
+        same = ~(r0 ^ r1) & ~(r0 ^ (r0 >> 1)) & ~(r1 ^ (r1 >> 1)) & inner
+        score += 3 * bin(same).count("1")
+    dark = sum(bin(r).count("1") for r in rows); total = size * size
+    score += (abs(dark * 20 - total * 10) + total - 1) // total * 10 - 10
+    return score
+
+@lru_cache(maxsize=128)
+def qr_matrix(text: str, level: str = "M", mask: int | None = None) -> tuple:
+    """Module grid for `text` as a tuple of row tuples (True = dark), without the quiet zone."""
+    level = level.upper()
+    if level not in _ECC_LEVELS: raise ValueError(f"unknown error-correction level {level!r}")
+    ver, words = _codewords(text.encode("utf-8"), level)
+    m = _Matrix(ver)
+    _draw_function_patterns(m, ver)
+    _draw_codewords(m, words)
+    base = [_row_bits(row) for row in m.dark]
+    best = None
+    for k in (range(8) if mask is None else (mask,)):
+        # format cells are fixed, so the mask never flips them
+        rows = [(r & ~fc | fd) ^ mk for r, (fc, fd), mk in zip(base, _format_rows(ver, level, k), _mask_rows(ver, k))]
+        score = _penalty(rows, m.size)
+        if best is None or score < best[0]: best = (score, rows)
+    return tuple(tuple(c == "1" for c in format(r, f"0{m.size}b")) for r in best[1])
+
+# ---------- Renderers ----------
+@lru_cache(maxsize=128)
+def qr_svg(text: str, level: str = "M", border: int = 4, px: int | None = None) -> str:
+    """Crisp scalable SVG: one path of unit squares, sized by `px` or by its container."""
+    grid = qr_matrix(text, level)
+    n = len(grid) + 2 * border
+    parts = []
+    for y, row in enumerate(grid):
+        x = 0
+        while x < len(row):
+            if row[x]:
+                start = x
+                while x < len(row) and row[x]: x += 1
+                parts.append(f"M{start + border},{y + border}h{x - start}v1h-{x - start}z")
+            else:
+                x += 1
+    size = f"width='{px}' height='{px}'" if px else "width='100%'"
+    return (f"<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 {n} {n}' {size} shape-rendering='crispEdges' "
+            f"role='img' aria-label='QR code'><rect width='{n}' height='{n}' fill='#fff'/>"
+            f"<path d='{''.join(parts)}' fill='#000'/></svg>")
+
+@lru_cache(maxsize=32)
+def qr_png(text: str, level: str = "M", scale: int = 8, border: int = 4) -> bytes:
+    """1-bit greyscale PNG with `scale` pixels per module."""
+    grid = qr_matrix(text, level)
+    n = (len(grid) + 2 * border) * scale
+    blank = b"\x00" + b"\xff" * ((n + 7) // 8)          # filter byte + white row
+    rows = [blank] * (border * scale)
+    quiet = "1" * (border * scale); pad = "0" * (-n % 8)              # 1 = white pixel
+    for row in grid:
+        bits = quiet + "".join("0" * scale if dark else "1" * scale for dark in row) + quiet + pad
+        rows += [b"\x00" + int(bits, 2).to_bytes(len(bits) // 8, "big")] * scale
+    rows += [blank] * (border * scale)
+    def chunk(tag: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body) & 0xFFFFFFFF)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", n, n, 1, 0, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(b"".join(rows), 6)) + chunk(b"IEND", b""))
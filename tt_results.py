@@ -0,0 +1,234 @@
+# tt_results.py — structured session results: a JSONL sink and an incremental class aggregator.
+# Every finished session appends one JSON line (user, range, score, timing, per-fact wrong counts,
+# wrong_twice). ResultAggregator folds the file into per-learner and per-fact pandas tables by
+# reading only the bytes appended since its last refresh, so a term's worth of records is parsed
+# once per server process and each dashboard rerun costs only the new lines.
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger("ttt")
+
+RECORD_VERSION = 1
+READ_CHUNK = 8 << 20          # bytes parsed per step while catching up
+CHECKPOINT_EVERY = 2000       # new records between aggregate checkpoints
+CHECKPOINT_VERSION = 2        # 2: JSON (1 was a pickle, never loaded)
+
+def result_record(user: str, session_id: str, min_table: int, max_table: int, per_q: int, minutes: int,
+                  questions: int, correct: int, time_s: float, wrong_items, wrong_twice,
+                  ts: float | None = None, seed: int | None = None) -> dict:
+    """One session as a JSON-ready dict; `wrong_items` lists every wrong (a, b), repeats included.
+
+    `seed` is the shared question set the session was dealt from (None for a personal session).
+    """
+    questions = int(questions)
+    wrong = Counter((int(a), int(b)) for a, b in wrong_items)
+    return {
+        "v": RECORD_VERSION, "ts": round(time.time() if ts is None else float(ts), 3),
+        "user": (user or "").strip() or "Anonymous", "session_id": str(session_id),
+        "min": int(min_table), "max": int(max_table), "per_q": int(per_q), "minutes": int(minutes),
+        "seed": None if seed is None else int(seed),
+        "questions": questions, "correct": int(correct),
+        "pct": int(round(100.0 * correct / questions)) if questions else 0,
+        "avg_s": round(float(time_s) / questions, 3) if questions else 0.0, "time_s": round(float(time_s), 2),
+        "wrong": [[a, b, n] for (a, b), n in sorted(wrong.items())],
+        "wrong_twice": [[int(a), int(b)] for a, b in sorted(wrong_twice)],
+    }
+
+class ResultSink:
+    """Append-only JSONL file shared by every session in the process (one write per record)."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self.records_written = 0
+        d = os.path.dirname(self.path)
+        if d: os.makedirs(d, exist_ok=True)
+
+    def append(self, record: dict) -> bool:
+        line = (json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            with self._lock:
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try: os.write(fd, line)               # one O_APPEND write: lines never interleave
+                finally: os.close(fd)
+                self.records_written += 1
+            return True
+        except OSError:
+            logger.exception("Result sink write failed (%s)", self.path)
+            return False
+
+# ---------- Aggregation ----------
+def _frame_to_json(df) -> dict | None:
+    """A DataFrame as JSON-ready rows, index names and column dtypes (None stays None)."""
+    if df is None: return None
+    flat = df.reset_index()
+    return {"index": list(df.index.names), "columns": [str(c) for c in flat.columns],
+            "dtypes": [str(t) for t in flat.dtypes], "rows": flat.to_numpy(dtype=object).tolist()}
+
+def _frame_from_json(d: dict | None):
+    if d is None: return None
+    import pandas as pd
+    df = pd.DataFrame(d["rows"], columns=d["columns"])
+    df = df.astype(dict(zip(d["columns"], d["dtypes"])))
+    return df.set_index(d["index"])
+
+LEARNER_SUMS = ("sessions", "questions", "correct", "time_s", "pct_sum")
+FACT_SUMS = ("wrong", "wrong_sessions", "wrong_twice")
+
+class ResultAggregator:
+    """Running per-learner / per-fact totals over a results JSONL file, refreshed by byte offset.
+
+    Only complete lines are consumed; a truncated or replaced file (smaller than the offset, or a
+    new inode) restarts the fold from zero. The folded tables and offset are checkpointed next to
+    the file (`<path>.agg`, plain JSON: rows plus column dtypes, so it reads back the same on any
+    pandas version and loading it never runs code), and a restarted server resumes instead of
+    re-parsing the term. Tables are pandas DataFrames (imported on first use).
+    """
+
+    def __init__(self, path: str, checkpoint: bool = True):
+        self.path = str(path)
+        self.checkpoint_path = self.path + ".agg" if checkpoint else None
+        self.offset = 0; self.inode = None
+        self.records = 0; self.bad_lines = 0; self.last_refresh_s = 0.0
+        self._lock = threading.Lock()
+        self._learners = None; self._facts = None; self._fact_users = None
+        self._unsaved = 0
+        self._load_checkpoint()
+
+    def _reset(self):
+        self.offset = 0; self.records = 0; self.bad_lines = 0
+        self._learners = None; self._facts = None; self._fact_users = None
+
+    @property
+    def pending_bytes(self) -> int:
+        """Bytes appended since the last refresh (0 when the file is missing)."""
+        try: return max(0, os.stat(self.path).st_size - self.offset)
+        except OSError: return 0
+
+    def refresh(self, max_bytes: int | None = None) -> int:
+        """Fold in what was appended since the last call (at most ~`max_bytes`); returns new records."""
+        with self._lock:
+            t0 = time.perf_counter(); added = 0
+            try: stat = os.stat(self.path)
+            except FileNotFoundError: return 0
+            if stat.st_ino != self.inode or stat.st_size < self.offset:
+                self._reset(); self.inode = stat.st_ino
+            budget = stat.st_size - self.offset if max_bytes is None else int(max_bytes)
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                while budget > 0:
+                    chunk = f.read(min(READ_CHUNK, budget))
+                    end = chunk.rfind(b"\n") + 1
+                    if end == 0: break                     # only a partial line so far
+                    rows = self._parse(chunk[:end])
+                    self._fold(rows); added += len(rows)
+                    self.offset += end; budget -= end
+                    f.seek(self.offset)
+            self.records += added; self._unsaved += added
+            if self._unsaved >= CHECKPOINT_EVERY or (self._unsaved and self.offset >= stat.st_size):
+                self._save_checkpoint()
+            self.last_refresh_s = time.perf_counter() - t0
+            return added
+
+    # ---------- Checkpoints ----------
+    _COUNTERS = ("offset", "inode", "records", "bad_lines")
+    _TABLES = ("_learners", "_facts", "_fact_users")
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_path: return
+        tmp = self.checkpoint_path + ".tmp"
+        state = {"v": CHECKPOINT_VERSION, **{k: getattr(self, k) for k in self._COUNTERS},
+                 **{k: _frame_to_json(getattr(self, k)) for k in self._TABLES}}
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f, separators=(",", ":"), ensure_ascii=False)
+            os.replace(tmp, self.checkpoint_path)        # readers never see a half-written file
+            self._unsaved = 0
+        except OSError:
+            logger.exception("Could not write results checkpoint %s", self.checkpoint_path)
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path): return
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f: state = json.load(f)
+            stat = os.stat(self.path)
+            if state.get("v") != CHECKPOINT_VERSION or state["inode"] != stat.st_ino or state["offset"] > stat.st_size:
+                return                                    # file was replaced or truncated: fold from zero
+            tables = {k: _frame_from_json(state[k]) for k in self._TABLES}
+        except Exception:
+            logger.warning("Ignoring unreadable results checkpoint %s", self.checkpoint_path); return
+        for k in self._COUNTERS: setattr(self, k, state[k])
+        for k, t in tables.items(): setattr(self, k, t)
+
+    def _parse(self, data: bytes) -> list:
+        lines = [ln for ln in data.decode("utf-8", errors="replace").split("\n") if ln.strip()]
+        try: return json.loads("[" + ",".join(lines) + "]")     # one C-level parse per chunk
+        except ValueError: pass
+        rows = []
+        for line in lines:
+            try: rows.append(json.loads(line))
+            except ValueError: self.bad_lines += 1
+        return [r for r in rows if isinstance(r, dict)]
+
+    def _fold(self, rows: list):
+        rows = [r for r in rows if isinstance(r, dict) and "user" in r]
+        if not rows: return
+        import pandas as pd
+        df = pd.DataFrame({k: [r.get(k) for r in rows] for k in
+                           ("ts", "user", "questions", "correct", "time_s", "pct", "min", "max")})
+        df["sessions"] = 1; df["pct_sum"] = df["pct"]
+        g = df.groupby("user", sort=False)
+        new = g[list(LEARNER_SUMS)].sum().join(g["ts"].max().rename("last_ts")).join(
+            g[["pct", "min", "max"]].last().rename(columns={"pct": "last_pct", "min": "last_min", "max": "last_max"}))
+        if self._learners is None: self._learners = new
+        else:
+            old = self._learners
+            both = old[list(LEARNER_SUMS)].add(new[list(LEARNER_SUMS)], fill_value=0)
+            both["last_ts"] = pd.concat([old["last_ts"], new["last_ts"]], axis=1).max(axis=1)
+            latest = new[["last_pct", "last_min", "last_max"]].combine_first(old[["last_pct", "last_min", "last_max"]])
+            self._learners = both.join(latest)
+
+        facts = [(r.get("user"), a, b, n, 0) for r in rows for a, b, n in r.get("wrong") or ()]
+        facts += [(r.get("user"), a, b, 0, 1) for r in rows for a, b in r.get("wrong_twice") or ()]
+        if not facts: return
+        fd = pd.DataFrame(facts, columns=["user", "a", "b", "wrong", "wrong_twice"])
+        fd["wrong_sessions"] = (fd["wrong"] > 0).astype("int64")
+        per_user = fd.groupby(["a", "b", "user"], sort=False)[list(FACT_SUMS)].sum()
+        self._fact_users = per_user if self._fact_users is None else self._fact_users.add(per_user, fill_value=0)
+        fsum = per_user.groupby(level=["a", "b"]).sum()
+        self._facts = fsum if self._facts is None else self._facts.add(fsum, fill_value=0)
+
+    # ---------- Tables ----------
+    def learners(self):
+        """One row per learner: sessions, questions, accuracy, avg time, mean and last score, last seen."""
+        import pandas as pd
+        with self._lock:
+            t = None if self._learners is None else self._learners.copy()
+        if t is None or t.empty: return pd.DataFrame()
+        q = t["questions"].where(t["questions"] > 0)
+        out = pd.DataFrame({
+            "sessions": t["sessions"].astype("int64"), "questions": t["questions"].astype("int64"),
+            "accuracy_%": (100.0 * t["correct"] / q).round(1), "avg_s": (t["time_s"] / q).round(2),
+            "mean_score_%": (t["pct_sum"] / t["sessions"]).round(1), "last_score_%": t["last_pct"].astype("int64"),
+            "last_range": t["last_min"].astype("int64").astype(str) + "–" + t["last_max"].astype("int64").astype(str),
+            "last_seen": pd.to_datetime(t["last_ts"], unit="s", utc=True).dt.strftime("%Y-%m-%d %H:%M"),
+        })
+        return out.sort_values("sessions", ascending=False).rename_axis("learner")
+
+    def facts(self, limit: int | None = None):
+        """One row per fact, most-missed first: wrong answers, sessions, learners, wrong twice."""
+        import pandas as pd
+        with self._lock:
+            f = None if self._facts is None else self._facts.copy()
+            fu = None if self._fact_users is None else self._fact_users
+            learners = None if fu is None else (fu["wrong"] > 0).groupby(level=["a", "b"]).sum()
+        if f is None or f.empty: return pd.DataFrame()
+        f = f.astype("int64"); f["learners"] = learners.astype("int64")
+        f = f.sort_values(["wrong", "learners"], ascending=False)
+        f.index = [f"{a}×{b}" for a, b in f.index]
+        return (f.head(limit) if limit else f)[["wrong", "wrong_sessions", "learners", "wrong_twice"]].rename_axis("fact")
@@ -0,0 +1,93 @@
+# tt_resume.py — resume a practice session after a reload, sleep or websocket reconnect.
+# SessionEngine.snapshot() is packed into a compact signed token: a version byte, LEB128 varints
+# (tt_persist's codec), facts as packed ints, then an HMAC-SHA256 tag (truncated) and base64url.
+# The session's EventLog is left out and the per-fact lists are capped (SNAPSHOT_FACTS), so a
+# token stays small and bounded-cost however long the session runs and whatever the range.
+# The app keeps the latest token per browser in a SnapshotStore (in process, LRU-bounded) under a
+# random resume id that lives in an encrypted cookie, so snapshots never cost a browser round trip.
+
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from tt_persist import _put_uint, _put_str, _Reader
+
+RESUME_VERSION = 1
+SIG_BYTES = 12                   # truncated HMAC-SHA256 tag
+RESUME_TTL_S = 30 * 60           # older snapshots are not resumed
+RESUME_MAX_ENTRIES = 20000       # live resume ids kept per process (oldest dropped first)
+_F_RUNNER, _F_SEEDED = 1, 2
+_SCALARS = ("min", "max", "per_q", "total_seconds", "remaining_ms", "questions", "correct", "time_ms",
+            "next_qid", "qno", "deck_pos")
+_PAIRS = ("repeats", "attempts_wrong")
+_LISTS = ("wrong", "missed", "twice", "banned", "queue", "revisit_loaded")
+
+def _b64e(b: bytes) -> str: return base64.urlsafe_b64encode(b).rstrip(b"=").decode("ascii")
+def _b64d(s: str) -> bytes: return base64.urlsafe_b64decode(s + "=" * (-len(s) % 4))
+
+def encode_snapshot(snap: dict, key: bytes, user: str, session_id: str, wall: float | None = None) -> str:
+    """Signed token for `snap` (SessionEngine.snapshot()) of `user`'s session `session_id`."""
+    out = bytearray([RESUME_VERSION, (_F_RUNNER if snap.get("runner") else 0)
+                     | (_F_SEEDED if snap.get("seed") is not None else 0)])
+    _put_uint(out, int(time.time() if wall is None else wall))
+    _put_str(out, user or ""); _put_str(out, session_id or "")
+    if snap.get("seed") is not None: _put_uint(out, snap["seed"])
+    for k in _SCALARS: _put_uint(out, snap.get(k, 0))
+    for k in _PAIRS:
+        pairs = snap.get(k) or (); _put_uint(out, len(pairs))
+        for x, y in pairs: _put_uint(out, x); _put_uint(out, y)
+    for k in _LISTS:
+        vals = snap.get(k) or (); _put_uint(out, len(vals))
+        for v in vals: _put_uint(out, v)
+    return _b64e(bytes(out) + hmac.new(key, out, hashlib.sha256).digest()[:SIG_BYTES])
+
+def decode_snapshot(token: str, key: bytes, max_age_s: float = RESUME_TTL_S, now: float | None = None) -> dict:
+    """Snapshot dict (plus "user", "session_id", "wall") from a token; ValueError if forged, stale or bad."""
+    try: raw = _b64d(token)
+    except Exception as e: raise ValueError(f"not base64url: {e}") from None
+    payload, tag = raw[:-SIG_BYTES], raw[-SIG_BYTES:]
+    if len(payload) < 2 or not hmac.compare_digest(tag, hmac.new(key, payload, hashlib.sha256).digest()[:SIG_BYTES]):
+        raise ValueError("bad signature")
+    if payload[0] != RESUME_VERSION: raise ValueError(f"unknown snapshot version {payload[0]}")
+    flags = payload[1]; r = _Reader(payload); r.pos = 2
+    try:
+        snap = {"wall": r.uint(), "user": r.str(), "session_id": r.str(), "runner": bool(flags & _F_RUNNER)}
+        snap["seed"] = r.uint() if flags & _F_SEEDED else None
+        for k in _SCALARS: snap[k] = r.uint()
+        for k in _PAIRS: snap[k] = [(r.uint(), r.uint()) for _ in range(r.uint())]
+        for k in _LISTS: snap[k] = [r.uint() for _ in range(r.uint())]
+    except IndexError:
+        raise ValueError("truncated snapshot") from None
+    if (time.time() if now is None else now) - snap["wall"] > max_age_s: raise ValueError("snapshot expired")
+    return snap
+
+class SnapshotStore:
+    """Latest snapshot token per resume id, shared by every session in the process."""
+
+    def __init__(self, max_entries: int = RESUME_MAX_ENTRIES):
+        self.max_entries = int(max_entries)
+        self._tokens: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.puts = 0
+
+    def __len__(self) -> int: return len(self._tokens)
+
+    def put(self, rid: str, token: str):
+        with self._lock:
+            self._tokens[rid] = token; self._tokens.move_to_end(rid); self.puts += 1
+            while len(self._tokens) > self.max_entries: self._tokens.popitem(last=False)
+
+    def get(self, rid: str) -> str | None:
+        with self._lock: return self._tokens.get(rid)
+
+    def pop(self, rid: str):
+        with self._lock: self._tokens.pop(rid, None)
+
+@lru_cache(maxsize=1)
+def process_store() -> SnapshotStore:
+    """The store shared by every session in this process (module state outlives script reruns)."""
+    return SnapshotStore()
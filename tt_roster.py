@@ -0,0 +1,206 @@
+# tt_roster.py — bulk class assignment for the Times Tables Trainer.
+# A CSV roster (one learner per row, optional min/max/per_q/minutes per learner) becomes one
+# assignment link + QR code per learner, rendered across a process pool, packaged as a single
+# printable HTML sheet (print → "Save as PDF" for a PDF) or a zip of PNGs with an index.
+#
+#   python tt_roster.py roster.csv --base https://example.streamlit.app/ -o class.zip
+
+import argparse
+import csv
+import io
+import itertools
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from html import escape
+from urllib.parse import urlencode
+
+from tt_engine import MIN_PER_Q, MAX_PER_Q, SEED_MAX, clamp_per_q
+from tt_qr import qr_svg, qr_png
+
+ROSTER_MAX = 2000                 # rows accepted from one upload
+PARALLEL_MIN = 24                 # below this, rendering inline beats pool start-up and pickling
+NAME_COLUMNS = ("user", "name", "learner", "student", "pupil")
+FIELD_COLUMNS = {"min": "min_table", "min_table": "min_table", "max": "max_table", "max_table": "max_table",
+                 "per_q": "per_q", "seconds": "per_q", "minutes": "minutes", "mins": "minutes"}
+
+def assignment_params(user: str, min_table: int, max_table: int, per_q: int, minutes: int,
+                      debug: bool = False, seed: int | None = None) -> dict:
+    """Query parameters of a learner link (lands on Start with these settings).
+
+    With `seed`, every learner on the link gets the same question order (SessionEngine.start).
+    """
+    params = {"user": (user or "").strip(), "min": int(min_table), "max": int(max_table),
+              "per_q": int(clamp_per_q(per_q)), "minutes": int(minutes), "screen": "start",
+              **({"seed": int(seed)} if seed is not None else {}), **({"debug": "1"} if debug else {})}
+    if not params["user"]: params.pop("user")
+    return params
+
+def assignment_url(base: str, params: dict) -> str:
+    qs = urlencode(params)
+    return base + ("?" + qs if qs else "")
+
+@dataclass
+class Learner:
+    user: str
+    min_table: int
+    max_table: int
+    per_q: int
+    minutes: int
+
+    def params(self, debug: bool = False, seed: int | None = None) -> dict:
+        return assignment_params(self.user, self.min_table, self.max_table, self.per_q, self.minutes, debug, seed)
+
+# ---------- Parsing ----------
+def iter_roster(f, defaults: dict, problems: list):
+    """Learners from a CSV text stream, one row at a time; problems are appended to `problems`.
+
+    With a header row, the name column is any of NAME_COLUMNS and settings columns are optional;
+    without one, columns are name, min, max, per_q, minutes. Blank cells take `defaults`
+    (keys min_table, max_table, per_q, minutes). Only names are kept between rows (to flag
+    duplicates), so very large rosters stream in constant memory.
+    """
+    sample = f.read(4096); f.seek(0)
+    if sample.startswith("\ufeff"): f.read(1)
+    try: dialect = csv.Sniffer().sniff(sample.lstrip("\ufeff"), delimiters=",;\t")
+    except csv.Error: dialect = csv.excel
+    rows = csv.reader(f, dialect)
+    first = next(rows, None)
+    if first is None: problems.append("The roster is empty."); return
+    head = [h.strip().lower() for h in first]
+    if any(h in NAME_COLUMNS for h in head):
+        name_i = next(i for i, h in enumerate(head) if h in NAME_COLUMNS)
+        cols = {FIELD_COLUMNS[h]: i for i, h in enumerate(head) if h in FIELD_COLUMNS}
+        body, first_line = rows, 2
+    else:
+        name_i = 0
+        cols = {"min_table": 1, "max_table": 2, "per_q": 3, "minutes": 4}
+        body, first_line = itertools.chain([first], rows), 1
+    seen = set()
+    for line, row in enumerate(body, start=first_line):
+        if not any(c.strip() for c in row): continue
+        user = row[name_i].strip() if name_i < len(row) else ""
+        if not user:
+            problems.append(f"Line {line}: no name — skipped."); continue
+        vals = {}
+        for field in ("min_table", "max_table", "per_q", "minutes"):
+            i = cols.get(field); raw = row[i].strip() if i is not None and i < len(row) else ""
+            try: vals[field] = int(raw) if raw else int(defaults[field])
+            except ValueError:
+                problems.append(f"Line {line}: {field} {raw!r} is not a number — using {defaults[field]}.")
+                vals[field] = int(defaults[field])
+        vals["min_table"] = max(1, vals["min_table"]); vals["max_table"] = max(1, vals["max_table"])
+        if vals["min_table"] > vals["max_table"]:
+            vals["min_table"], vals["max_table"] = vals["max_table"], vals["min_table"]
+        if not (MIN_PER_Q <= vals["per_q"] <= MAX_PER_Q):
+            problems.append(f"Line {line}: per_q {vals['per_q']} clamped to {MIN_PER_Q}–{MAX_PER_Q}.")
+        vals["per_q"] = clamp_per_q(vals["per_q"]); vals["minutes"] = min(180, max(0, vals["minutes"]))
+        if user.lower() in seen: problems.append(f"Line {line}: {user!r} appears more than once.")
+        seen.add(user.lower())
+        yield Learner(user=user, **vals)
+
+def parse_roster(text: str, defaults: dict) -> tuple[list[Learner], list[str]]:
+    """Learners from CSV text plus human-readable problems (skipped rows, clamped values); see iter_roster."""
+    learners, problems = [], []
+    for learner in iter_roster(io.StringIO(text), defaults, problems):
+        if len(learners) >= ROSTER_MAX:
+            problems.append(f"Only the first {ROSTER_MAX} learners were used."); break
+        learners.append(learner)
+    return learners, problems
+
+# ---------- Rendering ----------
+def _render_one(job: tuple) -> tuple[str, bytes | None]:
+    url, want_png = job
+    return qr_svg(url), (qr_png(url) if want_png else None)
+
+def render_codes(urls: list[str], want_png: bool = True, pool: Executor | None = None) -> list[tuple]:
+    """(svg, png) per URL, in order; fanned out over `pool` for large rosters."""
+    jobs = [(u, want_png) for u in urls]
+    if pool is None or len(jobs) < PARALLEL_MIN:
+        return [_render_one(j) for j in jobs]
+    workers = getattr(pool, "_max_workers", os.cpu_count() or 1)
+    return list(pool.map(_render_one, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+SHEET_CSS = """
+body{ font-family:system-ui,-apple-system,"Segoe UI",sans-serif; margin:12mm; color:#0f172a; }
+h1{ font-size:16pt; margin:0 0 8mm; }
+.grid{ display:grid; grid-template-columns:repeat(3, 1fr); gap:6mm; }
+.card{ border:1px solid #cbd5e1; border-radius:3mm; padding:4mm; break-inside:avoid; page-break-inside:avoid; }
+.card .name{ font-weight:700; font-size:13pt; }
+.card .set{ font-size:9pt; color:#475569; margin:1mm 0 2mm; }
+.card .url{ font-size:6.5pt; word-break:break-all; color:#475569; }
+@media print{ body{ margin:8mm; } }
+"""
+
+def sheet_html(learners: list[Learner], urls: list[str], svgs: list[str], title: str = "Times Tables — class links") -> str:
+    cards = "".join(
+        f"<div class='card'><div class='name'>{escape(l.user)}</div>"
+        f"<div class='set'>Tables {l.min_table}–{l.max_table} · {l.per_q}s per question · {l.minutes} min</div>"
+        f"{svg}<div class='url'>{escape(u)}</div></div>"
+        for l, u, svg in zip(learners, urls, svgs))
+    return (f"<!doctype html><html><head><meta charset='utf-8'><title>{escape(title)}</title>"
+            f"<style>{SHEET_CSS}</style></head><body><h1>{escape(title)}</h1><div class='grid'>{cards}</div></body></html>")
+
+def _safe_filename(name: str) -> str:
+    keep = "".join(c if c.isalnum() or c in "-_ " else "_" for c in name).strip().replace(" ", "_")
+    return keep[:60] or "learner"
+
+def zip_bundle(learners: list[Learner], urls: list[str], pngs: list[bytes], sheet: str) -> bytes:
+    """class-sheet.html, index.csv and one PNG per learner (names de-duplicated)."""
+    buf = io.BytesIO(); used = set()
+    index = io.StringIO(); w = csv.writer(index)
+    w.writerow(["user", "min", "max", "per_q", "minutes", "url", "qr_file"])
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for n, (l, u, png) in enumerate(zip(learners, urls, pngs), start=1):
+            fname = f"qr/{n:03d}_{_safe_filename(l.user)}.png"
+            while fname in used: fname = fname[:-4] + "_.png"
+            used.add(fname)
+            zf.writestr(fname, png, compress_type=zipfile.ZIP_STORED)      # PNGs are already deflated
+            w.writerow([l.user, l.min_table, l.max_table, l.per_q, l.minutes, u, fname])
+        zf.writestr("index.csv", index.getvalue())
+        zf.writestr("class-sheet.html", sheet)
+    return buf.getvalue()
+
+def build_class_pack(learners: list[Learner], base: str, pool: Executor | None = None,
+                     want_zip: bool = True, debug: bool = False, seed: int | None = None) -> dict:
+    """Everything for one class: urls, printable sheet HTML, optional zip bytes, timing.
+
+    `seed` goes on every link, so the whole class shares one question order.
+    """
+    t0 = time.perf_counter()
+    urls = [assignment_url(base, l.params(debug, seed)) for l in learners]
+    codes = render_codes(urls, want_png=want_zip, pool=pool)
+    sheet = sheet_html(learners, urls, [svg for svg, _ in codes])
+    pack = {"count": len(learners), "urls": urls, "sheet": sheet,
+            "zip": zip_bundle(learners, urls, [png for _, png in codes], sheet) if want_zip else None}
+    pack["seconds"] = time.perf_counter() - t0
+    return pack
+
+# ---------- CLI ----------
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Generate assignment links + QR codes for a class roster.")
+    ap.add_argument("roster", help="CSV: name[,min,max,per_q,minutes] or a header with a name/user column")
+    ap.add_argument("--base", default=os.getenv("PUBLIC_BASE_URL", "https://times-tables-from-chalkface.streamlit.app/"))
+    ap.add_argument("--min", type=int, default=2); ap.add_argument("--max", type=int, default=12)
+    ap.add_argument("--per-q", type=int, default=10); ap.add_argument("--minutes", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=None, help=f"shared question order for the class (0..{SEED_MAX})")
+    ap.add_argument("-o", "--out", default="class.zip", help=".zip (sheet + PNGs) or .html (sheet only)")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args(argv)
+    with open(args.roster, encoding="utf-8-sig", newline="") as f: text = f.read()
+    defaults = {"min_table": args.min, "max_table": args.max, "per_q": args.per_q, "minutes": args.minutes}
+    learners, problems = parse_roster(text, defaults)
+    for p in problems: print(p, file=sys.stderr)
+    want_zip = not args.out.lower().endswith(".html")
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        pack = build_class_pack(learners, args.base, pool=pool if args.jobs > 1 else None, want_zip=want_zip,
+                                seed=None if args.seed is None else min(SEED_MAX, max(0, args.seed)))
+    with open(args.out, "wb") as f: f.write(pack["zip"] if want_zip else pack["sheet"].encode("utf-8"))
+    print(f"{pack['count']} learners → {args.out} in {pack['seconds']:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
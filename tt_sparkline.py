@@ -0,0 +1,38 @@
+# tt_sparkline.py — tiny inline-SVG sparklines for the Results screen.
+# Ten history points don't need a charting runtime: each chart is a few hundred bytes of SVG
+# markup built in pure Python, memoised per distinct series, so a Results rerun with unchanged
+# history is a dictionary lookup and the phone never downloads Vega.
+
+from functools import lru_cache
+from html import escape
+
+WIDTH, HEIGHT = 160, 46
+PAD_X, PAD_TOP, PAD_BOTTOM = 6, 12, 12
+
+@lru_cache(maxsize=256)
+def sparkline_svg(points: tuple, color: str = "currentColor", fmt: str = "{:.0f}", title: str = "") -> str:
+    """SVG line for `points` = ((label, value), ...), oldest first; hashable so it can be cached.
+
+    The newest value is printed top-right, the first and last labels sit under the line.
+    """
+    if not points: return ""
+    values = [float(v) for _, v in points]
+    lo, hi = min(values), max(values)
+    if hi - lo < 1e-9: lo, hi = lo - 1.0, hi + 1.0
+    n = len(values)
+    span_x = WIDTH - 2 * PAD_X; span_y = HEIGHT - PAD_TOP - PAD_BOTTOM
+    xs = [PAD_X + (span_x * i / (n - 1) if n > 1 else span_x / 2) for i in range(n)]
+    ys = [PAD_TOP + span_y * (1.0 - (v - lo) / (hi - lo)) for v in values]
+    line = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs, ys))
+    dots = "".join(f"<circle cx='{x:.1f}' cy='{y:.1f}' r='2'/>" for x, y in zip(xs, ys))
+    first, last = escape(str(points[0][0])), escape(str(points[-1][0]))
+    labels = (f"<text x='{PAD_X}' y='{HEIGHT - 2}'>{first}</text>"
+              + (f"<text x='{WIDTH - PAD_X}' y='{HEIGHT - 2}' text-anchor='end'>{last}</text>" if n > 1 else ""))
+    return (f"<svg class='spark' viewBox='0 0 {WIDTH} {HEIGHT}' width='100%' role='img' aria-label='{escape(title)}' "
+            f"style='color:{color}'>"
+            f"<polyline points='{line}' fill='none' stroke='currentColor' stroke-width='1.6' "
+            f"stroke-linejoin='round' stroke-linecap='round'/>"
+            f"<g fill='currentColor'>{dots}</g>"
+            f"<g fill='var(--mini, #64748b)' font-size='8' font-family='system-ui, sans-serif'>{labels}"
+            f"<text x='{WIDTH - PAD_X}' y='8' text-anchor='end' font-weight='700' fill='currentColor'>"
+            f"{escape(fmt.format(values[-1]))}</text></g></svg>")
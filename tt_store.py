@@ -0,0 +1,138 @@
+# tt_store.py — optional server-side store of every attempt, on SQLite in WAL mode.
+# `record()` only appends to an in-memory buffer; a single writer thread flushes buffered rows in
+# batched transactions, so reruns never wait on disk and concurrent sessions never contend for
+# the write lock. Readers use their own connections (WAL lets them run alongside the writer).
+
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger("ttt")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts(
+  id          INTEGER PRIMARY KEY,
+  ts          REAL    NOT NULL,          -- unix seconds
+  user        TEXT    NOT NULL,
+  session_id  TEXT    NOT NULL,
+  a           INTEGER NOT NULL,
+  b           INTEGER NOT NULL,
+  correct     INTEGER NOT NULL,
+  timed_out   INTEGER NOT NULL,
+  response_s  REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_user_ts   ON attempts(user, ts);
+CREATE INDEX IF NOT EXISTS attempts_user_fact ON attempts(user, a, b);
+CREATE INDEX IF NOT EXISTS attempts_fact      ON attempts(a, b);
+"""
+
+_INSERT = ("INSERT INTO attempts(ts, user, session_id, a, b, correct, timed_out, response_s) "
+           "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+def _connect(path: str) -> sqlite3.Connection:
+    con = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.execute("PRAGMA busy_timeout=30000")
+    return con
+
+class AttemptStore:
+    """Buffered per-attempt log with per-user and per-fact aggregate queries."""
+
+    def __init__(self, path: str, flush_interval: float = 1.0, batch_size: int = 500):
+        self.path = str(path)
+        self.flush_interval = float(flush_interval)
+        self.batch_size = int(batch_size)
+        self._buf: deque = deque()            # deque.append/popleft are thread-safe
+        self._wake = threading.Event()
+        self._stop = False
+        self.rows_written = 0
+        con = _connect(self.path)
+        with con: con.executescript(SCHEMA)
+        con.close()
+        self._thread = threading.Thread(target=self._run, name="ttt-attempts", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ---------- Writes ----------
+    def record(self, user: str, a: int, b: int, correct: bool, timed_out: bool,
+               response_s: float, session_id: str, ts: float | None = None):
+        """Queue one attempt; returns immediately."""
+        self._buf.append((time.time() if ts is None else float(ts), str(user or ""), str(session_id),
+                          int(a), int(b), 1 if correct else 0, 1 if timed_out else 0, float(response_s)))
+        if len(self._buf) >= self.batch_size: self._wake.set()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until everything queued so far is on disk (for shutdown and tools)."""
+        marker = threading.Event()
+        self._buf.append(marker)                # the writer sets it once it reaches it
+        self._wake.set()
+        return marker.wait(timeout)
+
+    def close(self):
+        if self._stop: return
+        self.flush(); self._stop = True; self._wake.set()
+
+    def _write(self, con: sqlite3.Connection, rows: list):
+        if not rows: return
+        try:
+            with con: con.executemany(_INSERT, rows)
+            self.rows_written += len(rows)
+        except sqlite3.Error:
+            logger.exception("Attempt store write failed; %d rows dropped", len(rows))
+
+    def _drain(self, con: sqlite3.Connection):
+        rows = []
+        while self._buf and len(rows) < self.batch_size * 4:
+            item = self._buf.popleft()
+            if isinstance(item, threading.Event):
+                self._write(con, rows); rows = []; item.set()
+            else:
+                rows.append(item)
+        self._write(con, rows)
+
+    def _run(self):
+        con = _connect(self.path)
+        while not self._stop:
+            self._wake.wait(self.flush_interval); self._wake.clear()
+            while self._buf: self._drain(con)
+        con.close()
+
+    # ---------- Reads ----------
+    def _query(self, sql: str, args=()) -> list[dict]:
+        con = _connect(self.path)
+        try:
+            con.row_factory = sqlite3.Row
+            return [dict(r) for r in con.execute(sql, args).fetchall()]
+        finally:
+            con.close()
+
+    def user_summary(self, user: str) -> dict:
+        rows = self._query(
+            "SELECT COUNT(*) AS attempts, COALESCE(SUM(correct), 0) AS correct, "
+            "AVG(response_s) AS avg_response_s, COUNT(DISTINCT session_id) AS sessions, "
+            "MIN(ts) AS first_ts, MAX(ts) AS last_ts FROM attempts WHERE user = ?", (user,))
+        return rows[0] if rows else {}
+
+    def users(self, since_ts: float | None = None) -> list[dict]:
+        """Per-user totals, most recent activity first."""
+        where, args = ("WHERE ts >= ?", (since_ts,)) if since_ts is not None else ("", ())
+        return self._query(
+            "SELECT user, COUNT(*) AS attempts, SUM(correct) AS correct, "
+            "ROUND(1.0 * SUM(correct) / COUNT(*), 4) AS accuracy, AVG(response_s) AS avg_response_s, "
+            f"COUNT(DISTINCT session_id) AS sessions, MAX(ts) AS last_ts FROM attempts {where} "
+            "GROUP BY user ORDER BY last_ts DESC", args)
+
+    def fact_stats(self, user: str | None = None, worst_first: bool = True,
+                   limit: int | None = None) -> list[dict]:
+        """Per-fact attempts/accuracy/avg response, for one user or everyone."""
+        where, args = ("WHERE user = ?", [user]) if user is not None else ("", [])
+        order = "accuracy ASC, avg_response_s DESC" if worst_first else "a, b"
+        sql = ("SELECT a, b, COUNT(*) AS attempts, SUM(correct) AS correct, "
+               "ROUND(1.0 * SUM(correct) / COUNT(*), 4) AS accuracy, SUM(timed_out) AS timed_out, "
+               f"AVG(response_s) AS avg_response_s FROM attempts {where} GROUP BY a, b ORDER BY {order}")
+        if limit is not None: sql += " LIMIT ?"; args.append(int(limit))
+        return self._query(sql, args)
@@ -0,0 +1,222 @@
+# tt_worksheets.py — offline printable worksheets and answer keys for the Times Tables Trainer.
+# Uses the app's selection rules (tt_engine: MULTIPLIERS, FactSampler bans, a seeded FactDeck)
+# with each learner's table range from a CSV roster (tt_roster) and revisit items from the class
+# results file (tt_results JSONL: the latest session's wrong-twice and missed facts come first).
+# Sheets are rendered in batches across a process pool and written page by page to HTML (print,
+# or "Save as PDF"); memory stays flat however many sheets are generated.
+#
+#   python tt_worksheets.py roster.csv --results results.jsonl -o sheets.html     # + sheets-answers.html
+#   python tt_worksheets.py --count 10000 --min 2 --max 12 --per-file 500 -o out/sheets.html
+
+import argparse
+import itertools
+import json
+import os
+import random
+import secrets
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import date
+from html import escape
+from pathlib import Path
+
+from tt_engine import FactDeck, FactSampler
+from tt_roster import iter_roster
+
+QUESTIONS = 30                # questions per sheet
+BATCH = 64                    # sheets per pool task (amortizes pickling)
+WINDOW_PER_WORKER = 4         # batches in flight per worker: bounds memory, keeps workers busy
+
+# ---------- Selection ----------
+def sheet_questions(min_table: int, max_table: int, n: int, seed: str, revisit=()) -> list[tuple[int, int]]:
+    """`n` facts for one sheet: revisit items in range first, then seeded deck picks.
+
+    Each fact is banned once used, so a sheet only repeats facts after using up the range.
+    """
+    sampler = FactSampler(min_table, max_table)
+    out = []
+    for a, b in revisit:
+        if len(out) >= n: break
+        if sampler.index(a, b) >= 0 and not sampler.is_banned(a, b):
+            out.append((a, b)); sampler.ban(a, b)
+    deck = FactDeck(sampler, random.Random(seed), n)
+    while len(out) < n:
+        item = deck.next()
+        if item is None:                      # range used up: start another pass
+            sampler.clear_bans(); item = deck.next()
+            if item is None: break
+        out.append(item); sampler.ban(*item)
+    return out
+
+def load_revisit(path: str) -> dict[str, list[tuple[int, int]]]:
+    """Revisit items per learner (lower-cased name) from a results JSONL, read line by line.
+
+    The latest session per learner wins: facts wrong twice first, then other misses, most-missed first.
+    """
+    latest: dict = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try: r = json.loads(line)
+            except ValueError: continue
+            if not isinstance(r, dict) or not r.get("user"): continue
+            key = str(r["user"]).strip().lower()
+            if key in latest and latest[key][0] > float(r.get("ts") or 0): continue
+            twice = [(int(a), int(b)) for a, b in r.get("wrong_twice") or ()]
+            missed = [(int(a), int(b)) for a, b, _ in sorted(r.get("wrong") or (), key=lambda w: -w[2])]
+            latest[key] = (float(r.get("ts") or 0), list(dict.fromkeys(twice + missed)))
+    return {k: items for k, (_, items) in latest.items()}
+
+# ---------- Rendering ----------
+SHEET_CSS = """
+@page{ size:A4; margin:12mm; }
+body{ font-family:system-ui,-apple-system,"Segoe UI",sans-serif; color:#0f172a; margin:0; }
+.page{ break-after:page; page-break-after:always; padding:4mm 0; }
+.page:last-child{ break-after:auto; page-break-after:auto; }
+.head{ display:flex; justify-content:space-between; align-items:baseline; border-bottom:1px solid #cbd5e1;
+       padding-bottom:2mm; margin-bottom:5mm; }
+.head .name{ font-weight:700; font-size:14pt; }
+.head .set{ font-size:9pt; color:#475569; }
+ol.q{ columns:3; column-gap:10mm; margin:0; padding-left:8mm; font-size:14pt; line-height:2.1; }
+ol.q li{ break-inside:avoid; }
+.blank{ display:inline-block; min-width:16mm; border-bottom:1px solid #94a3b8; }
+.keys{ display:grid; grid-template-columns:repeat(2, 1fr); gap:5mm; }
+.key{ border:1px solid #cbd5e1; border-radius:2mm; padding:2mm 3mm; break-inside:avoid; page-break-inside:avoid; }
+.key .name{ font-weight:700; font-size:10pt; }
+.key .set{ font-size:7.5pt; color:#475569; }
+.key ol{ columns:3; margin:1mm 0 0; padding-left:6mm; font-size:8.5pt; line-height:1.45; }
+@media screen{ body{ margin:12mm; } .page{ border-bottom:2px dashed #cbd5e1; margin-bottom:8mm; } }
+"""
+
+def _label(user: str, copy_no: int) -> str:
+    return (user or "Name: ____________") + (f" ({copy_no})" if copy_no > 1 else "")
+
+def _render_batch(jobs: list[tuple]) -> tuple[list[str], list[str]]:
+    """(sheet pages, answer-key cards) for a batch of jobs (user, min, max, revisit, seed, copy_no, n, day)."""
+    pages, keys = [], []
+    for job in jobs:
+        user, min_table, max_table, revisit, seed, copy_no, n, day = job
+        qs = sheet_questions(min_table, max_table, n, seed, revisit)
+        label = escape(_label(user, copy_no))
+        setline = f"Tables {min_table}–{max_table} · {len(qs)} questions · {escape(day)}"
+        pages.append(f"<section class='page'><div class='head'><span class='name'>{label}</span>"
+                     f"<span class='set'>{setline}</span></div><ol class='q'>"
+                     + "".join(f"<li>{a} × {b} = <span class='blank'></span></li>" for a, b in qs)
+                     + "</ol></section>")
+        keys.append(f"<div class='key'><div class='name'>{label}</div><div class='set'>{setline}</div><ol>"
+                    + "".join(f"<li>{a}×{b} = <b>{a * b}</b></li>" for a, b in qs) + "</ol></div>")
+    return pages, keys
+
+class PagedHtml:
+    """Streams pages into one HTML file, or a numbered series of `per_file` pages each."""
+
+    def __init__(self, path: str, title: str, per_file: int = 0, wrap: tuple[str, str] = ("", "")):
+        self.path = Path(path); self.title = title; self.per_file = max(0, int(per_file))
+        self.wrap = wrap; self.files: list[str] = []
+        self._f = None; self._in_file = 0
+
+    def _open(self):
+        p = self.path if not self.per_file else self.path.with_name(
+            f"{self.path.stem}-{len(self.files) + 1:03d}{self.path.suffix}")
+        p.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(p, "w", encoding="utf-8"); self.files.append(str(p)); self._in_file = 0
+        self._f.write(f"<!doctype html><html><head><meta charset='utf-8'><title>{escape(self.title)}</title>"
+                      f"<style>{SHEET_CSS}</style></head><body>{self.wrap[0]}")
+
+    def write(self, page: str):
+        if self._f is None or (self.per_file and self._in_file >= self.per_file):
+            self.close(); self._open()
+        self._f.write(page); self._in_file += 1
+
+    def close(self):
+        if self._f is not None:
+            self._f.write(f"{self.wrap[1]}</body></html>"); self._f.close(); self._f = None
+
+def _in_order(batches, pool: Executor | None, window: int):
+    """Rendered batches in input order, with at most `window` in flight."""
+    if pool is None:
+        for b in batches: yield _render_batch(b)
+        return
+    pending = deque()
+    for b in batches:
+        pending.append(pool.submit(_render_batch, b))
+        if len(pending) >= window: yield pending.popleft().result()
+    while pending: yield pending.popleft().result()
+
+def generate(jobs, out: str, answers: str | None, pool: Executor | None = None, per_file: int = 0,
+             title: str = "Times Tables practice") -> dict:
+    """Render `jobs` (an iterable, consumed lazily) to worksheet and answer-key HTML; returns stats."""
+    t0 = time.perf_counter(); count = 0
+    workers = getattr(pool, "_max_workers", 1) if pool is not None else 1
+    batches = iter(lambda: list(itertools.islice(jobs, BATCH)), [])
+    sheets = PagedHtml(out, title, per_file)
+    keys = PagedHtml(answers, f"{title} — answers", per_file, ("<div class='keys'>", "</div>")) if answers else None
+    try:
+        for pages, cards in _in_order(batches, pool, workers * WINDOW_PER_WORKER):
+            for page in pages: sheets.write(page)
+            if keys is not None:
+                for card in cards: keys.write(card)
+            count += len(pages)
+    finally:
+        sheets.close()
+        if keys is not None: keys.close()
+    return {"sheets": count, "files": sheets.files + (keys.files if keys else []),
+            "seconds": time.perf_counter() - t0}
+
+def roster_jobs(learners, copies: int, n: int, seed: str, revisit: dict, day: str):
+    """One job per learner × copy; the per-sheet seed makes every sheet reproducible."""
+    for learner in learners:
+        items = tuple(revisit.get(learner.user.strip().lower(), ()))
+        for c in range(1, copies + 1):
+            yield (learner.user, learner.min_table, learner.max_table, items, f"{seed}:{learner.user}:{c}", c, n, day)
+
+def blank_jobs(count: int, min_table: int, max_table: int, n: int, seed: str, day: str):
+    for c in range(1, count + 1):
+        yield ("", min_table, max_table, (), f"{seed}::{c}", 1, n, day)
+
+# ---------- CLI ----------
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Generate printable times-table worksheets and answer keys.")
+    ap.add_argument("roster", nargs="?", help="CSV roster as for tt_roster.py (omit for --count unnamed sheets)")
+    ap.add_argument("--results", help="results JSONL (TTT_RESULTS_JSONL): revisit items per learner")
+    ap.add_argument("--count", type=int, default=1, help="unnamed sheets when no roster is given")
+    ap.add_argument("--copies", type=int, default=1, help="sheets per learner")
+    ap.add_argument("--questions", type=int, default=QUESTIONS)
+    ap.add_argument("--min", type=int, default=2); ap.add_argument("--max", type=int, default=12)
+    ap.add_argument("--seed", default=None, help="reproduce a previous run (printed when omitted)")
+    ap.add_argument("-o", "--out", default="worksheets.html")
+    ap.add_argument("--answers", default=None, help="answer-key HTML (default: <out>-answers.html; 'none' to skip)")
+    ap.add_argument("--per-file", type=int, default=0, help="split output into files of this many pages")
+    ap.add_argument("--date", default=date.today().isoformat(), help="date printed on each sheet")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args(argv)
+
+    seed = args.seed or secrets.token_hex(4)
+    n = max(1, args.questions)
+    lo, hi = sorted((max(1, args.min), max(1, args.max)))
+    out = Path(args.out)
+    answers = None if (args.answers or "").lower() == "none" else (
+        args.answers or str(out.with_name(f"{out.stem}-answers{out.suffix or '.html'}")))
+    revisit = load_revisit(args.results) if args.results else {}
+    problems: list[str] = []
+    roster_f = open(args.roster, encoding="utf-8", newline="") if args.roster else None
+    try:
+        defaults = {"min_table": lo, "max_table": hi, "per_q": 10, "minutes": 3}
+        jobs = (roster_jobs(iter_roster(roster_f, defaults, problems), max(1, args.copies), n, seed, revisit, args.date)
+                if roster_f else blank_jobs(max(1, args.count), lo, hi, n, seed, args.date))
+        if args.jobs > 1:
+            with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                res = generate(jobs, str(out), answers, pool=pool, per_file=args.per_file)
+        else:
+            res = generate(jobs, str(out), answers, per_file=args.per_file)
+    finally:
+        if roster_f: roster_f.close()
+    for p in problems: print(p, file=sys.stderr)
+    rate = res["sheets"] / res["seconds"] if res["seconds"] else 0.0
+    print(f"{res['sheets']} sheets → {len(res['files'])} file(s) in {res['seconds']:.2f}s "
+          f"({rate:,.0f} sheets/s, seed {seed})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())